@@ -0,0 +1,230 @@
+"""
+PowerWatch
+build_all.py
+Run the source database builders and build_powerwatch.py in dependency order.
+- Each builder declares the files it reads (from other builders) and writes.
+- Independent builders run concurrently, up to --jobs processes at a time.
+- A builder runs only once every builder producing one of its inputs has succeeded;
+if one fails, its dependents are skipped.
+- Each builder's output is saved to output_database/build_logs/ and printed if it fails.
+- Options --download and --force are passed on to the source database builders,
+--dump and --incremental to build_powerwatch.py.
+"""
+
+import argparse
+import collections
+import multiprocessing
+import subprocess
+import tempfile
+import time
+import sys, os
+
+sys.path.insert(0, os.pardir)
+import powerwatch as pw
+
+### PARAMETERS ###
+BUILD_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+POLL_INTERVAL = 0.1		# seconds between checks on running builders
+
+Builder = collections.namedtuple("Builder", ["name", "script", "inputs", "outputs", "options"])
+
+def database_file(save_code):
+	"""Get the path of the source database saved by a builder with `save_code`."""
+	return pw.make_file_path(fileType = "src_bin", filename = save_code + "-Database.bin")
+
+def source_builder(save_code, script_code = None, inputs = []):
+	"""Declare a build_database_*.py script writing the `save_code` source database."""
+	script = "build_database_{0}.py".format(script_code or save_code)
+	return Builder(save_code, script, list(inputs), [database_file(save_code)], ["--download", "--force"])
+
+def make_builders():
+	"""
+	Declare all builders with their inputs and outputs.
+
+	Returns
+	-------
+	builders : list of Builder
+		Source database builders, then build_powerwatch.py, which reads the
+		national databases of countries with `has_api` plus the WRI, GEO,
+		CARMA and SourceWatch databases.
+	"""
+	builders = [source_builder(code) for code in
+				["ARG", "AUS", "BRA", "CARMA", "CDMDB", "CHL", "EPRTR", "FIN", "IND",
+				"MEX", "SRCWT", "USA", "WRI", "YEM"]]
+	builders.append(source_builder("GEODB", script_code = "GEO"))
+	builders.append(source_builder("GBR", inputs = [database_file("GEODB"), database_file("CARMA")]))
+
+	country_dictionary = pw.make_country_dictionary()
+	powerwatch_inputs = [database_file(country.iso_code) for country in country_dictionary.values() if country.has_api == 1]
+	powerwatch_inputs.extend(database_file(code) for code in ["WRI", "GEODB", "CARMA", "SRCWT"])
+	powerwatch_inputs.append(pw.MASTER_PLANT_CONCORDANCE_FILE)
+	builders.append(Builder("PowerWatch", "build_powerwatch.py", sorted(set(powerwatch_inputs)),
+							[pw.make_file_path(fileType = "output", filename = "powerwatch_data.csv")], ["--dump", "--incremental"]))
+	return builders
+
+def dependency_graph(builders):
+	"""
+	Find the builders each builder depends on.
+
+	Returns
+	-------
+	dependencies : dict of {str: set of str}
+		Names of the builders producing one of each builder's inputs. Inputs
+		that no builder produces must already exist.
+
+	Raises
+	------
+	ValueError
+		If two builders write the same file or the builders depend on each other in a cycle.
+	"""
+	producers = {}
+	for builder in builders:
+		for output in builder.outputs:
+			if output in producers:
+				raise ValueError("{0} is written by both {1} and {2}".format(output, producers[output], builder.name))
+			producers[output] = builder.name
+	dependencies = dict((b.name, set(producers[i] for i in b.inputs if i in producers)) for b in builders)
+
+	# check for cycles by removing builders without unresolved dependencies
+	remaining = dict((name, set(deps)) for name, deps in dependencies.iteritems())
+	while remaining:
+		ready = [name for name, deps in remaining.iteritems() if not deps]
+		if not ready:
+			raise ValueError("Dependency cycle between builders: {0}".format(", ".join(sorted(remaining))))
+		for name in ready:
+			del remaining[name]
+		for deps in remaining.itervalues():
+			deps.difference_update(ready)
+	return dependencies
+
+def critical_path(dependencies, durations):
+	"""Get the longest chain of dependent builders (list of names) and its total duration."""
+	finish = {}
+	def longest(name):
+		if name not in finish:
+			before = max([longest(dep) for dep in dependencies[name]] or [(0.0, [])])
+			finish[name] = (before[0] + durations.get(name, 0.0), before[1] + [name])
+		return finish[name]
+	seconds, path = max([longest(name) for name in dependencies] or [(0.0, [])])
+	return path, seconds
+
+def _output_stamps(builder):
+	"""Get the modification time of each output of a builder (None if missing)."""
+	return [os.path.getmtime(f) if os.path.exists(f) else None for f in builder.outputs]
+
+def run_builders(builders, jobs = None, flags = [], log_dir = None, python = sys.executable, cwd = BUILD_DIRECTORY):
+	"""
+	Run builders as separate processes, in dependency order.
+
+	Parameters
+	----------
+	builders : list of Builder
+		Builders to run.
+	jobs : int, optional
+		Maximum number of builders running at once; defaults to the number of CPUs.
+	flags : list of str
+		Command-line flags passed to each builder that accepts them.
+	log_dir : str, optional
+		Directory to save each builder's output to.
+	python : str
+		Python interpreter used to run the builder scripts.
+	cwd : str
+		Directory the builder scripts are in and run from.
+
+	Returns
+	-------
+	results : dict of {str: (str, float)}
+		Status and run time in seconds of each builder. Status is 'built',
+		'unchanged' (no output was rewritten), 'failed' or 'skipped' (a
+		dependency failed).
+	"""
+	jobs = jobs or multiprocessing.cpu_count()
+	dependencies = dependency_graph(builders)
+	by_name = dict((b.name, b) for b in builders)
+	pending = [b.name for b in builders]
+	running = {}		# name -> (process, log file, start time, output stamps)
+	results = {}
+
+	while pending or running:
+		# start builders whose dependencies have all succeeded
+		for name in list(pending):
+			deps = dependencies[name]
+			if any(results.get(dep, ("",))[0] in ("failed", "skipped") for dep in deps):
+				pending.remove(name)
+				results[name] = ("skipped", 0.0)
+				print(u"Skipping {0}: a dependency failed.".format(name))
+				continue
+			if len(running) >= jobs or not all(dep in results for dep in deps):
+				continue
+			builder = by_name[name]
+			log = tempfile.TemporaryFile()
+			command = [python, builder.script] + [f for f in flags if f in builder.options]
+			print(u"Starting {0}...".format(name))
+			stamps = _output_stamps(builder)
+			process = subprocess.Popen(command, cwd = cwd, stdout = log, stderr = subprocess.STDOUT)
+			running[name] = (process, log, time.time(), stamps)
+			pending.remove(name)
+
+		# collect finished builders
+		for name, (process, log, start, stamps) in running.items():
+			if process.poll() is None:
+				continue
+			seconds = time.time() - start
+			del running[name]
+			log.seek(0)
+			output = log.read()
+			log.close()
+			if log_dir:
+				with open(os.path.join(log_dir, name + ".log"), "wb") as f:
+					f.write(output)
+			if process.returncode != 0:
+				status = "failed"
+				print(u"{0} failed with exit code {1} after {2:.1f} s:".format(name, process.returncode, seconds))
+				sys.stdout.write(output)
+			else:
+				status = "built" if _output_stamps(by_name[name]) != stamps else "unchanged"
+				print(u"Finished {0} ({1}) in {2:.1f} s.".format(name, status, seconds))
+			results[name] = (status, seconds)
+		if running:
+			time.sleep(POLL_INTERVAL)
+	return results
+
+def print_timing_table(builders, results, wall_time):
+	"""Print status and run time of each builder, with totals and the critical path."""
+	dependencies = dependency_graph(builders)
+	durations = dict((name, seconds) for name, (status, seconds) in results.iteritems())
+	width = max([len(b.name) for b in builders] + [len("Builder")])
+	print(u"{0:<{w}}  {1:<9}  {2:>9}  {3}".format("Builder", "Status", "Seconds", "Depends on", w = width))
+	for builder in sorted(builders, key = lambda b: -durations.get(b.name, 0.0)):
+		status, seconds = results.get(builder.name, ("not run", 0.0))
+		print(u"{0:<{w}}  {1:<9}  {2:>9.1f}  {3}".format(builder.name, status, seconds,
+				", ".join(sorted(dependencies[builder.name])), w = width).rstrip())
+	path, path_seconds = critical_path(dependencies, durations)
+	print(u"Sum of builder times: {0:.1f} s; wall time: {1:.1f} s.".format(sum(durations.values()), wall_time))
+	print(u"Critical path: {0} ({1:.1f} s).".format(" -> ".join(path), path_seconds))
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser()
+	parser.add_argument("builders", nargs = "*", help = "names of builders to run; all by default")
+	parser.add_argument("-j", "--jobs", type = int, help = "number of builders to run at once; number of CPUs by default")
+	parser.add_argument("--download", help = "download raw files", action = "store_true")
+	parser.add_argument("--force", help = "rebuild even if raw files are unchanged", action = "store_true")
+	parser.add_argument("--dump", help = "dump all the data in build_powerwatch.py", action = "store_true")
+	parser.add_argument("--incremental", help = "reuse cached build_powerwatch.py results for unchanged sources", action = "store_true")
+	args = parser.parse_args()
+
+	builders = make_builders()
+	if args.builders:
+		unknown = set(args.builders) - set(b.name for b in builders)
+		if unknown:
+			parser.error("unknown builders: {0}".format(", ".join(sorted(unknown))))
+		# unselected builders are not run; their outputs are used as they are
+		builders = [b for b in builders if b.name in args.builders]
+	flags = [flag for flag, on in [("--download", args.download), ("--force", args.force), ("--dump", args.dump),
+			("--incremental", args.incremental)] if on]
+
+	start = time.time()
+	results = run_builders(builders, args.jobs, flags, log_dir = pw.make_file_path(fileType = "output", subFolder = "build_logs"))
+	print_timing_table(builders, results, time.time() - start)
+	if any(status in ("failed", "skipped") for status, seconds in results.itervalues()):
+		sys.exit(1)
@@ -45,6 +45,12 @@ DOWNLOAD_URL = u"http://www2.aneel.gov.br/aplicacoes/capacidadebrasil/GeracaoTip
 POST_DATA = {'tipo':0,'fase':3}
 DOWNLOAD_FILES = pw.download('ANEEL B.I.G.',{RAW_FILE_NAME:DOWNLOAD_URL},POST_DATA)
 
+# skip re-parsing if inputs (and this script) are unchanged since the last build
+args = pw.build_arg_parser()
+INPUT_FILES = [RAW_FILE_NAME, COORDINATE_FILE, __file__]
+if not pw.inputs_changed(INPUT_FILES, SAVE_CODE, SAVE_DIRECTORY, force = args.force):
+    sys.exit(0)
+
 # define specialized fuel type interpreter
 generator_types = {  u'CGH':u'Hydro',
                 u'CGU':u'Wave and Tidal',
@@ -191,5 +197,5 @@ print(u"Found operational year for {0} plants.".format(found_operational_year_co
 pw.write_csv_file(plants_dictionary,CSV_FILE_NAME)
 
 # save database
-pw.save_database(plants_dictionary,SAVE_CODE,SAVE_DIRECTORY)
+pw.save_database(plants_dictionary,SAVE_CODE,SAVE_DIRECTORY,inputs=INPUT_FILES)
 print(u"Pickled database to {0}".format(SAVE_DIRECTORY))
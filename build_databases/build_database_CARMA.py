@@ -34,6 +34,12 @@ COLNAMES = ['plant.id','plant','lat','lon','iso3']
 #DOWNLOAD_FILES = pw.download(SOURCE_NAME, FILES)
 print("Download disabled; using local raw database file.")
 
+# skip re-parsing if inputs (and this script) are unchanged since the last build
+args = pw.build_arg_parser()
+INPUT_FILES = [RAW_FILE_NAME, __file__]
+if not pw.inputs_changed(INPUT_FILES, SAVE_CODE, SAVE_DIRECTORY, force = args.force):
+    sys.exit(0)
+
 # set up country name thesaurus
 country_thesaurus = pw.make_country_names_thesaurus()
 
@@ -80,5 +86,5 @@ print("Skipped {0} plants because of missing lat/long coordinates.".format(coord
 pw.write_csv_file(plants_dictionary,CSV_FILE_NAME)
 #
 # save database
-pw.save_database(plants_dictionary,SAVE_CODE,SAVE_DIRECTORY)
+pw.save_database(plants_dictionary,SAVE_CODE,SAVE_DIRECTORY,inputs=INPUT_FILES)
 print(u"Pickled database to {0}".format(SAVE_DIRECTORY))
@@ -60,6 +60,12 @@ for dataset in DATASETS:
      FILES[RAW_FILE_NAME_this] = URL
 DOWNLOAD_FILES = pw.download("Chile power plant data", FILES)
 
+# skip re-parsing if inputs (and this script) are unchanged since the last build
+args = pw.build_arg_parser()
+INPUT_FILES = FILES.keys() + [LOCATION_FILE_NAME, __file__]
+if not pw.inputs_changed(INPUT_FILES, SAVE_CODE, SAVE_DIRECTORY, force = args.force):
+    sys.exit(0)
+
 # set up fuel type thesaurus
 fuel_thesaurus = pw.make_fuel_thesaurus()
 
@@ -163,5 +169,5 @@ print(u"...read {0} plants.".format(len(plants_dictionary)))
 pw.write_csv_file(plants_dictionary,CSV_FILE_NAME)
 
 # save database
-pw.save_database(plants_dictionary,SAVE_CODE,SAVE_DIRECTORY)
+pw.save_database(plants_dictionary,SAVE_CODE,SAVE_DIRECTORY,inputs=INPUT_FILES)
 print(u"Pickled database to {0}".format(SAVE_DIRECTORY))
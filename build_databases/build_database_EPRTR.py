@@ -40,6 +40,12 @@ URL = "'"
 FILES = {RAW_FILE_NAME: URL}
 DOWNLOAD_FILES = pw.download(SOURCE_NAME, FILES)
 
+# skip re-parsing if inputs (and this script) are unchanged since the last build
+args = pw.build_arg_parser()
+INPUT_FILES = FILES.keys() + [__file__]
+if not pw.inputs_changed(INPUT_FILES, SAVE_CODE, SAVE_DIRECTORY, force = args.force):
+    sys.exit(0)
+
 # set up fuel type thesaurus
 fuel_thesaurus = pw.make_fuel_thesaurus()
 
@@ -122,5 +128,5 @@ print(u"...read {0} plants.".format(len(plants_dictionary)))
 pw.write_csv_file(plants_dictionary,CSV_FILE_NAME)
 #
 # save database
-pw.save_database(plants_dictionary,SAVE_CODE,SAVE_DIRECTORY)
+pw.save_database(plants_dictionary,SAVE_CODE,SAVE_DIRECTORY,inputs=INPUT_FILES)
 print(u"Pickled database to {0}".format(SAVE_DIRECTORY))
@@ -37,6 +37,12 @@ def regex_match(name_1, name_2):
 # optional raw file(s) download
 DOWNLOAD_FILES = pw.download(COUNTRY_NAME, {RAW_FILE_NAME:DATASET_URL})
 
+# skip re-parsing if inputs (and this script) are unchanged since the last build
+args = pw.build_arg_parser()
+INPUT_FILES = [RAW_FILE_NAME, __file__]
+if not pw.inputs_changed(INPUT_FILES, SAVE_CODE, SAVE_DIRECTORY, force = args.force):
+    sys.exit(0)
+
 # set up fuel type thesaurus
 fuel_thesaurus = pw.make_fuel_thesaurus()
 
@@ -136,5 +142,5 @@ while i < len(sorted_units)-1:
 pw.write_csv_file(plants_dictionary,CSV_FILE_NAME)
 
 # pickle database
-pw.save_database(plants_dictionary, SAVE_CODE, SAVE_DIRECTORY)
+pw.save_database(plants_dictionary, SAVE_CODE, SAVE_DIRECTORY, inputs=INPUT_FILES)
 print("Pickled database to {0}".format(SAVE_DIRECTORY))
@@ -67,6 +67,12 @@ osgb36 = pyproj.Proj("+init=EPSG:27700") # UK Ordnance Survey, 1936 datum
 FILES = { RAW_FILE_NAME_REPD:URL_REPD, RAW_FILE_NAME_DUKES:URL_DUKES }
 DOWNLOAD_FILES = pw.download(u"UK Renewable Energy Planning Database and DUKES", FILES)
 
+# skip re-parsing if inputs (and this script) are unchanged since the last build
+args = pw.build_arg_parser()
+INPUT_FILES = FILES.keys() + [PLANT_MATCHES, GEO_DATABASE_FILE, CARMA_DATABASE_FILE, __file__]
+if not pw.inputs_changed(INPUT_FILES, SAVE_CODE_GBR, SAVE_DIRECTORY, force = args.force):
+    sys.exit(0)
+
 # set up fuel type thesaurus
 fuel_thesaurus = pw.make_fuel_thesaurus()
 
@@ -263,5 +269,5 @@ print(u"Loaded {0} plants to database.".format(len(plants_dictionary)))
 pw.write_csv_file(plants_dictionary,CSV_FILE_NAME)
 
 # save database
-pw.save_database(plants_dictionary,SAVE_CODE_GBR,SAVE_DIRECTORY)
+pw.save_database(plants_dictionary,SAVE_CODE_GBR,SAVE_DIRECTORY,inputs=INPUT_FILES)
 print(u"Pickled database to {0}".format(SAVE_DIRECTORY))
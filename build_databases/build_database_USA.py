@@ -30,6 +30,12 @@ TAB_NAME_860_2 = "Plant"
 TAB_NAME_860_3 = "Operable"
 TAB_NAME_923_2 = "Page 1 Generation and Fuel Data"
 
+# skip re-parsing if inputs (and this script) are unchanged since the last build
+args = pw.build_arg_parser()
+INPUT_FILES = [RAW_FILE_NAME_860_2, RAW_FILE_NAME_860_3, RAW_FILE_NAME_923_2, __file__]
+if not pw.inputs_changed(INPUT_FILES, SAVE_CODE, SAVE_DIRECTORY, force = args.force):
+    sys.exit(0)
+
 
 # set up fuel type thesaurus
 fuel_thesaurus = pw.make_fuel_thesaurus()
@@ -136,5 +142,5 @@ print("...finished.")
 pw.write_csv_file(plants_dictionary,CSV_FILE_NAME)
 
 # pickle database
-pw.save_database(plants_dictionary, SAVE_CODE, SAVE_DIRECTORY)
+pw.save_database(plants_dictionary, SAVE_CODE, SAVE_DIRECTORY, inputs=INPUT_FILES)
 print("Pickled database to {0}".format(SAVE_DIRECTORY))
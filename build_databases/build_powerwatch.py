@@ -4,15 +4,24 @@ build_powerwatch.py
 Builds the PowerWatch database from various data sources.
 - Log build to POWERWATCH_BUILD_LOG_FILE
 - Use country and fuel information as specified in powerwatch.py
+- The build steps are in powerwatch.merge; the plants added from each source
+(a national database, WRI, GEO, SourceWatch) form a partition, which is cached
+in BUILD_CACHE_DIRECTORY with a fingerprint of its inputs and of the build code
+(this script and the powerwatch package, including powerwatch.merge).
+- With --incremental, partitions whose inputs are unchanged are read from the cache
+instead of reloading and triaging their source databases.
 """
 
 import csv
 import time
 import argparse
+import cPickle
+import hashlib
 import sys, os
 
 sys.path.insert(0, os.pardir)
 import powerwatch as pw
+from powerwatch import merge
 
 ### PARAMETERS ###
 COUNTRY_DATABASE_FILE = pw.make_file_path(fileType = "src_bin", filename = "COUNTRY-Database.bin")
@@ -23,11 +32,116 @@ SOURCEWATCH_DATABASE_FILE = pw.make_file_path(fileType = "src_bin", filename = "
 POWERWATCH_CSV_SAVEFILE = pw.make_file_path(fileType = "output", filename = "powerwatch_data.csv")
 POWERWATCH_BUILD_LOG_FILE = pw.make_file_path(fileType = "output", filename = "powerwatch_build_log.txt")
 POWERWATCH_CSV_DUMPFILE = pw.make_file_path(fileType = "output", filename = "powerwatch_data_dump.csv")
-MINIMUM_CAPACITY_MW = 1
+BUILD_CACHE_DIRECTORY = pw.make_file_path(fileType = "output", subFolder = "build_cache")
+BUILD_SOURCE_FILES = pw.build_source_inputs() + [os.path.abspath(__file__)]	# build code in every fingerprint
+MINIMUM_CAPACITY_MW = merge.MINIMUM_CAPACITY_MW
 
 parser = argparse.ArgumentParser()
 parser.add_argument("--dump", help = "dump all the data", action="store_true")
-DATA_DUMP = True if parser.parse_args().dump else False
+parser.add_argument("--incremental", help = "reuse cached results for sources whose inputs are unchanged", action="store_true")
+args = parser.parse_args()
+DATA_DUMP = True if args.dump else False
+INCREMENTAL = args.incremental
+
+### PARTITION CACHE ###
+
+_signatures_file = os.path.join(BUILD_CACHE_DIRECTORY, "signatures.pkl")
+try:
+	with open(_signatures_file, 'rb') as f:
+		_signatures = cPickle.load(f)
+except (IOError, EOFError, cPickle.UnpicklingError):
+	_signatures = {}
+
+def fingerprint(files, *extra):
+	"""Get a fingerprint of the content of input files and of the build code, build settings and `extra` values."""
+	sha = hashlib.sha1(repr((MINIMUM_CAPACITY_MW, DATA_DUMP, extra)))
+	for path in BUILD_SOURCE_FILES + list(files):
+		if os.path.exists(path):
+			_signatures[path] = pw.file_signature(path, _signatures.get(path))
+			sha.update(_signatures[path]['sha1'])
+		else:
+			sha.update(path)
+	return sha.hexdigest()
+
+def cached_partition(name, key, compute):
+	"""
+	Get the results for one source, from the cache if its fingerprint is unchanged.
+
+	Parameters
+	----------
+	name : str
+		Name of the partition, used as the cache filename.
+	key : str
+		Fingerprint of the partition's inputs.
+	compute : function
+		Function computing the partition if it is not cached.
+	"""
+	cache_file = os.path.join(BUILD_CACHE_DIRECTORY, name + ".pkl")
+	if INCREMENTAL and os.path.exists(cache_file):
+		try:
+			with open(cache_file, 'rb') as f:
+				cached_key, partition = cPickle.load(f)
+		except Exception as e:
+			# unreadable, or pickled with classes that have since changed: rebuild
+			print("Ignoring unreadable cached results for {0} ({1}).".format(name, e))
+			cached_key = None
+		if cached_key == key:
+			print("Using cached results for {0}.".format(name))
+			return partition
+	partition = compute()
+	# cache before generation estimation modifies the plants
+	with open(cache_file, 'wb') as f:
+		cPickle.dump((key, partition), f, cPickle.HIGHEST_PROTOCOL)
+	return partition
+
+### SOURCE DATABASES ###
+
+_databases = {}
+
+def source_database(dbname):
+	"""Load a source database once, when first needed."""
+	if dbname not in _databases:
+		if dbname == "WRI":
+			# WRI plants in countries with national or GEO data are skipped in STEP 2, so they are not loaded.
+			wri_countries = pw.database_countries(WRI_DATABASE_FILE)
+			if wri_countries is not None:
+				wri_countries = [c for c in wri_countries if c not in country_dictionary or not (country_dictionary[c].has_api or country_dictionary[c].use_geo)]
+			database = pw.load_database(WRI_DATABASE_FILE, compact=True, countries=wri_countries)
+		elif dbname == "GEO":
+			database = pw.load_database(GEO_DATABASE_FILE, compact=True)
+		elif dbname == "CARMA":
+			# CARMA only supplies locations unless its plants are dumped too.
+			carma_fields = None if DATA_DUMP else ['location']
+			database = pw.load_database(CARMA_DATABASE_FILE, compact=True, fields=carma_fields)
+		elif dbname == "SourceWatch":
+			database = pw.load_database(SOURCEWATCH_DATABASE_FILE, compact=True)
+		else:
+			database_filename = COUNTRY_DATABASE_FILE.replace("COUNTRY", country_dictionary[dbname].iso_code)
+			database = pw.load_database(database_filename, compact=True)
+		print("Loaded {0} plants from {1} database.".format(len(database), dbname))
+		_databases[dbname] = database
+	return _databases[dbname]
+
+class LazyDatabase(object):
+	"""Source database looked up by plant ID, loaded on first use."""
+	def __init__(self, dbname):
+		self.dbname = dbname
+
+	def __getitem__(self, plant_id):
+		return source_database(self.dbname)[plant_id]
+
+def country_step(country_name):
+	"""Run STEP 1 for one country."""
+	print("Adding plants from {0}.".format(country_dictionary[country_name].primary_name))
+	return merge.add_country_plants(country_name, source_database(country_name), MINIMUM_CAPACITY_MW)
+
+def wri_step():
+	"""Run STEP 2, loading GEO and CARMA only if a WRI plant needs their locations."""
+	print("Adding plants from WRI internal database.")
+	return merge.triage_wri_plants(source_database("WRI"), country_dictionary, plant_concordance,
+									LazyDatabase("GEO"), LazyDatabase("CARMA"), MINIMUM_CAPACITY_MW)
+
+### BUILD ###
 
 # open log file
 f_log = open(POWERWATCH_BUILD_LOG_FILE,'a')
@@ -39,154 +153,38 @@ print("Starting PowerWatch build; minimum plant size: {0} MW.".format(MINIMUM_CA
 # make country dictionary
 country_dictionary = pw.make_country_dictionary()
 
-# make powerplants dictionary
-powerwatch_database = {}
-powerwatch_datadump = {}
-
 # make plant condcordance dictionary
 plant_concordance = pw.make_plant_concordance()
 print("Loaded concordance file with {0} entries.".format(len(plant_concordance)))
-carma_id_used = []	# Record matched carma_ids
-
-# STEP 0: Read in source databases.
-# Identify countries with automated data from .has_api flag.
-print("Loading source databases...")
-country_databases = {}
-for country_name,country in country_dictionary.iteritems():
-	if country.has_api == 1:
-		country_code = country.iso_code
-		database_filename = COUNTRY_DATABASE_FILE.replace("COUNTRY", country_code)
-		country_databases[country_name] = pw.load_database(database_filename)
-		print("Loaded {0} plants from {1} database.".format(len(country_databases[country_name]),country_name))
-
-# Load multi-country databases.
-wri_database = pw.load_database(WRI_DATABASE_FILE)
-print("Loaded {0} plants from WRI database.".format(len(wri_database)))
-geo_database = pw.load_database(GEO_DATABASE_FILE)
-print("Loaded {0} plants from GEO database.".format(len(geo_database)))
-carma_database = pw.load_database(CARMA_DATABASE_FILE)
-print("Loaded {0} plants from CARMA database.".format(len(carma_database)))
-sourcewatch_database = pw.load_database(SOURCEWATCH_DATABASE_FILE)
-print("Loaded {0} plants from SourceWatch database.".format(len(sourcewatch_database)))
-
-# Track counts using a dict with keys corresponding to each data source
-db_sources = country_databases.keys()
-db_sources.extend(["WRI","GEO","SourceWatch","WRI with GEO lat/long data","WRI with CARMA lat/long data"])
-database_additions = {dbname: {'count': 0, 'capacity': 0} for dbname in db_sources}
-
-# STEP 1: Add all data (capacity >= 1MW) from countries with automated data to PowerWatch
-for country_name, database in country_databases.iteritems():
-	country_code = country_dictionary[country_name].iso_code
-	print("Adding plants from {0}.".format(country_dictionary[country_name].primary_name))
-	coordinate_source = country_name + u" national data"
-	for plant_id,plant in database.iteritems():
-		plant.coord_source = coordinate_source
-		powerwatch_datadump[plant_id] = plant
-		if plant.capacity >= MINIMUM_CAPACITY_MW:
-			if (plant.location.latitude and plant.location.longitude) and (plant.location.latitude != 0 and plant.location.longitude != 0):
-				powerwatch_database[plant_id] = plant
-				database_additions[country_name]['count'] += 1
-				database_additions[country_name]['capacity'] += plant.capacity
-			else:
-				plant.idnr = plant_id + u",No"
-		else:
-			plant.idnr = plant_id + u",No"
-
-# STEP 2: Go through WRI database and triage plants
-print("Adding plants from WRI internal database.")
-for plant_id, plant in wri_database.iteritems():
-	# Cases to skip
-	if not isinstance(plant, pw.PowerPlant):
-		f_log.write('Error: plant {0} is not a PowerPlant object.\n'.format(plant_id))
-		continue
-	if plant.country not in country_dictionary.keys():
-		f_log.write('Error: country {0} not recognized.\n'.format(plant.country))
-		continue
-	# Skip plants with data loaded directly from a national API
-	if country_dictionary[plant.country].has_api:
-		continue
-	# Skip plants in countries where we will use GEO data
-	if country_dictionary[plant.country].use_geo:
-		continue
-
-	powerwatch_datadump[plant_id] = plant
-
-	# Skip plants below minimum capacity cutoff
-	if plant.capacity < MINIMUM_CAPACITY_MW:
-		continue
-
-	# STEP 2.1: If plant has lat/long information, add it to PowerWatch
-	if (plant.location.latitude and plant.location.longitude) and (plant.location.latitude != 0 and plant.location.longitude != 0):
-		plant.idnr = plant_id
-		plant.coord_source = u"WRI data"
-		powerwatch_database[plant_id] = plant
-		database_additions['WRI']['count'] += 1
-		database_additions['WRI']['capacity'] += plant.capacity
-		continue
-
-	# STEP 2.2: If plant is matched to GEO, add to PowerWatch using GEO lat/long
-	if plant_id in plant_concordance:
-		matching_geo_id = plant_concordance[plant_id]['geo_id']
-		if matching_geo_id:
-			try:
-				plant.location = geo_database[matching_geo_id].location
-			except:
-				f_log.write("Matching error: no GEO location for WRI plant {0}, GEO plant {1}\n".format(plant_id,matching_geo_id))
-				continue
-			if plant.location.latitude and plant.location.longitude:
-				plant.idnr = plant_id
-				plant.coord_source = u"GEO data"
-				powerwatch_database[plant_id] = plant
-				database_additions["WRI with GEO lat/long data"]['count'] += 1
-				database_additions["WRI with GEO lat/long data"]['capacity'] += plant.capacity
-				continue
-
-	# STEP 2.3: If plant is matched to CARMA, add to PowerWatch using CARMA lat/long
-	if plant_id in plant_concordance:
-		matching_carma_id = plant_concordance[plant_id]['carma_id']
-		if matching_carma_id:
-			try:
-				plant.location = carma_database[matching_carma_id].location
-			except:
-				f_log.write("Matching error: no CARMA location for WRI plant {0}, CARMA plant {1}\n".format(plant_id,matching_carma_id))
-				continue
-			if plant.location.latitude and plant.location.longitude:
-				plant.idnr = plant_id
-				plant.coord_source = u"CARMA data"
-				powerwatch_database[plant_id] = plant
-				carma_id_used.append(matching_carma_id)
-				database_additions["WRI with CARMA lat/long data"]['count'] += 1
-				database_additions["WRI with CARMA lat/long data"]['capacity'] += plant.capacity
-				continue
-	# Note: Would eventually like to refine CARMA locations - known to be inaccurate in some cases
-
-# STEP 3: Go through GEO database and add plants from small countries
-# Plants in this database only have numeric ID (no prefix) because of concordance matching
-for plant_id,plant in geo_database.iteritems():
-	# Catch errors if plants do not have a correct country assigned
-	powerwatch_datadump[plant_id] = plant
-	if plant.country not in country_dictionary.keys():
-		print("Plant {0} has country {1} - not found.".format(plant_id,plant.country))
-		continue
-	if country_dictionary[plant.country].use_geo:
-		if (plant.location.latitude and plant.location.longitude) and (plant.location.latitude != 0 and plant.location.longitude != 0):
-			plant.coord_source = u"GEO data"
-			plant.idnr = plant_id
-			powerwatch_database[plant_id] = plant
-			database_additions['GEO']['count'] += 1
-			try:
-				database_additions['GEO']['capacity'] += plant.capacity
-			except:
-				f_log.write("Attribute Warning: GEO plant {0} does not have valid capacity information <{1}>\n".format(plant_id, plant.capacity))
-
-# STEP 4: Add China coal plants from SourceWatch
-for plant_id,plant in sourcewatch_database.iteritems():
-	powerwatch_datadump[plant_id] = plant
-	if (plant.location.latitude and plant.location.longitude) and (plant.location.latitude != 0 and plant.location.longitude != 0):
-		plant.coord_source = u"SourceWatch data"
-		powerwatch_database[plant_id] = plant
-		database_additions['SourceWatch']['count'] += 1
-		database_additions['SourceWatch']['capacity'] += plant.capacity
+
+# STEP 0: Identify countries with automated data from .has_api flag.
+# Source databases are loaded when a partition needs to be (re)computed.
+api_countries = [country_name for country_name, country in country_dictionary.iteritems() if country.has_api == 1]
+country_info = [pw.COUNTRY_INFORMATION_FILE]
+
+partitions = []
+for country_name in api_countries:
+	database_filename = COUNTRY_DATABASE_FILE.replace("COUNTRY", country_dictionary[country_name].iso_code)
+	key = fingerprint([database_filename], country_name)
+	partitions.append(cached_partition(country_dictionary[country_name].iso_code, key,
+						lambda country_name=country_name: country_step(country_name)))
+wri_key = fingerprint([WRI_DATABASE_FILE, GEO_DATABASE_FILE, CARMA_DATABASE_FILE, pw.MASTER_PLANT_CONCORDANCE_FILE] + country_info)
+wri_partition = cached_partition("WRI", wri_key, wri_step)
+partitions.append(wri_partition)
+partitions.append(cached_partition("GEO", fingerprint([GEO_DATABASE_FILE] + country_info),
+					lambda: merge.add_geo_plants(source_database("GEO"), country_dictionary)))
+partitions.append(cached_partition("SourceWatch", fingerprint([SOURCEWATCH_DATABASE_FILE]),
+					lambda: merge.add_sourcewatch_plants(source_database("SourceWatch"))))
+for partition in partitions:
+	for warning in partition['warnings']:
+		print(warning)
+
+# Merge partitions in step order, tracking counts for each data source
+merged = merge.merge_partitions(partitions, api_countries + merge.MULTINATIONAL_SOURCES)
+powerwatch_database = merged['plants']
+powerwatch_datadump = merged['datadump']
+database_additions = merged['additions']
+f_log.writelines(merged['log'])
 
 # STEP 5: Estimate generation for plants without reported generation for target year
 count_plants_with_generation = 0
@@ -211,25 +209,27 @@ print("PowerWatch built.")
 if DATA_DUMP:
 	print("Dumping all the data...")
 	# STEP 7.1: Label plants in datadump
-	pw_idnrs = powerwatch_database.keys()
-	for plant_id,plant in powerwatch_datadump.iteritems():
-		if plant_id in pw_idnrs:
-			plant.idnr = plant_id + ",Yes"
-		else:
-			plant.idnr = plant_id + ",No"
+	merge.label_datadump(powerwatch_database, powerwatch_datadump)
 
 	# STEP 7.2: Add unused CARMA plants
-	for plant_id,plant in carma_database.iteritems():
-		plant.coord_source = u"CARMA data"
-		if plant_id in carma_id_used:
-			continue
-		else:
-			plant.idnr = plant_id + ",No"
-			powerwatch_datadump[plant_id] = plant
+	carma_key = fingerprint([CARMA_DATABASE_FILE], wri_key)
+	carma_partition = cached_partition("CARMA", carma_key,
+						lambda: merge.add_unused_carma_plants(source_database("CARMA"), wri_partition['carma_id_used']))
+	partitions.append(carma_partition)
+	for plant_id in sorted(carma_partition['datadump']):
+		powerwatch_datadump[plant_id] = carma_partition['datadump'][plant_id]
 
 	# STEP 8: Dump data
 	print("Dumped {0} plants.".format(len(powerwatch_datadump)))
 	pw.write_csv_file(powerwatch_datadump,POWERWATCH_CSV_DUMPFILE,dump=True)
 	print("Data dumped.")
 
+# save file signatures so unchanged inputs are not hashed again
+with open(_signatures_file, 'wb') as f:
+	cPickle.dump(_signatures, f, cPickle.HIGHEST_PROTOCOL)
+
+# report per-step counters and timings (cached steps show their original run time)
+for line in merge.step_report(partitions):
+	print(line)
+
 print("Finished.")
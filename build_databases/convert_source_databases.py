@@ -0,0 +1,29 @@
+"""
+PowerWatch
+convert_source_databases.py
+Rewrite legacy pickled source databases (*-Database.bin) in the PWDB format.
+- Files already in the PWDB format are left unchanged.
+- Use --legacy to convert back to plain pickles readable by older versions.
+"""
+
+import argparse
+import glob
+import sys, os
+
+sys.path.insert(0, os.pardir)
+import powerwatch as pw
+
+parser = argparse.ArgumentParser()
+parser.add_argument("databases", nargs="*", help="database files; all files in source_databases/ by default")
+parser.add_argument("--legacy", help="write plain pickles instead", action="store_true")
+args = parser.parse_args()
+
+databases = args.databases or sorted(glob.glob(os.path.join(pw.SOURCE_DB_BIN_DIR, "*-Database.bin")))
+for filename in databases:
+	if pw.is_binary_database(filename) != args.legacy:
+		print("{0} is already converted.".format(os.path.basename(filename)))
+		continue
+	plants = pw.load_database(filename)
+	savedir, basename = os.path.split(os.path.abspath(filename))
+	pw.save_database(plants, basename[:-len("-Database.bin")], savedir, legacy=args.legacy)
+	print("Converted {0} ({1} plants).".format(basename, len(plants)))
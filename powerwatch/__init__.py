@@ -0,0 +1,2979 @@
+# This Python file uses the following encoding: utf-8
+"""
+PowerWatch
+A library to support open-source power sector data.
+"""
+
+import datetime
+import time
+import argparse
+import requests
+#import geocoder	#TODO: use geocoder to determine if the location of a power plant is in corresponding country boarder
+import pickle
+import cPickle
+import mmap
+import struct
+import csv
+import sys
+import os
+import sqlite3
+import re
+import collections
+import itertools
+import operator
+import cStringIO
+import hashlib
+import json
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+
+### PARAMS ###
+# Folder directories
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RAW_DIR = os.path.join(ROOT_DIR, "raw_source_files")
+RESOURCES_DIR = os.path.join(ROOT_DIR, "resources")
+SOURCE_DB_BIN_DIR = os.path.join(ROOT_DIR, "source_databases")
+SOURCE_DB_CSV_DIR = os.path.join(ROOT_DIR, "source_databases_csv")
+OUTPUT_DIR = os.path.join(ROOT_DIR, "output_database")
+DIRs = {"raw": RAW_DIR, "resource": RESOURCES_DIR, "src_bin": SOURCE_DB_BIN_DIR,
+		"src_csv": SOURCE_DB_CSV_DIR, "root": ROOT_DIR, "output": OUTPUT_DIR}
+
+# Resource files
+FUEL_THESAURUS_DIR				= os.path.join(RESOURCES_DIR, "fuel_type_thesaurus")
+HEADER_NAMES_THESAURUS_FILE		= os.path.join(RESOURCES_DIR, "header_names_thesaurus.csv")
+COUNTRY_NAMES_THESAURUS_FILE	= os.path.join(RESOURCES_DIR, "country_names_thesaurus.csv")
+COUNTRY_INFORMATION_FILE		= os.path.join(RESOURCES_DIR, "country_information.csv")
+MASTER_PLANT_CONCORDANCE_FILE	= os.path.join(RESOURCES_DIR, "master_plant_concordance.csv")
+SOURCE_THESAURUS_FILE			= os.path.join(RESOURCES_DIR, "sources_thesaurus.csv")
+GENERATION_FILE      			= os.path.join(RESOURCES_DIR, "generation_by_country_by_fuel_2014.csv")
+
+# Encoding
+UNICODE_ENCODING = "utf-8"
+NO_DATA_UNICODE = u""	# used to indicate no data for a Unicode-type attribute in the PowerPlant class
+NO_DATA_NUMERIC = None	# used to indicate no data for a numeric-type attribute in the PowerPlant class
+NO_DATA_OTHER = None	# used to indicate no data for object- or list-type attribute in the PowerPlant class
+NO_DATA_SET = set([])	# used to indicate no data for set-type attribute in the PowerPlant class
+
+# Years reported as annual generation columns in the output database
+GENERATION_YEARS = range(2012, 2017)
+
+# Number of rows formatted in memory between writes in write_csv_file()
+CSV_CHUNK_ROWS = 5000
+
+# Raw file downloads
+DOWNLOAD_WORKERS = 4				# simultaneous downloads
+DOWNLOAD_RETRIES = 4				# attempts after the first one
+DOWNLOAD_BACKOFF = 1.0				# seconds before first retry, doubled after each
+DOWNLOAD_TIMEOUT = (10, 120)		# connect and read timeouts in seconds
+DOWNLOAD_CHUNK_SIZE = 1 << 16		# bytes streamed to disk at a time
+
+# Validators and content hashes of downloaded raw files, and the inputs each source database was built from
+RAW_CACHE_DIR = os.path.join(RAW_DIR, ".http_cache")
+# Shared resources every source database depends on
+BUILD_RESOURCE_INPUTS = [FUEL_THESAURUS_DIR, COUNTRY_NAMES_THESAURUS_FILE, COUNTRY_INFORMATION_FILE]
+# Source of this package, which every source database is also built with (see build_source_inputs())
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+### CLASS DEFINITIONS ###
+
+class _SlottedObject(object):
+	"""
+	Base class for compact data objects that store attributes in __slots__.
+
+	Pickled state is a plain dict of attribute values, which is the same
+	format written for the original dict-based classes; older *-Database.bin
+	files therefore load into the slotted classes and vice versa.
+	Slots starting with an underscore hold derived data and are not pickled.
+	"""
+	__slots__ = ()
+
+	def __getstate__(self):
+		return dict((attr, getattr(self, attr)) for attr in self.__slots__
+			if not attr.startswith('_') and hasattr(self, attr))
+
+	def __setstate__(self, state):
+		if isinstance(state, tuple):	# (dict_state, slot_state) from pickle protocol 2
+			dict_state, slot_state = state
+			state = dict(dict_state or {})
+			state.update(slot_state or {})
+		for attr, value in state.iteritems():
+			setattr(self, attr, value)
+
+
+_EMPTY_INDEX = {}	# shared year index of plants without generation data; never modified
+
+class PowerPlant(_SlottedObject):
+	"""Class representing a power plant."""
+	__slots__ = ('idnr', 'name', 'country', 'owner', 'nat_lang', 'capacity', 'cap_year',
+		'source', 'url', 'location', 'coord_source', 'fuel', 'generation',
+		'commissioning_year', 'estimated_generation_gwh', '_annual_index')
+
+	def __init__(self, plant_idnr, plant_name, plant_country,
+		plant_owner = NO_DATA_UNICODE, plant_nat_lang = NO_DATA_UNICODE,
+		plant_capacity = NO_DATA_NUMERIC, plant_cap_year = NO_DATA_NUMERIC,
+		plant_source = NO_DATA_OTHER, plant_source_url = NO_DATA_UNICODE,
+		plant_location = NO_DATA_OTHER, plant_coord_source = NO_DATA_UNICODE,
+		plant_fuel = NO_DATA_SET, plant_generation = NO_DATA_OTHER,
+		plant_commissioning_year = NO_DATA_NUMERIC,
+		plant_estimated_generation_gwh = NO_DATA_NUMERIC
+		):
+
+		# check and set data for attributes that should be unicode
+		unicode_attributes = {'idnr':plant_idnr, 'name':plant_name, 'country':plant_country, 'owner':plant_owner, 'nat_lang':plant_nat_lang, 'url':plant_source_url, 'coord_source':plant_coord_source}
+
+		for attribute,input_parameter in unicode_attributes.iteritems():
+			if input_parameter is NO_DATA_UNICODE:
+				setattr(self,attribute,NO_DATA_UNICODE)
+			else:
+				if type(input_parameter) is unicode:
+					setattr(self,attribute,input_parameter)
+				else:
+					try:
+						setattr(self,attribute,input_parameter.decode(UNICODE_ENCODING))
+					except:
+						print("Error trying to create plant with parameter {0} for attribute {1}.".format(input_parameter,attribute))
+						setattr(self,attribute,NO_DATA_UNICODE)
+
+		# check and set data for attributes that should be numeric
+		numeric_attributes = {'capacity':plant_capacity, 'cap_year':plant_cap_year, 'commissioning_year':plant_commissioning_year, 'estimated_generation_gwh':plant_estimated_generation_gwh}
+		for attribute,input_parameter in numeric_attributes.iteritems():
+			if input_parameter is NO_DATA_NUMERIC:
+				setattr(self,attribute,NO_DATA_NUMERIC)
+			else:
+				if type(input_parameter) is float or type(input_parameter) is int:
+					setattr(self,attribute,input_parameter)
+				else:
+					try:
+						setattr(self,attribute,float(input_parameter))	# NOTE: sub-optimal; may want to throw an error here instead
+					except:
+						print("Error trying to create plant with parameter {0} for attribute {1}.".format(input_parameter,attribute))
+
+		# check and set data for attributes that should be lists
+		list_attributes = {'generation': plant_generation}
+		for attribute, input_parameter in list_attributes.iteritems():
+			if attribute == 'generation' and input_parameter is NO_DATA_OTHER:
+				#setattr(self, attribute, [PlantGenerationObject()])
+				setattr(self, attribute, NO_DATA_OTHER)
+			elif attribute == 'generation' and type(input_parameter) is PlantGenerationObject:
+				setattr(self, attribute, [input_parameter])
+			else: # assume list/tuple of PlantGenerationObject
+				setattr(self, attribute, list(input_parameter))
+
+		# check and set fuel types
+		# TODO: check that fuels are valid standardized fuels
+		if not plant_fuel:
+			setattr(self,'fuel',NO_DATA_SET.copy())
+		elif type(plant_fuel) is unicode:
+			setattr(self,'fuel',set([plant_fuel]))
+		elif type(plant_fuel) is str:
+			setattr(self,'fuel',set([plant_fuel.decode(UNICODE_ENCODING)]))
+		elif type(plant_fuel) is list:
+			setattr(self,'fuel',set(plant_fuel))
+		elif type(plant_fuel) is set:
+			setattr(self,'fuel',plant_fuel)
+		else:
+			print("Error trying to create plant with fuel of type {0}.".format(plant_fuel))
+			setattr(self,'fuel',NO_DATA_SET.copy())
+
+		# set data for other attributes
+		object_attributes = {'source': plant_source, 'location': plant_location}
+		for attribute, input_parameter in object_attributes.iteritems():
+			if attribute == 'source' and type(input_parameter) is not SourceObject:
+				if type(input_parameter) is str:
+					setattr(self, attribute, format_string(input_parameter))
+				elif type(input_parameter) is unicode:
+					setattr(self, attribute, format_string(input_parameter, encoding = None))
+				else:
+					setattr(self, attribute, NO_DATA_UNICODE)
+			elif attribute == 'location' and type(input_parameter) is not LocationObject:
+				setattr(self, attribute, LocationObject())
+			else:  # everything OK
+				setattr(self, attribute, input_parameter)
+
+
+	def annual(self, year):
+		"""
+		Annual generation in GWh reported for `year`, or None.
+
+		Same result as `annual_generation(plant.generation, year)`, but looked up
+		in a per-plant index built on first use. The index is rebuilt when
+		`generation` is replaced or changes length; call `reindex_generation()`
+		after editing generation records in place.
+		"""
+		return self._generation_index().get(year)
+
+	def annual_range(self, first_year, last_year):
+		"""List of `annual()` values for each year from `first_year` to `last_year` inclusive."""
+		index = self._generation_index()
+		return [index.get(year) for year in xrange(first_year, last_year + 1)]
+
+	def reindex_generation(self):
+		"""Discard the index used by `annual()`, e.g. after editing generation records in place."""
+		self._annual_index = None
+
+	def _generation_index(self):
+		gen_list = self.generation
+		if not gen_list:
+			return _EMPTY_INDEX
+		cached = getattr(self, '_annual_index', None)
+		if cached is None or cached[0] is not gen_list or cached[1] != len(gen_list):
+			cached = (gen_list, len(gen_list), index_annual_generation(gen_list))
+			self._annual_index = cached
+		return cached[2]
+
+	def __repr__(self):
+		"""Representation of the PowerPlant."""
+		return 'PowerPlant: ' + str(self.idnr)
+
+	def __str__(self):
+		"""String representation of the PowerPlant."""
+		try:
+			s = ['{',
+				'  id: ' + str(self.idnr),
+				'  name: ' + str(self.name),
+				'  fuel: ' + str(self.fuel),
+				'  owner: ' + str(self.owner),
+				'  capacity: ' + str(self.capacity),
+				'  has_location: ' + str(bool(self.location)),
+				'}']
+			return '\n'.join(s)
+		except:
+			return self.__repr__()
+
+class MasterPlant(object):
+	def __init__(self, master_idnr, matches):
+		"""Plant identifier in cases of unit-level data, not plant-level."""
+		self.idnr			= master_idnr
+		self.matches		= matches
+
+class SourceObject(object):
+	def __init__(self, name, priority, country,
+				url = NO_DATA_UNICODE, year = NO_DATA_NUMERIC):
+		"""
+		Class holding information about where powerplant data comes from.
+
+		Parameters
+		----------
+		name : str
+			Entity/ministry/department/report/dataset providing the data.
+		priority : int
+			Tier (1-5) of source updatability and format.
+		country : str
+			Country/region/scope of data source.
+		url : str
+			URL where data can be repeatably accessed.
+		year : int
+			Time when data was collected/released.
+		"""
+		self.name			= name
+		self.country		= country
+		self.priority		= priority
+		self.url			= url
+		self.year			= year
+
+
+class CountryObject(object):
+	def __init__(self, primary_name, iso_code, iso_code2, geo_name, carma_name, iea_name, has_api, use_geo, fusion_table_id):
+		"""
+		Class holding information on a specific country.
+
+		Parameters
+		----------
+		primary_name : str
+			Human-readable name.
+		iso_code : str
+			3-character ISO name.
+		iso_code2 : str
+			2-character ISO name.
+		geo_name : str
+			Name used by the Global Energy Observatory (GEO) database.
+		carma_name : str
+			Name used by the CARMA database.
+		iea_name: str
+			Name used by the IEA statistics website.
+		has_api : int
+			1 or 0 depending on automatic energy report releases.
+		use_geo : int
+			1 or 0 depending on whether GEO is the sole source of data.
+		fusion_table_id : str
+			Alphanumeric id for fusion table where data is stored.
+
+		"""
+		self.primary_name	= primary_name
+		self.iso_code		= iso_code
+		self.iso_code2		= iso_code2
+		self.geo_name		= geo_name
+		self.carma_name		= carma_name
+		self.iea_name		= iea_name
+		self.has_api		= has_api
+		self.use_geo		= use_geo
+		self.fusion_table_id = fusion_table_id
+
+
+class LocationObject(_SlottedObject):
+	__slots__ = ('description', 'latitude', 'longitude')
+
+	def __init__(self,description=u"",latitude=None,longitude=None):
+		"""
+		Class holding information on the location (lat, lon) of a powerplant.
+
+		Parameters
+		----------
+		description : unicode
+			Note on how the location has been identified.
+		latitude : float
+			WGS84 (EPSG:4326)
+		longitude : float
+			WGS84 (EPSG:4326)
+
+		"""
+		self.description	= description
+		self.latitude		= latitude
+		self.longitude		= longitude
+
+	def __repr__(self):
+		lat = self.latitude
+		lon = self.longitude
+		desc = self.description
+		return 'Location: lat={0}; lon={1}; desc={2}'.format(lat, lon, desc)
+
+	def __nonzero__(self):
+		"""Boolean checking."""
+		return (self.longitude is not None) and (self.latitude is not None)
+
+
+class PlantGenerationObject(_SlottedObject):
+	__slots__ = ('gwh', 'start_date', 'end_date', 'source', 'estimated')
+
+	def __init__(self, gwh=None, start_date=None, end_date=None, source=None, estimated=False):
+		"""
+		Class holding information on the generation of a powerplant.
+
+		Parameters
+		----------
+		gwh : float
+			Electricity generation in units of GigaWatt Hours.
+		start_date : datetime
+			Start date for the generation period.
+		end_date : datetime
+			End date for the generation period.
+		source : unicode
+			Source (URL/name) that produced the data.
+		estimated: boolean
+			Whether data is reported value or estimated from a model.
+
+		Raises
+		------
+		ValueError if `end_date` is before `start_date`.
+		TypeError if `start_date` or `end_date` is not a datetime.
+
+		"""
+		self.gwh = gwh
+		if type(self.gwh) is int:
+			self.gwh = float(self.gwh)
+
+		if type(start_date) in [type(None), datetime.date]:
+			self.start_date = start_date
+		else:
+			self.start_date = NO_DATA_OTHER
+		if type(end_date) in [type(None), datetime.date]:
+			self.end_date = end_date
+		else:
+			self.end_date = NO_DATA_OTHER
+
+		if type(source) is str:
+			setattr(self, 'source', format_string(source))
+		elif type(source) is unicode:
+			setattr(self, 'source', format_string(source, encoding = None))
+		else:
+			setattr(self, 'source', NO_DATA_UNICODE)
+
+		if type(self.start_date) != type(self.end_date):
+			raise TypeError('start_date and end_date must both be datetime objects or None')
+
+		if self.end_date < self.start_date:
+			raise ValueError('end_date must be after start_date')
+
+		if type(estimated) is bool:
+			self.estimated = estimated
+		else:
+			self.estimated = False
+
+	def __repr__(self):
+		start = None
+		end = None
+		if self.start_date:
+			start = self.start_date.strftime('%Y-%m-%d')
+		if self.end_date:
+			end = self.end_date.strftime('%Y-%m-%d')
+		return 'PlantGeneration: GWH={0}; start={1}; end={2}'.format(self.gwh, start, end)
+
+	def __str__(self):
+		start = None
+		end = None
+		if self.start_date:
+			start = self.start_date.strftime('%Y-%m-%d')
+		if self.end_date:
+			end = self.end_date.strftime('%Y-%m-%d')
+		s = ['{',
+			'  GWH: ' + str(self.gwh),
+			'  start: ' + str(start),
+			'  end: ' + str(end),
+			'  source: ' + str(self.source.encode(UNICODE_ENCODING)),
+			'}'
+			]
+		return '\n'.join(s)
+
+	def __nonzero__(self):
+		"""Boolean checking."""
+		return (self.gwh is not None) \
+			and (self.start_date is not None) \
+			and (self.end_date is not None)
+
+	@staticmethod
+	def create(gwh, year=None, month=None, source=None):
+		"""
+		Construct a PlantGenerationObject for a certain year or month in year.
+
+		Parameters
+		----------
+		gwh : float
+			Electricty generation in GigaWatt*Hour.
+		year : int, optional
+			Year the generation data corresponds to.
+		month : int, optional
+			Month the generation data corresponds to.
+		source : str, optional
+			Identifying value for the source of the generation data.
+
+		Returns
+		-------
+		PlantGenerationObject
+
+		"""
+		if year is None:
+			return PlantGenerationObject(gwh, source=source)
+		if year is not None and month is None:
+			start = datetime.date(year, 1, 1)
+			end = datetime.date(year, 12, 31)
+			return PlantGenerationObject(gwh, start, end, source)
+		if year is not None and month is not None:
+			start = datetime.date(year, month, 1)
+			future_month = start.replace(day=28) + datetime.timedelta(days=4)
+			end =  future_month - datetime.timedelta(days=future_month.day)
+			return PlantGenerationObject(gwh, start, end, source)
+		else:  # year is None and month is not None
+			return PlantGenerationObject(gwh, source=source)
+
+
+def index_annual_generation(gen_list):
+	"""
+	Index generation data by calendar year.
+
+	A year gets the generation of the first record in `gen_list` that covers
+	a full year (364 or 365 days) and overlaps that calendar year.
+
+	Parameters
+	----------
+	gen_list : list of PlantGenerationObject
+		Input generation data.
+
+	Returns
+	-------
+	Dict of {year: gwh}; empty if `gen_list` is None.
+
+	"""
+	return dict((year, gen.gwh) for year, gen in _annual_generation_records(gen_list).iteritems())
+
+def _annual_generation_records(gen_list):
+	"""Dict of {year: PlantGenerationObject} selected as in `index_annual_generation()`."""
+	records = {}
+	if gen_list == None:
+		return records
+
+	for gen in gen_list:
+		if not gen:
+			continue
+		if (gen.end_date - gen.start_date).days not in [364, 365]:
+			continue
+		for year in xrange(gen.start_date.year, gen.end_date.year + 1):
+			if year not in records:
+				records[year] = gen
+	return records
+
+def annual_generation(gen_list, year):
+	"""
+	Compute the aggregated annual generation for a certain year.
+
+	Parameters
+	----------
+	gen_list : list of PlantGenerationObject
+		Input generation data.
+	year : int
+		Year to aggregate data.
+
+	Returns
+	-------
+	Float if generation data is found in the year, otherwise None.
+
+	"""
+	return index_annual_generation(gen_list).get(year)
+
+def annual_generations(gen_list, years):
+	"""
+	Compute the aggregated annual generation for several years at once.
+
+	Gives the same result as calling `annual_generation()` for each year,
+	with a single pass over `gen_list`.
+
+	Parameters
+	----------
+	gen_list : list of PlantGenerationObject
+		Input generation data.
+	years : list of int
+		Years to aggregate data.
+
+	Returns
+	-------
+	List with one entry per year: float if generation data is found in the year, otherwise None.
+
+	"""
+	index = index_annual_generation(gen_list)
+	return [index.get(year) for year in years]
+
+def annual_generation_matrix(plants, years):
+	"""
+	Annual generation of many plants as a plants x years array.
+
+	Parameters
+	----------
+	plants : list of PowerPlant
+		Plants, one per row.
+	years : list of int
+		Years, one per column.
+
+	Returns
+	-------
+	np.ndarray of float
+		Generation in GWh from `PowerPlant.annual()`; NaN where there is no data.
+
+	"""
+	columns = dict((year, j) for j, year in enumerate(years))
+	rows, cols, values = [], [], []
+	for row, plant in enumerate(plants):
+		for year, gwh in plant._generation_index().iteritems():
+			j = columns.get(year)
+			if j is not None:
+				rows.append(row)
+				cols.append(j)
+				values.append(gwh)
+	matrix = np.full((len(plants), len(years)), np.nan)
+	matrix[rows, cols] = values
+	return matrix
+
+
+### ARGUMENT PARSER ###
+
+def build_arg_parser():
+	"""Parse command-line system arguments."""
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--download", help = "download raw files", action="store_true")
+	parser.add_argument("--force", help = "download and rebuild even if raw files are unchanged", action="store_true")
+	return parser.parse_args()
+
+### RAW FILE CACHE ###
+
+def _read_json(path):
+	"""Read a JSON cache file, or get None if it is missing or unreadable."""
+	try:
+		with open(path, 'rb') as f:
+			return json.load(f)
+	except (IOError, ValueError):
+		return None
+
+def _write_json(path, data):
+	"""Write a JSON cache file atomically."""
+	directory = os.path.dirname(path)
+	if not os.path.isdir(directory):
+		try:
+			os.makedirs(directory)
+		except OSError:
+			if not os.path.isdir(directory):
+				raise
+	temp_path = "{0}.{1}.tmp".format(path, os.getpid())
+	with open(temp_path, 'wb') as f:
+		json.dump(data, f, indent=1, sort_keys=True)
+	if os.name == "nt" and os.path.exists(path):
+		os.remove(path)
+	os.rename(temp_path, path)
+
+def file_signature(path, known=None):
+	"""
+	Get the stat fingerprint and content hash of a file or directory.
+
+	Parameters
+	----------
+	path : str
+		File or directory.
+	known : dict, optional
+		Previous signature of `path`; its hash is reused if the stat fingerprint
+		is unchanged, so unchanged files are not re-read.
+
+	Returns
+	-------
+	signature : dict
+		{'stat': JSON-compatible (mtime, size) fingerprint, 'sha1': content hash}
+	"""
+	stat = json.loads(json.dumps(_resource_stat(path)))
+	if known is not None and known.get('stat') == stat:
+		return {'stat': stat, 'sha1': known['sha1']}
+	return {'stat': stat, 'sha1': _resource_hash(path)}
+
+def _http_cache_path(url, cache_dir):
+	"""Get the cache file recording validators for a URL."""
+	return os.path.join(cache_dir, "urls", hashlib.sha1(url.encode(UNICODE_ENCODING)).hexdigest() + ".json")
+
+def http_cache_headers(url, filename, cache_dir=RAW_CACHE_DIR):
+	"""
+	Get conditional request headers for a URL previously downloaded to `filename`.
+
+	Headers are only returned if `filename` still has the content recorded
+	when it was downloaded, so a locally modified or deleted file is fetched again.
+
+	Returns
+	-------
+	headers : dict
+		If-None-Match and/or If-Modified-Since headers; empty if not cached.
+	"""
+	entry = _read_json(_http_cache_path(url, cache_dir))
+	if entry is None or entry.get('file') != os.path.abspath(filename) or not os.path.isfile(filename):
+		return {}
+	if file_signature(filename, entry)['sha1'] != entry['sha1']:
+		return {}
+	headers = {}
+	if entry.get('etag'):
+		headers['If-None-Match'] = entry['etag']
+	if entry.get('last_modified'):
+		headers['If-Modified-Since'] = entry['last_modified']
+	return headers
+
+def record_http_cache(url, filename, response_headers, cache_dir=RAW_CACHE_DIR):
+	"""
+	Record the validators and content hash of a completed download.
+
+	Returns
+	-------
+	changed : bool
+		Whether the content differs from the previous download of `url`.
+	"""
+	path = _http_cache_path(url, cache_dir)
+	previous = _read_json(path) or {}
+	signature = file_signature(filename)
+	_write_json(path, {
+		'url': url,
+		'file': os.path.abspath(filename),
+		'etag': response_headers.get('ETag'),
+		'last_modified': response_headers.get('Last-Modified'),
+		'stat': signature['stat'],
+		'sha1': signature['sha1'],
+	})
+	return previous.get('sha1') != signature['sha1']
+
+def _build_stamp_path(output_file, cache_dir):
+	"""Get the cache file recording the inputs an output file was built from."""
+	relpath = os.path.relpath(os.path.abspath(output_file), ROOT_DIR)
+	return os.path.join(cache_dir, "builds", relpath.replace(os.sep, "__") + ".json")
+
+def build_source_inputs():
+	"""Get the source files of the powerwatch package (not compiled files, which change when recompiled)."""
+	return [os.path.join(PACKAGE_DIR, name) for name in sorted(os.listdir(PACKAGE_DIR)) if name.endswith(".py")]
+
+def _input_paths(input_files):
+	"""Get the sorted absolute paths of build inputs, including shared resources and the package source."""
+	return sorted(set(os.path.abspath(p) for p in list(input_files) + BUILD_RESOURCE_INPUTS + build_source_inputs()))
+
+def inputs_changed(input_files, filename, savedir=OUTPUT_DIR, force=False, cache_dir=RAW_CACHE_DIR):
+	"""
+	Check whether a database must be rebuilt because its inputs changed.
+
+	Compares the content of the input files (plus the shared thesauri in
+	BUILD_RESOURCE_INPUTS and the source of the powerwatch package) with the
+	content recorded when the database was last saved with
+	`save_database(..., inputs=input_files)`.
+
+	Parameters
+	----------
+	input_files : list of str
+		Raw files and other files the database is built from, including the
+		builder script itself (`__file__`) so that changes to its parsing rebuild it.
+	filename : str
+		Base filename of the database, as passed to save_database().
+	savedir : str, optional
+		Directory in which the database is saved.
+	force : bool, optional
+		Always report a change (e.g. for the builder's --force flag).
+	cache_dir : str, optional
+		Directory of the raw file cache.
+
+	Returns
+	-------
+	changed : bool
+		True if the database is missing, was built from different inputs, or
+		any input changed; False if it is up to date.
+	"""
+	output_file = os.path.join(savedir, filename + '-Database.bin')
+	if force or not os.path.exists(output_file):
+		return True
+	stamp = _read_json(_build_stamp_path(output_file, cache_dir))
+	if stamp is None:
+		return True
+	recorded = stamp.get('inputs', {})
+	paths = _input_paths(input_files)
+	if sorted(recorded) != paths:
+		return True
+	for path in paths:
+		known = recorded[path]
+		if known is None:
+			if os.path.exists(path):
+				return True
+		elif not os.path.exists(path) or file_signature(path, known)['sha1'] != known['sha1']:
+			return True
+	print(u"Inputs unchanged since {0} was built; use --force to rebuild.".format(os.path.basename(output_file)))
+	return False
+
+def record_inputs(input_files, output_file, cache_dir=RAW_CACHE_DIR):
+	"""Record the content of the inputs `output_file` was built from; see inputs_changed()."""
+	inputs = {}
+	for path in _input_paths(input_files):
+		inputs[path] = file_signature(path) if os.path.exists(path) else None
+	_write_json(_build_stamp_path(output_file, cache_dir), {'output': os.path.abspath(output_file), 'inputs': inputs})
+
+
+### DOWNLOADS ###
+
+class DownloadError(Exception):
+	"""Raised when a file cannot be downloaded; `retryable` is False for permanent failures."""
+	def __init__(self, message, retryable = True):
+		Exception.__init__(self, message)
+		self.retryable = retryable
+
+def make_download_session(workers = DOWNLOAD_WORKERS):
+	"""
+	Make a requests session whose connection pool is shared by all download workers.
+
+	Parameters
+	----------
+	workers : int
+		Number of workers that will use the session concurrently.
+
+	Returns
+	-------
+	session : requests.Session
+		Session keeping up to `workers` connections alive per host.
+	"""
+	session = requests.Session()
+	adapter = requests.adapters.HTTPAdapter(pool_connections = workers, pool_maxsize = workers)
+	session.mount("http://", adapter)
+	session.mount("https://", adapter)
+	return session
+
+def _retryable_status(status_code):
+	"""Return True if a failed HTTP status is worth retrying."""
+	return status_code >= 500 or status_code in (408, 429)
+
+def _report_progress(filename, done, total):
+	"""Print download progress for one file."""
+	name = os.path.basename(filename)
+	if total:
+		print(u"...{0}: {1} of {2} bytes ({3:.0f}%)".format(name, done, total, 100.0 * done / total))
+	else:
+		print(u"...{0}: {1} bytes".format(name, done))
+
+def download_file(url, filename, session = None, post_data = None, retries = DOWNLOAD_RETRIES,
+					backoff = DOWNLOAD_BACKOFF, timeout = DOWNLOAD_TIMEOUT,
+					chunk_size = DOWNLOAD_CHUNK_SIZE, progress = _report_progress, cache_dir = None):
+	"""
+	Stream a single URL to a local file.
+
+	The response is written in chunks to `filename` + '.part', which is renamed
+	to `filename` only once the transfer is complete, so an interrupted download
+	never leaves a truncated file in place of a good one. A GET download that
+	finds an existing .part file resumes it with an HTTP Range request.
+	Connection errors, truncated transfers and 5xx/408/429 responses are retried
+	with exponential backoff; other HTTP errors fail immediately.
+	With a `cache_dir`, a GET for a file downloaded before is made conditional
+	on its ETag and Last-Modified validators, and a 304 response leaves the
+	local file as it is.
+
+	Parameters
+	----------
+	url : str
+		URL to download.
+	filename : str
+		Local path to save the file to.
+	session : requests.Session, optional
+		Session to reuse connections from; a new one is made if not given.
+	post_data : dict of {str: str}, optional
+		Params and values for a POST request. If not specified, use GET.
+	retries : int
+		Number of attempts after the first one.
+	backoff : float
+		Seconds to wait before the first retry; doubled after each attempt.
+	timeout : float or tuple of float
+		Connect and read timeouts passed to requests.
+	chunk_size : int
+		Bytes read from the response and written to disk at a time.
+	progress : callable, optional
+		Called as progress(filename, bytes_done, bytes_total) every ~10% of the
+		file and at completion; bytes_total is None if the size is unknown.
+	cache_dir : str, optional
+		Directory of the raw file cache (see RAW_CACHE_DIR); if not given, the
+		file is always downloaded.
+
+	Returns
+	-------
+	size : int
+		Size of the downloaded file in bytes.
+
+	Raises
+	------
+	DownloadError
+		If the file could not be downloaded.
+	"""
+	if session is None:
+		session = make_download_session(1)
+	part_file = filename + ".part"
+	if post_data and os.path.exists(part_file):
+		# POST responses cannot be resumed
+		os.remove(part_file)
+
+	attempt = 0
+	while True:
+		try:
+			offset = os.path.getsize(part_file) if os.path.exists(part_file) else 0
+			headers = {"Range": "bytes={0}-".format(offset)} if offset else {}
+			if cache_dir and not offset and not post_data:
+				headers.update(http_cache_headers(url, filename, cache_dir))
+			if post_data:
+				response = session.post(url, data = post_data, stream = True, timeout = timeout)
+			else:
+				response = session.get(url, headers = headers, stream = True, timeout = timeout)
+			try:
+				if response.status_code == 304:
+					if progress:
+						print(u"...{0}: not modified".format(os.path.basename(filename)))
+					return os.path.getsize(filename)
+				if response.status_code == 416:
+					# saved part does not match the remote file; start over
+					os.remove(part_file)
+					raise DownloadError(u"Range not satisfiable for {0}".format(url))
+				if response.status_code != 206:
+					offset = 0
+				if response.status_code >= 400:
+					raise DownloadError(u"HTTP {0} for {1}".format(response.status_code, url),
+										retryable = _retryable_status(response.status_code))
+
+				length = response.headers.get("Content-Length")
+				total = offset + int(length) if length is not None else None
+				done = offset
+				next_report = total / 10 if total else None
+				with open(part_file, "ab" if offset else "wb") as f:
+					for chunk in response.iter_content(chunk_size):
+						f.write(chunk)
+						done += len(chunk)
+						if progress and next_report and done >= next_report and done < total:
+							progress(filename, done, total)
+							next_report = done + total / 10
+			finally:
+				response.close()
+
+			if total is not None and done != total:
+				raise DownloadError(u"Received {0} of {1} bytes for {2}".format(done, total, url))
+			if os.name == "nt" and os.path.exists(filename):
+				os.remove(filename)
+			os.rename(part_file, filename)
+			if cache_dir and not post_data:
+				record_http_cache(url, filename, response.headers, cache_dir)
+			if progress:
+				progress(filename, done, total)
+			return done
+
+		except (DownloadError, requests.RequestException, IOError) as e:
+			if not getattr(e, "retryable", True):
+				raise
+			if attempt >= retries:
+				raise DownloadError(u"Failed to download {0} after {1} attempts: {2}".format(url, attempt + 1, e))
+			wait = backoff * 2 ** attempt
+			print(u"...retrying {0} in {1:.1f}s ({2})".format(os.path.basename(filename), wait, e))
+			time.sleep(wait)
+			attempt += 1
+
+def download_files(file_savedir_url, post_data = None, workers = DOWNLOAD_WORKERS, session = None, **kwargs):
+	"""
+	Download several files concurrently with a bounded pool of workers.
+
+	Parameters
+	----------
+	file_savedir_url : dict of {str: str}
+		Dict with local filepaths as keys and URL as values.
+	post_data : dict of {str: str}, optional
+		Params and values for POST requests. If not specified, use GET.
+	workers : int
+		Maximum number of simultaneous downloads.
+	session : requests.Session, optional
+		Session shared by all workers; a new one is made if not given.
+	**kwargs
+		Passed on to download_file().
+
+	Returns
+	-------
+	errors : dict of {str: DownloadError}
+		Failed downloads, keyed by local filepath; empty if all succeeded.
+	"""
+	if not file_savedir_url:
+		return {}
+	workers = max(1, min(workers, len(file_savedir_url)))
+	if session is None:
+		session = make_download_session(workers)
+
+	def fetch(item):
+		savedir, url = item
+		try:
+			download_file(url, savedir, session = session, post_data = post_data, **kwargs)
+			return savedir, None
+		except DownloadError as e:
+			return savedir, e
+
+	pool = ThreadPool(workers)
+	try:
+		results = pool.map(fetch, sorted(file_savedir_url.iteritems()))
+	finally:
+		pool.close()
+		pool.join()
+	return dict((savedir, error) for savedir, error in results if error is not None)
+
+def download(db_name = '', file_savedir_url = {}, post_data = {}):
+	"""
+	Fetch and download a database from an online source.
+
+	Parameters
+	----------
+	db_name : str
+		Identifying name for the database to be downloaded.
+	file_savedir_url : dict of {str: str}
+		Dict with local filepaths as keys and URL as values.
+	post_data: dict of {str: str}
+		Dict with params and values for POST request.
+		If not specified, use GET.
+		TO-DO: Extend to allow different values for each entry in file_savedir_url.
+
+	Returns
+	-------
+	rc : bool
+		True: If no download requested OR download requested and successful.
+		False: If download requested but no database name provided OR download 
+			requested but failed.
+	"""
+
+	args = build_arg_parser()
+	if not args.download:
+		print(u"Using raw data file(s) saved locally.")
+		return True
+
+	if db_name == '':
+		# Incorrect behavior, since db name should be specified, so return False.
+		print(u"Error: Download requested but no database name specified.")
+		return False
+
+	print(u"Downloading {0} database...".format(db_name))
+	errors = download_files(file_savedir_url, post_data, cache_dir = None if args.force else RAW_CACHE_DIR)
+	if errors:
+		for savedir in sorted(errors):
+			print(u"Error: {0}".format(errors[savedir]))
+		print(u"Error: Failed to download one or more files.")
+		return False
+	print(u"...done.")
+	return True
+
+
+### FILE PATHS ###
+
+def make_file_path(fileType = "root", subFolder = "", filename = ""):
+	"""
+	Construct a file path, creating the nested directories as needed.
+
+	Parameters
+	----------
+	fileType : str
+		Shortcut phrase for project directories. e.g. 'output', 'resource'
+	subFolder : str
+		Directory name (possibly nested) within `fileType` directory.
+	filename : str
+		File basename to append to directory path on returned filepath.
+
+	Raises
+	-----
+	ValueError if fileType is invalid (not in `DIRs`).
+	"""
+	# if path doesn't exist, create it
+	for key, path in DIRs.items():
+		if not os.path.exists(path):
+			os.mkdir(path)
+	# find/create directory and return path
+	try:
+		dst = DIRs[fileType]	# get root folder
+	except:
+		raise ValueError('Invalid directory shortcut phrase <{0}>'.format(fileType))
+	if subFolder:
+		subFolder_path = os.path.normpath(os.path.join(dst, subFolder))
+		if not os.path.exists(subFolder_path):
+			os.mkdir(subFolder_path)
+	return os.path.normpath(os.path.join(dst, subFolder, filename))
+
+### RESOURCE CACHE ###
+
+class ReadOnlyDict(dict):
+	"""Dict that raises TypeError on modification; copy with dict() to get a modifiable version."""
+	def _readonly(self, *args, **kwargs):
+		raise TypeError('Shared resource data is read-only; copy it with dict() first.')
+	__setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readonly
+
+	def __reduce__(self):
+		return (ReadOnlyDict, (dict(self),))
+
+	def __copy__(self):
+		return dict(self)
+
+	def __deepcopy__(self, memo):
+		import copy
+		return copy.deepcopy(dict(self), memo)
+
+def freeze_resource(value):
+	"""Get a read-only version of parsed resource data (dicts and lists, recursively)."""
+	if isinstance(value, dict):
+		return ReadOnlyDict((k, freeze_resource(v)) for k, v in value.iteritems())
+	if isinstance(value, list):
+		return tuple(freeze_resource(v) for v in value)
+	return value
+
+_resource_cache = {}		# (loader, abspath) -> [stat fingerprint, content hash, value]
+
+def _resource_stat(path):
+	"""Get (mtime, size) for a file, or for every file in a directory."""
+	if os.path.isdir(path):
+		return tuple((name, _resource_stat(os.path.join(path, name))) for name in sorted(os.listdir(path)))
+	st = os.stat(path)
+	return (st.st_mtime, st.st_size)
+
+def _resource_hash(path):
+	"""Get SHA-1 hex digest of a file, or of every file in a directory."""
+	sha = hashlib.sha1()
+	if os.path.isdir(path):
+		for name in sorted(os.listdir(path)):
+			sha.update(name)
+			sha.update(_resource_hash(os.path.join(path, name)))
+	else:
+		with open(path, 'rb') as f:
+			for chunk in iter(lambda: f.read(1 << 16), b''):
+				sha.update(chunk)
+	return sha.hexdigest()
+
+def load_resource(path, loader):
+	"""
+	Get parsed resource data, parsing the file at most once per version.
+
+	The result of `loader(path)` is kept for the life of the process and the
+	same read-only object (see `freeze_resource()`) is returned to every caller.
+	Each call checks the file's mtime and size; if these changed, the file is
+	hashed and only re-parsed if its content changed.
+
+	Parameters
+	----------
+	path : str
+		Resource file or directory.
+	loader : function
+		Function parsing `path` into a dict.
+
+	Returns
+	-------
+	Read-only parsed resource data.
+	"""
+	key = (loader, os.path.abspath(path))
+	stat = _resource_stat(path)
+	cached = _resource_cache.get(key)
+	if cached is not None:
+		if cached[0] == stat:
+			return cached[2]
+		content_hash = _resource_hash(path)
+		if cached[1] == content_hash:
+			cached[0] = stat
+			return cached[2]
+	else:
+		content_hash = _resource_hash(path)
+	value = freeze_resource(loader(path))
+	_resource_cache[key] = [stat, content_hash, value]
+	return value
+
+def clear_resource_cache():
+	"""Forget all cached resource data."""
+	_resource_cache.clear()
+
+### SOURCES ###
+
+def make_source_thesaurus(source_thesaurus = SOURCE_THESAURUS_FILE):
+	"""
+	Get dict mapping country name to `SourceObject` for the country.
+	The result is cached and shared between callers; see `load_resource()`.
+
+	Parameters
+	----------
+	source_thesaurus : str
+		Filepath for the source thesaurus data.
+
+	Returns
+	-------
+	Dict of {"Country": SourceObject} pairs.
+	"""
+	return load_resource(source_thesaurus, _read_source_thesaurus)
+
+def _read_source_thesaurus(source_thesaurus):
+	"""Parse the source thesaurus file (uncached)."""
+	with open(source_thesaurus, 'rbU') as f:
+		f.readline() # skip headers
+		csvreader = csv.reader(f)
+		source_thesaurus = {}
+		for row in csvreader:
+			source_name = row[0].decode(UNICODE_ENCODING)
+			source_country = row[1].decode(UNICODE_ENCODING)
+			source_url = row[2].decode(UNICODE_ENCODING)
+			source_priority = row[3].decode(UNICODE_ENCODING)
+			# TODO: get year info from other other file (download from Google Drive)
+			source_thesaurus[source_name] = SourceObject(name = source_name,
+				country = source_country, priority = source_priority,
+				url = source_url)
+		return source_thesaurus
+
+### FUEL TYPES ###
+def make_fuel_thesaurus(fuel_type_thesaurus=FUEL_THESAURUS_DIR):
+	"""
+	Get dict mapping standard fuel names to a list of alias values.
+	The result is cached and shared between callers; see `load_resource()`.
+
+	Parameters
+	----------
+	fuel_type_thesaurus : str
+		Filepath to the fuel thesaurus.
+
+	Returns
+	-------
+	Dict of {"primary fuel name": ['alt_name0', 'alt_name1', ...]}
+
+	"""
+	return load_resource(fuel_type_thesaurus, _read_fuel_thesaurus)
+
+def _read_fuel_thesaurus(fuel_type_thesaurus):
+	"""Parse the fuel thesaurus file (uncached)."""
+	fuel_thesaurus_files = os.listdir(fuel_type_thesaurus)
+	fuel_thesaurus = {}
+	for fuel_file in fuel_thesaurus_files:
+		with open(os.path.join(fuel_type_thesaurus, fuel_file), 'rbU') as fin:
+			standard_name = fin.readline().decode(UNICODE_ENCODING).rstrip()
+			#aliases = [x.decode('utf-8').lower().rstrip() for x in fin.readlines()]
+			aliases = [x.decode(UNICODE_ENCODING).rstrip() for x in fin.readlines()]
+			#fuel_thesaurus[standard_name] = [standard_name.lower()]
+			fuel_thesaurus[standard_name] = [standard_name]
+			fuel_thesaurus[standard_name].extend(aliases)
+	return fuel_thesaurus
+
+class _LRUCache(object):
+	"""Small least-recently-used cache mapping keys to values."""
+	def __init__(self, maxsize):
+		self.maxsize = maxsize
+		self._data = collections.OrderedDict()
+
+	def get(self, key, default=None):
+		try:
+			value = self._data.pop(key)
+		except KeyError:
+			return default
+		self._data[key] = value
+		return value
+
+	def put(self, key, value):
+		self._data.pop(key, None)
+		self._data[key] = value
+		if len(self._data) > self.maxsize:
+			self._data.popitem(last=False)
+
+	def clear(self):
+		self._data.clear()
+
+	def __len__(self):
+		return len(self._data)
+
+
+FUEL_DELIMITER_PATTERN = re.compile(u'/| y |,| and ')
+FUEL_MEMO_SIZE = 4096			# number of distinct fuel strings remembered by standardize_fuel()
+
+_fuel_index_cache = {}			# id(fuel_thesaurus) -> (fuel_thesaurus, number of fuels, alias index, memo)
+_reported_unmatched_fuels = set()
+
+def make_fuel_alias_index(fuel_thesaurus):
+	"""
+	Get dict mapping every fuel alias to its primary fuel name.
+
+	Parameters
+	----------
+	fuel_thesaurus : dict
+		Dict returned from `make_fuel_thesaurus()`.
+
+	Returns
+	-------
+	Dict of {'alt_name': 'primary fuel name'}. If an alias is listed for
+	more than one fuel, the first fuel in thesaurus order is used.
+
+	"""
+	alias_index = {}
+	for fuel_primary_name, fuel_synonyms in fuel_thesaurus.iteritems():
+		for synonym in fuel_synonyms:
+			alias_index.setdefault(synonym, fuel_primary_name)
+	return alias_index
+
+def _fuel_lookup(fuel_thesaurus):
+	"""
+	Get (alias index, memo) for a fuel thesaurus.
+	These are built once per thesaurus object; aliases added to an existing
+	fuel afterwards are not seen, so build a new thesaurus instead.
+	"""
+	cached = _fuel_index_cache.get(id(fuel_thesaurus))
+	if cached is None or cached[0] is not fuel_thesaurus or cached[1] != len(fuel_thesaurus):
+		cached = (fuel_thesaurus, len(fuel_thesaurus), make_fuel_alias_index(fuel_thesaurus), _LRUCache(FUEL_MEMO_SIZE))
+		_fuel_index_cache[id(fuel_thesaurus)] = cached
+	return cached[2], cached[3]
+
+def standardize_fuel(fuel_instance, fuel_thesaurus):
+	"""
+	Get set of primary fuel names from string of alternate names.
+	Results are remembered per input string, and strings that contain
+	unidentifiable fuels are reported only the first time they are seen.
+
+	Parameters
+	----------
+	fuel_instance : str
+		Non-standard fuel names separated by '/' (e.g. bitumen/sun/uranium).
+	fuel_thesaurus : dict
+		Dict returned from `make_fuel_thesaurus()`.
+
+	Returns
+	-------
+	fuel_set : set
+		Minimum set of primary fuel names corresponding to the input string.
+		Returns `NO_DATA_SET` if a fuel type cannot be identified.
+
+	Raises
+	------
+	TypeError if `fuel_instance` is not a string.
+
+	"""
+	alias_index, memo = _fuel_lookup(fuel_thesaurus)
+	return _standardize_fuel(fuel_instance, alias_index, memo)
+
+def _standardize_fuel(fuel_instance, alias_index, memo):
+	"""Implementation of `standardize_fuel()` for a given alias index and memo."""
+	if isinstance(fuel_instance, str):
+		fuel_instance_u = fuel_instance.decode(UNICODE_ENCODING)
+	elif isinstance(fuel_instance, unicode):
+		fuel_instance_u = fuel_instance
+	else:
+		raise TypeError('Fuel must be a string, not {0}'.format(type(fuel_instance)))
+
+	fuel_set = memo.get(fuel_instance_u)
+	if fuel_set is None:
+		fuel_set = set()
+		if fuel_instance_u != NO_DATA_UNICODE:
+			unidentified = False
+			for fuel in FUEL_DELIMITER_PATTERN.split(fuel_instance_u):
+				fuel_primary_name = alias_index.get(fuel.strip())
+				if fuel_primary_name is None:
+					unidentified = True
+				else:
+					fuel_set.add(fuel_primary_name)
+			if unidentified and fuel_instance_u not in _reported_unmatched_fuels:
+				_reported_unmatched_fuels.add(fuel_instance_u)
+				print(u"-Error: Couldn't identify fuel type {0}".format(fuel_instance_u))
+		fuel_set = frozenset(fuel_set)
+		memo.put(fuel_instance_u, fuel_set)
+
+	return set(fuel_set)	# copy, since callers may modify the returned set
+
+def standardize_fuels(fuel_instances, fuel_thesaurus):
+	"""
+	Get sets of primary fuel names for many strings of alternate names.
+
+	Parameters
+	----------
+	fuel_instances : iterable of str
+		Non-standard fuel strings, as accepted by `standardize_fuel()`.
+	fuel_thesaurus : dict
+		Dict returned from `make_fuel_thesaurus()`.
+
+	Returns
+	-------
+	List of fuel sets, one per input string.
+
+	"""
+	alias_index, memo = _fuel_lookup(fuel_thesaurus)
+	return [_standardize_fuel(fuel_instance, alias_index, memo) for fuel_instance in fuel_instances]
+
+### HEADER NAMES ###
+
+def make_header_names_thesaurus(header_names_thesaurus_file = HEADER_NAMES_THESAURUS_FILE):
+	"""
+	Get a dict mapping ideal domain-specific phrases to list of alternates.
+	The result is cached and shared between callers; see `load_resource()`.
+
+	Parameters
+	----------
+	header_names_thesaurus_file : str
+		Filepath.
+
+	Returns
+	-------
+	Dict of {'ideal phrase': ['alt_phrase0', 'alt_phrase1', ...]}.
+
+	"""
+	return load_resource(header_names_thesaurus_file, _read_header_names_thesaurus)
+
+def _read_header_names_thesaurus(header_names_thesaurus_file):
+	"""Parse the header names thesaurus file (uncached)."""
+	with open(header_names_thesaurus_file, 'rbU') as f:
+		f.readline() # skip headers
+		csvreader = csv.reader(f)
+		header_names_thesaurus = {}
+		for row in csvreader:
+			header_primary_name = row[0]
+			header_names_thesaurus[header_primary_name] = [x.lower().rstrip() for x in filter(None,row)]
+		return header_names_thesaurus
+
+### COUNTRY NAMES ###
+
+def make_country_names_thesaurus(country_names_thesaurus_file = COUNTRY_INFORMATION_FILE):
+	"""
+	Get a dict mapping ideal country names to list of alternates.
+	The result is cached and shared between callers; see `load_resource()`.
+
+	Parameters
+	----------
+	country_names_thesaurus_file : str
+		Filepath.
+
+	Returns
+	-------
+	Dict of {'country': ['alt_country0', 'alt_country1', ...]}.
+
+	"""
+	return load_resource(country_names_thesaurus_file, _read_country_names_thesaurus)
+
+def _read_country_names_thesaurus(country_names_thesaurus_file):
+	"""Parse the country names thesaurus file (uncached)."""
+	with open(country_names_thesaurus_file, 'rbU') as f:
+		f.readline() # skip headers
+		csvreader = csv.reader(f)
+		country_names_thesaurus = {}
+		for row in csvreader:
+			country_primary_name = row[0].decode(UNICODE_ENCODING)
+			country_names_thesaurus[country_primary_name] = [row[5].decode(UNICODE_ENCODING),row[6].decode(UNICODE_ENCODING),row[7].decode(UNICODE_ENCODING)]
+		return country_names_thesaurus
+
+def make_country_dictionary(country_information_file = COUNTRY_INFORMATION_FILE):
+	"""
+	Get a dict mapping country name to `CountryObject`.
+	The result is cached and shared between callers; see `load_resource()`.
+
+	Parameters
+	----------
+	country_information_file : str
+		Filepath.
+
+	Returns
+	-------
+	Dict of {'country': CountryObject}.
+
+	"""
+	return load_resource(country_information_file, _read_country_dictionary)
+
+def _read_country_dictionary(country_information_file):
+	"""Parse the country dictionary file (uncached)."""
+	with open(country_information_file, 'rbU') as f:
+		f.readline() # skip headers
+		csvreader = csv.reader(f)
+		country_dictionary = {}
+		for row in csvreader:
+			primary_name = row[0].decode(UNICODE_ENCODING)
+			country_code = row[1].decode(UNICODE_ENCODING)
+			country_code2 = row[2].decode(UNICODE_ENCODING)
+			has_api = int(row[3])
+			use_geo = int(row[4])
+			geo_name = row[5].decode(UNICODE_ENCODING)
+			carma_name = row[6].decode(UNICODE_ENCODING)
+			iea_name = row[7].decode(UNICODE_ENCODING)
+			fusion_table_id = row[8].decode(UNICODE_ENCODING)
+			new_country = CountryObject(primary_name,country_code,country_code2,geo_name,carma_name,iea_name,has_api,use_geo,fusion_table_id)
+			country_dictionary[primary_name] = new_country
+		return country_dictionary
+
+COUNTRY_NAME_STRIP_PATTERN = re.compile(u"[.,'()’]")
+COUNTRY_NAME_SPACE_PATTERN = re.compile(u"[\\s\\-_/]+")
+
+_country_index_cache = {}		# id(country_thesaurus) -> (country_thesaurus, number of countries, alias index)
+_reported_unmatched_countries = set()
+
+def normalize_country_name(country_name):
+	"""
+	Get the key used to match country names loosely.
+
+	Parameters
+	----------
+	country_name : unicode
+		Country name or alias.
+
+	Returns
+	-------
+	Lower-case name without punctuation and with single spaces
+	(e.g. u"Cote d'Ivoire" -> u"cote divoire").
+	"""
+	name = COUNTRY_NAME_STRIP_PATTERN.sub(u"", country_name)
+	return COUNTRY_NAME_SPACE_PATTERN.sub(u" ", name).strip().lower()
+
+def make_country_alias_index(country_thesaurus):
+	"""
+	Get dict mapping country aliases to the standard country name.
+
+	Parameters
+	----------
+	country_thesaurus : dict
+		Dict returned by `make_country_names_thesaurus()`.
+
+	Returns
+	-------
+	Dict of {'alias': 'country'} with two kinds of keys: aliases exactly as
+	listed (with commas removed), and aliases normalized by
+	`normalize_country_name()`. Standard names are included as aliases of
+	themselves. If an alias is listed for more than one country, the first
+	country in thesaurus order is used.
+	"""
+	alias_index = {}
+	for country_primary_name, aliases in country_thesaurus.iteritems():
+		for alias in aliases:
+			if alias:
+				alias_index.setdefault(alias.replace(u",", u""), country_primary_name)
+	for country_primary_name in country_thesaurus:
+		alias_index.setdefault(country_primary_name, country_primary_name)
+	normalized_index = {}
+	for alias, country_primary_name in alias_index.iteritems():
+		normalized_index.setdefault(normalize_country_name(alias), country_primary_name)
+	for key, country_primary_name in normalized_index.iteritems():
+		alias_index.setdefault(key, country_primary_name)
+	return alias_index
+
+def _country_lookup(country_thesaurus):
+	"""Get the alias index for a country thesaurus, built once per thesaurus object."""
+	cached = _country_index_cache.get(id(country_thesaurus))
+	if cached is None or cached[0] is not country_thesaurus or cached[1] != len(country_thesaurus):
+		cached = (country_thesaurus, len(country_thesaurus), make_country_alias_index(country_thesaurus))
+		_country_index_cache[id(country_thesaurus)] = cached
+	return cached[2]
+
+def standardize_country(country_instance, country_thesaurus):
+	"""
+	Get the standard country name from a non-ideal instance.
+
+	Parameters
+	----------
+	country_instance : str
+		Non-ideal or alternative country name (e.g. 'United States').
+	country_thesaurus : dict
+		Dict returned by `make_country_names_thesaurus()`.
+
+	Returns
+	-------
+	country_primary_name : unicode
+		Standard country name (e.g. 'United States of America').
+		Returns `NO_DATA_UNICODE` if country cannot be identified.
+
+	"""
+	return _standardize_country(country_instance, _country_lookup(country_thesaurus))
+
+def _standardize_country(country_instance, alias_index):
+	"""Implementation of `standardize_country()` for a given alias index."""
+	if isinstance(country_instance, str):
+		try:
+			country_instance = country_instance.decode(UNICODE_ENCODING)
+		except UnicodeDecodeError:
+			print("Error: Couldn't identify country name {0}".format(country_instance))
+			return NO_DATA_UNICODE
+	country_instance = country_instance.replace(u",", u"")
+	country_primary_name = alias_index.get(country_instance)
+	if country_primary_name is None:
+		country_primary_name = alias_index.get(normalize_country_name(country_instance))
+	if country_primary_name is None:
+		if country_instance not in _reported_unmatched_countries:
+			_reported_unmatched_countries.add(country_instance)
+			print(u"Couldn't identify country {0}".format(country_instance))
+		return NO_DATA_UNICODE
+	return country_primary_name
+
+def standardize_countries(country_instances, country_thesaurus):
+	"""
+	Get the standard country names for many non-ideal instances.
+	Each distinct input name is looked up once.
+
+	Parameters
+	----------
+	country_instances : iterable of str
+		Non-ideal or alternative country names.
+	country_thesaurus : dict
+		Dict returned by `make_country_names_thesaurus()`.
+
+	Returns
+	-------
+	List of standard country names (`NO_DATA_UNICODE` where not identified),
+	in input order.
+	"""
+	alias_index = _country_lookup(country_thesaurus)
+	standard_names = {}
+	result = []
+	for country_instance in country_instances:
+		try:
+			country_primary_name = standard_names[country_instance]
+		except KeyError:
+			country_primary_name = _standardize_country(country_instance, alias_index)
+			standard_names[country_instance] = country_primary_name
+		result.append(country_primary_name)
+	return result
+
+### COUNTRY BORDERS ###
+
+# Offline country lookups from a local boundary file are in powerwatch/borders.py.
+
+### ID NUMBERS AND MATCHING ###
+
+def make_id(letter_code,id_number):
+	"""
+	Make the standard-format id code (country ISO3 followed by 7-digit number).
+
+	Parameters
+	----------
+	letter_code : str
+		3-character ISO code (e.g. USA, BRA, CHN).
+	id_number : int
+		Number less than 10-million.
+
+	Returns
+	-------
+	id : unicode
+		3-character country code followed by zero-leading 7-character numeral.
+
+	"""
+	return u"{:3}{:07d}".format(letter_code, id_number)
+
+def make_plant_concordance(master_plant_condordance_file = MASTER_PLANT_CONCORDANCE_FILE):
+	"""
+	Get a dict that enables matching between the same plants from multiple databases.
+	The result is cached and shared between callers; see `load_resource()`.
+	Parameters
+	----------
+	master_plant_concordance_file : str
+		Filepath for plant concordance.
+
+	Returns
+	-------
+	Dict mapping WRI-specific ID to a dict of equivalent ids for other databases.
+
+	"""
+	return load_resource(master_plant_condordance_file, _read_plant_concordance)
+
+def _read_plant_concordance(master_plant_condordance_file):
+	"""Parse the plant concordance file (uncached)."""
+	# Note: These IDs are 'item source', not plant IDs.
+	with open(master_plant_condordance_file, 'rbU') as f:
+		f.readline() # skip headers
+		csvreader = csv.reader(f)
+		plant_concordance = {}
+		for row in csvreader:
+			wri_id = make_id(u"WRI",int(row[0]))
+			geo_id = make_id(u"GEODB", int(row[1])) if row[1] else ""
+			carma_id = make_id(u"CARMA", int(row[2])) if row[2] else ""
+			osm_id = make_id(u"OSM", int(row[3])) if row[3] else ""
+			plant_concordance[wri_id] = {'geo_id':geo_id, 'carma_id':carma_id, 'osm_id':osm_id}
+		return plant_concordance
+
+### STRING CLEANING ###
+
+def format_string(value,encoding = UNICODE_ENCODING):
+	"""
+	Format string to another representation and dissolve problem characters.
+
+	Parameters
+	----------
+	value : str
+		The string to parse and format.
+	encoding : str
+		Encoding to decode `value` into.
+
+	Returns
+	-------
+	clean_value : unicode
+		`value` stripped of control characters, commas, and trailing whitespace.
+		`NO_DATA_UNICODE` if problem with re-encoding.
+	"""
+	# if encoding=None, don't decode
+	try:
+		if encoding == None:
+			unicode_value = value
+		else:
+			unicode_value = value.decode(encoding)
+		clean_value = unicode_value.replace("\n"," ").replace("\r"," ").replace(","," ").strip()
+		# TODO: Find better way to handle substitute characters than this:
+		clean_value = clean_value.replace(u"\u001A","")
+		return clean_value
+	except:
+		return NO_DATA_UNICODE
+
+### GENERATION ESTIMATION ###
+
+GENERATION_TOTAL_COLUMN_PATTERN = re.compile(r'^generation_gwh_(\d{4})$')
+
+def read_generation_totals(total_generation_files = GENERATION_FILE):
+	"""
+	Get national total generation by country, fuel and year.
+	The result is cached and shared between callers; see `load_resource()`.
+
+	Parameters
+	----------
+	total_generation_files : str or list of str
+		CSV files with columns country, fuel and one or more
+		generation_gwh_<year> columns. Later files override earlier ones.
+
+	Returns
+	-------
+	Dict of {year: {(country, fuel): gwh}}.
+
+	"""
+	if isinstance(total_generation_files, basestring):
+		total_generation_files = [total_generation_files]
+	generation_totals = {}
+	for filename in total_generation_files:
+		for year, totals in load_resource(filename, _read_generation_totals).iteritems():
+			generation_totals.setdefault(year, {}).update(totals)
+	return generation_totals
+
+def _read_generation_totals(total_generation_file):
+	"""Parse a national generation totals file (uncached)."""
+	generation_totals = {}
+	with open(total_generation_file, 'rU') as f:
+		datareader = csv.reader(f)
+		headers = datareader.next()
+		year_columns = []
+		for i, header in enumerate(headers):
+			match = GENERATION_TOTAL_COLUMN_PATTERN.match(header.strip())
+			if match:
+				year_columns.append((i, int(match.group(1))))
+		for row in datareader:
+			key = (row[0], row[1])
+			for i, year in year_columns:
+				if row[i].strip():
+					generation_totals.setdefault(year, {})[key] = float(row[i])
+	return generation_totals
+
+def estimate_generation_by_year(plants, generation_totals, years=None):
+	"""
+	Estimate annual generation of plants from national totals, for several years.
+
+	Plants are grouped by country and primary (first) fuel. For each group
+	and year, the national total less the generation reported by plants in
+	the group is allocated among the group's other plants in proportion to
+	capacity; negative remainders give an estimate of 0. All groups and years
+	are computed together with array operations.
+
+	Parameters
+	----------
+	plants : list of PowerPlant
+		The power plants for which to estimate generation.
+	generation_totals : dict
+		Dict of {year: {(country, fuel): gwh}}, as from `read_generation_totals()`.
+	years : list of int, optional
+		Years to estimate; all years in `generation_totals` (sorted) by default.
+
+	Returns
+	-------
+	estimates : np.ndarray of float
+		Array of plants x years. NaN where no estimate is made: the plant
+		reports generation for the year, has no capacity or fuel, or its
+		group has no national total or no unreported capacity.
+
+	"""
+	if years is None:
+		years = sorted(generation_totals)
+	n_years = len(years)
+
+	# group plants; plants without capacity or fuel are not estimated
+	capacity = np.full(len(plants), np.nan)
+	valid = np.zeros(len(plants), dtype=bool)
+	groups = np.zeros(len(plants), dtype=np.intp)
+	group_index = {}
+	for row, plant in enumerate(plants):
+		if plant.capacity is None or not plant.fuel:
+			continue
+		try:
+			capacity[row] = float(plant.capacity)
+		except (TypeError, ValueError):
+			continue
+		valid[row] = True
+		groups[row] = group_index.setdefault((plant.country, next(iter(plant.fuel))), len(group_index))
+
+	national = np.full((len(group_index), n_years), np.nan)
+	for key, group in group_index.iteritems():
+		for j, year in enumerate(years):
+			national[group, j] = generation_totals.get(year, {}).get(key, np.nan)
+
+	# sum reported generation and unreported capacity per (group, year)
+	reported = annual_generation_matrix(plants, years)
+	has_reported = ~np.isnan(reported) & (reported != 0)
+	cells = (groups[:, np.newaxis] * n_years + np.arange(n_years))[valid].ravel()
+	size = len(group_index) * n_years
+	reported_totals = np.bincount(cells, weights=np.where(has_reported, reported, 0)[valid].ravel(),
+		minlength=size).reshape(-1, n_years)
+	capacity_totals = np.bincount(cells, weights=np.where(has_reported, 0, capacity[:, np.newaxis])[valid].ravel(),
+		minlength=size).reshape(-1, n_years)
+
+	# allocate the remainder by capacity share
+	remaining = (national - reported_totals)[groups]
+	group_capacity = capacity_totals[groups]
+	with np.errstate(divide='ignore', invalid='ignore'):
+		estimates = np.maximum(capacity[:, np.newaxis] / group_capacity * remaining, 0)
+	estimated = valid[:, np.newaxis] & ~has_reported & (group_capacity != 0) & ~np.isnan(remaining)
+	estimates[~estimated] = np.nan
+	return estimates
+
+def estimate_generation(powerplant_dictionary,total_generation_file = GENERATION_FILE,year = None):
+	"""
+	Function to estimate annual generation by plant.
+	Uses data from IEA on total national generation by fuel type.
+	Allocates generation among plants by capacity.
+	Excludes plants for which generation data are reported and included in database.
+	See `estimate_generation_by_year()`.
+
+	Parameters
+	----------
+	powerplant_dictionary : dict of PowerPlant objects
+		The power plants for which to estimate generation.
+	total_generation_file : file path
+		File with national total for annual generation, by fuel type.
+	year : int, optional
+		Year to estimate; the latest year in `total_generation_file` by default.
+
+	Returns
+	-------
+	estimate_count : int
+		Number of plants for which generation was estimated.
+
+	(Plant objects in powerplant_dictionary have `plant_estimated_generation_gwh' value set.)
+	"""
+	generation_totals = read_generation_totals(total_generation_file)
+	if year is None:
+		year = max(generation_totals)
+	# sum capacities in a fixed order so results do not depend on how the dict was built
+	plants = [powerplant_dictionary[idnr] for idnr in sorted(powerplant_dictionary)]
+	estimates = estimate_generation_by_year(plants, generation_totals, [year])[:, 0]
+
+	estimate_count = 0
+	for plant, estimated_generation in zip(plants, estimates):
+		if not np.isnan(estimated_generation):
+			plant.estimated_generation_gwh = float(estimated_generation)
+			estimate_count += 1
+
+	# no need to return dictionary; modifying directly
+	return estimate_count
+
+### PARSE DATA RETURNED BY ELASTIC SEARCH ###
+
+#TODO: understand this function
+def parse_powerplant_data(json_data,db_source):
+	"""
+	Parse data returned by Enipedia elastic search API.
+
+	Parameters
+	----------
+	json_data : dict
+		???
+	db_source : str
+		???
+
+	Returns
+	-------
+	score : float
+		???
+	parsed_values : dict
+		???
+
+	"""
+
+	# initialize parsed values
+	parsed_values = {}
+	parsed_values['idnr'] = NO_DATA_NUMERIC
+	parsed_values['name'] = NO_DATA_UNICODE
+	parsed_values['country'] = NO_DATA_UNICODE
+	parsed_values['latitude'] = NO_DATA_NUMERIC
+	parsed_values['longitude'] = NO_DATA_NUMERIC
+	parsed_values['fuel'] = NO_DATA_UNICODE
+	parsed_values['owner'] = NO_DATA_UNICODE
+	parsed_values['capacity'] = NO_DATA_NUMERIC
+
+	# values common to all databases
+	score = float(json_data['_score'])
+	parsed_values['idnr'] = int(json_data['_id'])
+
+	# parse source string, different for each database
+	desc = json_data['_source'] # type(desc) = dict
+	db_name = db_source.lower()
+
+	if db_name == 'geo':
+		db_key_names_strings = {'name':'Name', 'fuel':'Type', 'country':'Country', 'owner':'Owner1'}
+		db_key_names_floats = {'latitude':'Latitude_Start', 'longitude':'Longitude_Start', 'capacity':'Design_Capacity_MWe_nbr'}
+
+	#elif db_name == 'osm':
+	#	db_key_names_strings = {'name':'name', 'fuel_type':'generator:source'}
+	#	db_key_names_floats = {'latitude':'latitude', 'longitude':'longitude'}
+
+	elif db_name == 'carmav3':
+		db_key_names_strings = {'name':'name', 'country':'country'}
+		db_key_names_floats = {'latitude':'latitude', 'longitude':'longitude'}
+
+	for primary_key,db_key in db_key_names_strings.iteritems():
+		if db_key in desc:
+			try:
+				parsed_values[primary_key] = desc[db_key].replace(","," ")
+			except:
+				parsed_values[primary_key] = desc[db_key]
+
+	for primary_key,db_key in db_key_names_floats.iteritems():
+		if db_key in desc:
+			try:
+				parsed_values[primary_key] = float(desc[db_key].replace(",",""))
+			except:
+				parsed_values[primary_key] = desc[db_key]
+
+	return score,parsed_values
+
+
+### DATE/TIME PARSING ###
+
+def excel_date_as_datetime(excel_date,date_mode=0):
+	"""
+	Convert Excel date number to python datetime object
+	Further info: https://stackoverflow.com/questions/1108428/how-do-i-read-a-date-in-excel-format-in-python
+
+	Parameters
+	----------
+	excel_date: float
+		Float in Excel date format (based on days since January 1, 1900).
+	date_mode: int (0,1)
+		Date basis for Excel: 0 = 1900 (default), 1 = 1904.
+	"""
+
+	return datetime.datetime(1899,12,30) + datetime.timedelta(days=excel_date + date_mode * 1462)
+
+
+### COMPACT REPRESENTATION ###
+
+# Shared objects for plants without location or generation data.
+# These are shared by many plants: assign a new object instead of modifying them.
+EMPTY_LOCATION = LocationObject()
+EMPTY_GENERATION = PlantGenerationObject()
+
+_interned_strings = {}
+
+def intern_string(value):
+	"""
+	Get a canonical instance of a (unicode) string.
+
+	The builtin `intern()` only accepts byte strings, so unicode values are
+	interned through a module-level table instead.
+
+	Parameters
+	----------
+	value : unicode or str
+		String to intern; other types are returned unchanged.
+
+	Returns
+	-------
+	The shared instance equal to `value`.
+	"""
+	if not isinstance(value, basestring):
+		return value
+	return _interned_strings.setdefault(value, value)
+
+def compact_database(plant_dict):
+	"""
+	Reduce the memory used by a database of plants, in place.
+
+	Interns repeated strings (country, source, url, coordinate source, fuel
+	names, generation source) and replaces empty locations and empty
+	generation records with the shared `EMPTY_LOCATION` and `EMPTY_GENERATION`.
+
+	Parameters
+	----------
+	plant_dict : dict
+		Dict of {'pw_idnr': PowerPlant} to compact.
+
+	Returns
+	-------
+	plant_dict : dict
+		The same dict, for convenience.
+	"""
+	for plant in plant_dict.itervalues():
+		if not isinstance(plant, PowerPlant):
+			continue
+		for attr in ('country', 'source', 'url', 'coord_source'):
+			if hasattr(plant, attr):	# databases loaded with selected fields only
+				setattr(plant, attr, intern_string(getattr(plant, attr)))
+		if hasattr(plant, 'fuel'):
+			plant.fuel = set(intern_string(fuel) for fuel in plant.fuel)
+		location = getattr(plant, 'location', None)
+		if location is not None and not location and not location.description:
+			plant.location = EMPTY_LOCATION
+		if getattr(plant, 'generation', None):
+			for i, gen in enumerate(plant.generation):
+				if not gen and gen.gwh is None and not gen.source:
+					plant.generation[i] = EMPTY_GENERATION
+				else:
+					gen.source = intern_string(gen.source)
+	return plant_dict
+
+### COLUMNAR TABLE ###
+
+class _Missing(object):
+	"""Marker for a PowerPlant attribute that was never set."""
+	__slots__ = ()
+	def __repr__(self):
+		return 'MISSING'
+
+_MISSING = _Missing()
+
+class PlantTable(object):
+	"""
+	Columnar representation of a database of power plants.
+
+	Numeric attributes are held in contiguous NumPy arrays (NaN for no data),
+	country and primary fuel are category-coded as int arrays, and annual
+	generation is a (plants x years) array. The remaining attributes are kept
+	in per-plant lists, so converting to and from the {idnr: PowerPlant} dict
+	is lossless: values whose array form would not reproduce the original
+	exactly (e.g. a year stored as a string) are retained as they were.
+
+	Attributes
+	----------
+	ids : list of unicode
+		Keys of the original plant dict, in row order.
+	capacity, cap_year, commissioning_year, estimated_generation_gwh : np.ndarray of float
+		Numeric plant attributes.
+	latitude, longitude : np.ndarray of float
+		Plant coordinates.
+	countries : list of unicode
+		Country categories; `country_codes` indexes into this list.
+	fuels : list of unicode
+		Fuel categories; `fuel_codes` holds the index of each plant's primary
+		fuel (as used in `estimate_generation()`), -1 if no fuel.
+	fuel_matrix : np.ndarray of bool
+		(plants x fuels) membership of every fuel of each plant.
+	years : list of int
+		Years covered by `generation_gwh`.
+	generation_gwh : np.ndarray of float
+		(plants x years) reported annual generation, NaN if not reported.
+	"""
+
+	NUMERIC_COLUMNS = ('capacity', 'cap_year', 'commissioning_year', 'estimated_generation_gwh')
+	LOCATION_COLUMNS = ('latitude', 'longitude')
+	TEXT_COLUMNS = ('idnr', 'name', 'owner', 'nat_lang', 'source', 'url', 'coord_source')
+	_INT_COLUMNS = ('cap_year',)	# columns that decode to int rather than float
+
+	def __init__(self, years=GENERATION_YEARS):
+		self.ids = []
+		self.years = list(years)
+		self.countries = []
+		self.fuels = []
+		for column in self.NUMERIC_COLUMNS + self.LOCATION_COLUMNS:
+			setattr(self, column, np.empty(0))
+		for column in self.TEXT_COLUMNS:
+			setattr(self, column, [])
+		self.country_codes = np.empty(0, dtype=np.int32)
+		self.fuel_codes = np.empty(0, dtype=np.int32)
+		self.fuel_matrix = np.empty((0, 0), dtype=bool)
+		self.generation_gwh = np.empty((0, len(self.years)))
+		self.location_description = []
+		self.fuel_sets = []
+		self.generation = []
+		self._raw = dict((column, {}) for column in self.NUMERIC_COLUMNS + self.LOCATION_COLUMNS)
+
+	def __len__(self):
+		return len(self.ids)
+
+	def __repr__(self):
+		return 'PlantTable: {0} plants'.format(len(self))
+
+	@staticmethod
+	def _encode(value):
+		"""Get float form of a numeric attribute value (NaN for no data)."""
+		if value is None or value is _MISSING:
+			return np.nan
+		try:
+			return float(value)
+		except (TypeError, ValueError):
+			return np.nan
+
+	def _decode(self, column, row):
+		"""Get the attribute value stored for `column` in `row`."""
+		raw = self._raw[column]
+		if row in raw:
+			return raw[row]
+		value = getattr(self, column)[row]
+		if np.isnan(value):
+			return None
+		if column in self._INT_COLUMNS:
+			return int(value)
+		return float(value)
+
+	@classmethod
+	def from_dict(cls, plant_dict, years=GENERATION_YEARS):
+		"""
+		Build a table from a dict of PowerPlant objects.
+
+		Parameters
+		----------
+		plant_dict : dict
+			Dict of {'pw_idnr': PowerPlant}.
+		years : list of int, optional
+			Years for the `generation_gwh` array.
+
+		Returns
+		-------
+		PlantTable
+
+		Raises
+		------
+		TypeError if a value in `plant_dict` is not a PowerPlant.
+		"""
+		table = cls(years)
+		n = len(plant_dict)
+		numeric = dict((column, np.empty(n)) for column in cls.NUMERIC_COLUMNS + cls.LOCATION_COLUMNS)
+		country_index = {}
+		fuel_index = {}
+		country_codes = np.empty(n, dtype=np.int32)
+		fuel_codes = np.empty(n, dtype=np.int32)
+		fuel_members = []
+		for row, (key, plant) in enumerate(plant_dict.iteritems()):
+			if not isinstance(plant, PowerPlant):
+				raise TypeError('Value for {0} is not a PowerPlant.'.format(key))
+			table.ids.append(key)
+			for column in cls.TEXT_COLUMNS:
+				getattr(table, column).append(getattr(plant, column, _MISSING))
+
+			values = [(column, getattr(plant, column, _MISSING)) for column in cls.NUMERIC_COLUMNS]
+			values.append(('latitude', plant.location.latitude))
+			values.append(('longitude', plant.location.longitude))
+			for column, value in values:
+				encoded = cls._encode(value)
+				numeric[column][row] = encoded
+				# keep original if the array form would not reproduce it
+				if value is None:
+					continue
+				if np.isnan(encoded) or type(value) is not (int if column in cls._INT_COLUMNS else float):
+					table._raw[column][row] = value
+				elif column in cls._INT_COLUMNS and int(encoded) != value:
+					table._raw[column][row] = value
+			table.location_description.append(plant.location.description)
+
+			country_codes[row] = country_index.setdefault(plant.country, len(country_index))
+			fuel_set = plant.fuel
+			table.fuel_sets.append(fuel_set)
+			codes = [fuel_index.setdefault(fuel, len(fuel_index)) for fuel in fuel_set]
+			fuel_members.append(codes)
+			fuel_codes[row] = codes[0] if codes else -1
+
+			table.generation.append(plant.generation)
+
+		for column, array in numeric.iteritems():
+			setattr(table, column, array)
+		table.countries = sorted(country_index, key=country_index.get)
+		table.fuels = sorted(fuel_index, key=fuel_index.get)
+		table.country_codes = country_codes
+		table.fuel_codes = fuel_codes
+		table.fuel_matrix = np.zeros((n, len(table.fuels)), dtype=bool)
+		for row, codes in enumerate(fuel_members):
+			table.fuel_matrix[row, codes] = True
+		table.generation_gwh = annual_generation_matrix(plant_dict.values(), table.years)
+		return table
+
+	def to_dict(self):
+		"""
+		Convert the table back to a dict of PowerPlant objects.
+
+		Returns
+		-------
+		Dict of {'pw_idnr': PowerPlant}.
+		"""
+		plant_dict = {}
+		for row, key in enumerate(self.ids):
+			state = {}
+			for column in self.TEXT_COLUMNS:
+				state[column] = getattr(self, column)[row]
+			for column in self.NUMERIC_COLUMNS:
+				state[column] = self._decode(column, row)
+			latitude = self._decode('latitude', row)
+			longitude = self._decode('longitude', row)
+			description = self.location_description[row]
+			if latitude is None and longitude is None and not description:
+				state['location'] = EMPTY_LOCATION
+			else:
+				state['location'] = LocationObject(description, latitude, longitude)
+			state['country'] = self.countries[self.country_codes[row]]
+			state['fuel'] = self.fuel_sets[row]
+			state['generation'] = self.generation[row]
+			plant = PowerPlant.__new__(PowerPlant)
+			plant.__setstate__(dict((k, v) for k, v in state.iteritems() if v is not _MISSING))
+			plant_dict[key] = plant
+		return plant_dict
+
+	def take(self, rows):
+		"""
+		Get a new table holding a subset of the rows.
+
+		Parameters
+		----------
+		rows : np.ndarray
+			Boolean mask or integer row indices.
+
+		Returns
+		-------
+		PlantTable sharing the category lists of this table.
+		"""
+		rows = np.arange(len(self))[rows]
+		subset = PlantTable(self.years)
+		subset.countries = self.countries
+		subset.fuels = self.fuels
+		for column in self.NUMERIC_COLUMNS + self.LOCATION_COLUMNS:
+			setattr(subset, column, getattr(self, column)[rows])
+			raw = self._raw[column]
+			subset._raw[column] = dict((i, raw[row]) for i, row in enumerate(rows) if row in raw)
+		for column in ('ids', 'location_description', 'fuel_sets', 'generation') + self.TEXT_COLUMNS:
+			values = getattr(self, column)
+			setattr(subset, column, [values[row] for row in rows])
+		subset.country_codes = self.country_codes[rows]
+		subset.fuel_codes = self.fuel_codes[rows]
+		subset.fuel_matrix = self.fuel_matrix[rows]
+		subset.generation_gwh = self.generation_gwh[rows]
+		return subset
+
+	def country_mask(self, country):
+		"""Boolean array selecting plants in `country`."""
+		try:
+			return self.country_codes == self.countries.index(country)
+		except ValueError:
+			return np.zeros(len(self), dtype=bool)
+
+	def fuel_mask(self, fuel, primary=False):
+		"""Boolean array selecting plants using `fuel` (as primary fuel if `primary`)."""
+		try:
+			code = self.fuels.index(fuel)
+		except ValueError:
+			return np.zeros(len(self), dtype=bool)
+		if primary:
+			return self.fuel_codes == code
+		return self.fuel_matrix[:, code]
+
+	def has_location(self):
+		"""Boolean array selecting plants with non-zero latitude and longitude."""
+		with np.errstate(invalid='ignore'):
+			return (np.nan_to_num(self.latitude) != 0) & (np.nan_to_num(self.longitude) != 0)
+
+### BINARY DATABASE FORMAT ###
+
+# Layout of a PWDB file (all integers little-endian):
+#   preamble: magic (4 bytes), format version (uint16), header length (uint32)
+#   header:   pickled dict describing the blocks (see `_read_database_header()`)
+#   blocks:   one pickled list per (country, field), plus the dict keys of each country
+# Block offsets in the header are relative to the end of the header.
+# Files without the magic bytes are legacy pickles written by older versions.
+DATABASE_MAGIC = 'PWDB'
+DATABASE_FORMAT_VERSION = 1
+DATABASE_PREAMBLE = struct.Struct('<4sHI')
+DATABASE_FIELDS = tuple(field for field in PowerPlant.__slots__ if not field.startswith('_'))
+_KEY_BLOCK = '_key'
+
+def _pickle_block(values):
+	return cPickle.dumps(values, cPickle.HIGHEST_PROTOCOL)
+
+def _encode_database(plant_dict):
+	"""Serialize a plant dict to a string in the PWDB format."""
+	by_country = collections.defaultdict(list)
+	other = {}
+	for key, plant in plant_dict.iteritems():
+		if isinstance(plant, PowerPlant):
+			by_country[getattr(plant, 'country', NO_DATA_UNICODE)].append((key, plant))
+		else:
+			other[key] = plant
+
+	blocks = []
+	position = [0]
+	def _add_block(data):
+		blocks.append(data)
+		position[0] += len(data)
+		return (position[0] - len(data), len(data))
+
+	countries = {}
+	for country in sorted(by_country):
+		entries = by_country[country]
+		country_blocks = {_KEY_BLOCK: _add_block(_pickle_block([key for key, plant in entries]))}
+		for field in DATABASE_FIELDS:
+			values, missing = [], []
+			for row, (key, plant) in enumerate(entries):
+				value = getattr(plant, field, _MISSING)
+				if value is _MISSING:
+					missing.append(row)
+					value = None
+				values.append(value)
+			country_blocks[field] = _add_block(_pickle_block((values, missing)))
+		countries[country] = {'count': len(entries), 'blocks': country_blocks}
+
+	header = {
+		'version': DATABASE_FORMAT_VERSION,
+		'fields': DATABASE_FIELDS,
+		'countries': countries,
+		'other': _add_block(_pickle_block(other)) if other else None,
+	}
+	header_data = _pickle_block(header)
+	preamble = DATABASE_PREAMBLE.pack(DATABASE_MAGIC, DATABASE_FORMAT_VERSION, len(header_data))
+	return ''.join([preamble, header_data] + blocks)
+
+def is_binary_database(filename):
+	"""Whether `filename` is in the PWDB format (rather than a legacy pickle)."""
+	with open(filename, 'rb') as f:
+		return f.read(len(DATABASE_MAGIC)) == DATABASE_MAGIC
+
+def _read_database_header(data):
+	"""
+	Parse the preamble and header of a PWDB file.
+
+	Parameters
+	----------
+	data : str or mmap.mmap
+		File contents.
+
+	Returns
+	-------
+	header : dict
+		With keys 'version', 'fields', 'countries' ({country: {'count': int,
+		'blocks': {field: (offset, length)}}}) and 'other' (block of
+		non-PowerPlant entries, or None), plus 'data_offset'.
+
+	Raises
+	------
+	ValueError
+		If the data is not a PWDB file, or was written by a newer version.
+	"""
+	if len(data) < DATABASE_PREAMBLE.size:
+		raise ValueError('Not a PowerWatch database file (too short).')
+	magic, version, header_length = DATABASE_PREAMBLE.unpack(data[:DATABASE_PREAMBLE.size])
+	if magic != DATABASE_MAGIC:
+		raise ValueError('Not a PowerWatch database file.')
+	if version > DATABASE_FORMAT_VERSION:
+		raise ValueError('Database format version {0} is newer than supported version {1}.'.format(version, DATABASE_FORMAT_VERSION))
+	header = cPickle.loads(data[DATABASE_PREAMBLE.size:DATABASE_PREAMBLE.size + header_length])
+	header['data_offset'] = DATABASE_PREAMBLE.size + header_length
+	return header
+
+def _load_block(data, header, block):
+	offset, length = block
+	start = header['data_offset'] + offset
+	return cPickle.loads(data[start:start + length])
+
+def _decode_database(data, countries=None, fields=None):
+	"""Rebuild a plant dict from PWDB data, reading only the requested blocks."""
+	header = _read_database_header(data)
+	if fields is None:
+		fields = [field for field in header['fields'] if field in DATABASE_FIELDS]
+	else:
+		unknown = set(fields) - set(DATABASE_FIELDS)
+		if unknown:
+			raise ValueError('Unknown PowerPlant fields: {0}'.format(', '.join(sorted(unknown))))
+		fields = [field for field in fields if field in header['fields']]
+
+	plant_dict = {}
+	for country, info in header['countries'].iteritems():
+		if countries is not None and country not in countries:
+			continue
+		keys = _load_block(data, header, info['blocks'][_KEY_BLOCK])
+		plants = [PowerPlant.__new__(PowerPlant) for key in keys]
+		for field in fields:
+			values, missing = _load_block(data, header, info['blocks'][field])
+			if missing:
+				skip = set(missing)
+				for row, (plant, value) in enumerate(zip(plants, values)):
+					if row not in skip:
+						setattr(plant, field, value)
+			else:
+				for plant, value in zip(plants, values):
+					setattr(plant, field, value)
+		plant_dict.update(zip(keys, plants))
+
+	if header['other'] is not None:
+		plant_dict.update(_load_block(data, header, header['other']))
+	return plant_dict
+
+def database_countries(filename):
+	"""
+	List the countries stored in a database file, without loading any plants.
+
+	Parameters
+	----------
+	filename : str
+		Filepath of the database.
+
+	Returns
+	-------
+	countries : dict or None
+		Dict of {country: number of plants}; None for legacy pickle files,
+		whose contents are not known without loading them.
+	"""
+	with open(filename, 'rb') as f:
+		data = f.read(DATABASE_PREAMBLE.size)
+		if not data.startswith(DATABASE_MAGIC):
+			return None
+		header_length = DATABASE_PREAMBLE.unpack(data)[2]
+		header = _read_database_header(data + f.read(header_length))
+	return dict((country, info['count']) for country, info in header['countries'].iteritems())
+
+### LOAD/SAVE/WRITE CSV ###
+
+def save_database(plant_dict,filename,savedir=OUTPUT_DIR,datestamp=False,legacy=False,inputs=None):
+	"""
+	Save in-memory database to file.
+
+	Parameters
+	----------
+	plant_dict : dict
+		Dict of {'pw_idnr': PowerPlant} to save.
+	filename : str
+		Base filename to save the database.
+	savedir : str, optional
+		Directory in which `filename` will be located.
+	datestamp : bool, optional
+		Whether to add a timestamp to the filename.
+	legacy : bool, default False
+		Whether to write a plain pickle (readable by older versions) instead
+		of the PWDB format.
+	inputs : list of str, optional
+		Files the database was built from, recorded so that a later build can
+		skip re-parsing them if they are unchanged; see inputs_changed().
+	"""
+	# save database with timestamp
+	if datestamp:
+		savename = (filename + '-Database-' + datetime.datetime.now().isoformat().replace(":","-")[:-10] + '.bin')
+	else:
+		savename = (filename + '-Database.bin')
+	savepath = os.path.join(savedir,savename)
+	with open(savepath, 'wb') as f:
+		if legacy:
+			pickle.dump(plant_dict, f)
+		else:
+			f.write(_encode_database(plant_dict))
+	if inputs is not None:
+		record_inputs(inputs, savepath)
+
+def load_database(filename, compact=False, countries=None, fields=None):
+	"""
+	Read in database file.
+
+	Files in the PWDB format are memory-mapped and only the blocks for the
+	requested countries and fields are deserialized. Legacy pickle files are
+	loaded in full and then filtered by country.
+
+	Parameters
+	----------
+	filename : str
+		Filepath of the database.
+	compact : bool, default False
+		Whether to reduce memory use with `compact_database()` after loading.
+	countries : collection of unicode, optional
+		Only load plants in these countries (all countries by default).
+		Entries that are not PowerPlant objects are always returned.
+	fields : list of str, optional
+		Only set these PowerPlant attributes (all by default); others are left
+		unset. Ignored for legacy pickle files.
+
+	Raises
+	------
+	ValueError
+		If `fields` contains a name that is not a PowerPlant attribute.
+	"""
+	with open(filename, 'rb') as f:
+		if f.read(len(DATABASE_MAGIC)) == DATABASE_MAGIC:
+			data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+			try:
+				plant_dict = _decode_database(data, countries, fields)
+			finally:
+				data.close()
+		else:
+			f.seek(0)
+			plant_dict = cPickle.load(f)
+			if countries is not None:
+				plant_dict = dict((key, plant) for key, plant in plant_dict.iteritems()
+					if not isinstance(plant, PowerPlant) or plant.country in countries)
+	if compact:
+		compact_database(plant_dict)
+	return plant_dict
+
+def write_csv_file(plants_dictionary, csv_filename, dump=False):
+	"""
+	Write in-memory database into a CSV format.
+
+	Rows are sorted by country and plant name. Plants that cannot be
+	written (e.g. missing or non-encodable attributes) are skipped and
+	reported once at the end.
+
+	Parameters
+	----------
+	plants_dictionary : dict
+		Dict of {'pw_idnr': PowerPlant} to save.
+	csv_filename : str
+		Filepath for the output CSV.
+	dump : bool, default False
+		Whether this is a full-dump or a cleaned database.
+
+	Returns
+	-------
+	skipped : list of unicode
+		IDs of plants that could not be written.
+
+	"""
+
+	def _row(powerplant):
+		source = powerplant.source
+		if source is not None:
+			source = source.encode(UNICODE_ENCODING)
+		fuels = list(itertools.islice(powerplant.fuel, 4))
+		fuels.extend([None] * (4 - len(fuels)))
+		row = [
+			powerplant.name.encode(UNICODE_ENCODING),
+			powerplant.idnr.encode(UNICODE_ENCODING),
+			powerplant.capacity,
+			powerplant.cap_year,
+			powerplant.country.encode(UNICODE_ENCODING),
+			powerplant.owner.encode(UNICODE_ENCODING),
+			source,
+			powerplant.url.encode(UNICODE_ENCODING),
+			powerplant.location.latitude,
+			powerplant.location.longitude,
+			powerplant.commissioning_year,
+		]
+		row.extend(fuels)
+		row.extend(powerplant.annual_range(GENERATION_YEARS[0], GENERATION_YEARS[-1]))
+		row.append(powerplant.estimated_generation_gwh)
+		if dump:
+			row.insert(2, None)	# in_pw
+		return row
+
+	fieldnames = [
+		"name",
+		"pw_idnr",
+		"capacity_mw",
+		"year_of_capacity_data",
+		"country",
+		"owner",
+		"source",
+		"url",
+		"latitude",
+		"longitude",
+		"commissioning_year",
+		"fuel1",
+		"fuel2",
+		"fuel3",
+		"fuel4",
+		"generation_gwh_2012",
+		"generation_gwh_2013",
+		"generation_gwh_2014",
+		"generation_gwh_2015",
+		"generation_gwh_2016",
+		"estimated_generation_gwh"
+	]
+
+
+	if dump:
+		fieldnames.insert(2, 'in_pw')
+
+	# compute sort keys and row values in a single pass; rows that fail are written as None
+	entries = []
+	for powerplant in plants_dictionary.itervalues():
+		try:
+			row = _row(powerplant)
+		except Exception:
+			row = None
+		entries.append(((powerplant.country, powerplant.name), row, powerplant))
+	entries.sort(key=operator.itemgetter(0))	# stable, so ties keep dict order
+
+	# TODO: get csv_file abs path
+	skipped = []
+	with open(csv_filename, 'wb') as fout:
+		warning_text = "NOTE: This Power Watch database of power plants is currently in draft status and not yet published. Please do not reference or cite the data as basis for research or publications until the data is officially published.\n"
+		fout.write(warning_text)
+
+		buf = cStringIO.StringIO()
+		writer = csv.writer(buf)
+		writer.writerow(fieldnames)
+		for i, (sort_key, row, powerplant) in enumerate(entries):
+			try:
+				if row is None:
+					raise ValueError
+				writer.writerow(row)
+			except Exception:
+				skipped.append(powerplant.idnr)
+			if (i + 1) % CSV_CHUNK_ROWS == 0:
+				fout.write(buf.getvalue())
+				buf.seek(0)
+				buf.truncate()
+		fout.write(buf.getvalue())
+
+	if skipped:
+		print(u"Could not write {0} plants, e.g. {1}.".format(len(skipped), u", ".join(skipped[:10])))
+	return skipped
+
+
+def read_csv_file_to_dict(filename):
+	"""
+	Read saved CSV database into nested dict with pw_idnr as key.
+
+	Parameters
+	----------
+	filename : str
+		Filepath for the CSV to read.
+
+	Returns
+	-------
+	pdb : dict
+		Dictionary with pw_idnr for keys and dictionary
+	"""
+	with open(filename, 'rbU') as fin:
+		fin.readline()	# skip BETA warning statement
+		reader = csv.DictReader(fin)
+		pdb = {}  # returned object
+		# counters for
+		for row in reader:
+			row = {k: format_string(v) for k, v in row.items()}
+			row['capacity_mw'] = float(row['capacity_mw'])
+			try:
+				row['latitude'] = float(row['latitude'])
+				row['longitude'] = float(row['longitude'])
+			except:
+				row['latitude'] = None
+				row['longitude'] = None
+			try:
+				row['commissioning_year'] = float(row['commissioning_year'])
+			except:
+				row['commissioning_year'] = None
+			try:
+				row['year_of_capacity_data'] = int(row['year_of_capacity_data'])
+			except:
+				row['year_of_capacity_data'] = None
+			# check if fuels are empty strings
+			if not row['fuel1']:
+				row['fuel1'] = None
+			if not row['fuel2']:
+				row['fuel2'] = None
+			if not row['fuel3']:
+				row['fuel3'] = None
+			if not row['fuel4']:
+				row['fuel4'] = None
+			# check if annual generation data are empty
+			if not row['generation_gwh_2012']:
+				row['generation_gwh_2012'] = None
+			if not row['generation_gwh_2013']:
+				row['generation_gwh_2013'] = None
+			if not row['generation_gwh_2014']:
+				row['generation_gwh_2014'] = None
+			if not row['generation_gwh_2015']:
+				row['generation_gwh_2015'] = None
+			if not row['generation_gwh_2016']:
+				row['generation_gwh_2016'] = None
+			if not row['estimated_generation_gwh']:
+				row['estimated_generation_gwh'] = None
+			# add row to output dict
+			pdb[row['pw_idnr']] = row
+		return pdb
+
+
+# Pragmas for bulk loads into a new SQLite file; safety is restored afterwards
+SQLITE_BULK_PRAGMAS = [
+	('page_size', 4096),		# only effective before the first table is created
+	('journal_mode', 'OFF'),
+	('synchronous', 'OFF'),
+	('cache_size', -65536),		# negative: size in KiB
+	('temp_store', 'MEMORY'),
+]
+SQLITE_SAFE_PRAGMAS = [
+	('journal_mode', 'DELETE'),
+	('synchronous', 'FULL'),
+]
+
+# Wide schema: one powerplants table with fixed fuel and generation columns
+SQLITE_COLUMNS = [
+	('name', 'TEXT'),
+	('pw_idnr', 'TEXT NOT NULL'),
+	('capacity_mw', 'REAL'),
+	('year_of_capacity_data', 'INTEGER'),
+	('country', 'TEXT'),
+	('owner', 'TEXT'),
+	('source', 'TEXT'),
+	('url', 'TEXT'),
+	('latitude', 'REAL'),
+	('longitude', 'REAL'),
+	('fuel1', 'TEXT'),
+	('fuel2', 'TEXT'),
+	('fuel3', 'TEXT'),
+	('fuel4', 'TEXT'),
+	('generation_gwh_2012', 'REAL'),
+	('generation_gwh_2013', 'REAL'),
+	('generation_gwh_2014', 'REAL'),
+	('generation_gwh_2015', 'REAL'),
+	('generation_gwh_2016', 'REAL'),
+	('estimated_generation_gwh', 'REAL'),
+]
+
+# Created after the rows are loaded
+SQLITE_INDEXES = [
+	'CREATE UNIQUE INDEX idx_pw_idnr ON powerplants (pw_idnr)',
+	'CREATE INDEX idx_country ON powerplants (country)',
+]
+
+# Normalized schema: plant attributes, plus one row per fuel and per year of generation.
+# `position` keeps the order of a plant's fuels (1 = fuel1 of the wide table).
+SQLITE_NORMALIZED_TABLES = [
+	('plants', SQLITE_COLUMNS[:10] + SQLITE_COLUMNS[-1:]),
+	('plant_fuels', [('pw_idnr', 'TEXT NOT NULL'), ('fuel', 'TEXT NOT NULL'), ('position', 'INTEGER NOT NULL')]),
+	('plant_generation', [('pw_idnr', 'TEXT NOT NULL'), ('year', 'INTEGER NOT NULL'), ('gwh', 'REAL'), ('estimated', 'INTEGER NOT NULL')]),
+]
+
+# Covering indexes: fuel- and year-filtered queries are answered from the index alone
+SQLITE_NORMALIZED_INDEXES = [
+	'CREATE UNIQUE INDEX idx_plants_pw_idnr ON plants (pw_idnr)',
+	'CREATE INDEX idx_plants_country ON plants (country, capacity_mw)',
+	'CREATE UNIQUE INDEX idx_plant_fuels_plant ON plant_fuels (pw_idnr, position, fuel)',
+	'CREATE INDEX idx_plant_fuels_fuel ON plant_fuels (fuel, pw_idnr)',
+	'CREATE UNIQUE INDEX idx_plant_generation_plant ON plant_generation (pw_idnr, year, gwh, estimated)',
+	'CREATE INDEX idx_plant_generation_year ON plant_generation (year, pw_idnr, gwh, estimated)',
+]
+
+def sqlite_compatibility_views():
+	"""
+	SQL statements creating views of the normalized schema.
+
+	`powerplants` reproduces the wide table (columns of `SQLITE_COLUMNS`), with
+	generation columns for `GENERATION_YEARS`; `plant_generation_wide` holds the
+	same generation columns keyed by pw_idnr.
+
+	Returns
+	-------
+	List of str.
+	"""
+	fuel_columns = ['(SELECT f.fuel FROM plant_fuels f WHERE f.pw_idnr = p.pw_idnr AND f.position = {0}) AS fuel{0}'.format(i)
+		for i in range(1, 5)]
+	generation_columns = ['MAX(CASE WHEN year = {0} THEN gwh END) AS generation_gwh_{0}'.format(year)
+		for year in GENERATION_YEARS]
+	wide_generation = 'CREATE VIEW plant_generation_wide AS SELECT pw_idnr, {0} FROM plant_generation GROUP BY pw_idnr'.format(
+		', '.join(generation_columns))
+	columns = ['p.{0}'.format(name) for name, decl in SQLITE_COLUMNS[:10]] + fuel_columns + \
+		['g.generation_gwh_{0}'.format(year) for year in GENERATION_YEARS] + ['p.estimated_generation_gwh']
+	powerplants = ('CREATE VIEW powerplants AS SELECT {0} '
+		'FROM plants p LEFT JOIN plant_generation_wide g ON g.pw_idnr = p.pw_idnr').format(', '.join(columns))
+	return [wide_generation, powerplants]
+
+def _bulk_load_sqlite(filename, tables, indexes, views=[]):
+	"""
+	Create tables in a new SQLite file and load rows into them.
+
+	Parameters
+	----------
+	filename : str
+		Output filepath; should not exist before function call.
+	tables : list of (str, list, iterable)
+		Table name, list of (column, declaration), and rows of values in column
+		order. Tables are loaded in order, so rows of a later table may be
+		collected while an earlier table's rows are generated.
+	indexes : list of str
+		CREATE INDEX statements, run after all rows are loaded.
+	views : list of str, optional
+		CREATE VIEW statements.
+
+	Returns
+	-------
+	(conn, counts) : (sqlite3.Connection, dict)
+		Open connection and number of rows loaded per table.
+
+	Raises
+	------
+	OSError
+		If SQLite cannot make a database connection.
+	sqlite3.Error
+		If a table already exists, or a unique index finds duplicates.
+	"""
+	try:
+		conn = sqlite3.connect(filename)
+	except:
+		raise OSError('Cannot connect to {0}'.format(filename))
+	conn.isolation_level = None  # transactions are managed explicitly
+
+	c = conn.cursor()
+	for pragma, value in SQLITE_BULK_PRAGMAS:
+		c.execute('PRAGMA {0} = {1}'.format(pragma, value))
+
+	for name, columns, rows in tables:
+		try:
+			c.execute('CREATE TABLE {0} ({1})'.format(name,
+				', '.join('{0} {1}'.format(column, decl) for column, decl in columns)))
+		except sqlite3.Error:
+			raise sqlite3.Error('Cannot create table "{0}" (it might already exist).'.format(name))
+
+	counts = {}
+	c.execute('begin')
+	for name, columns, rows in tables:
+		stmt = 'INSERT INTO {0} VALUES ({1})'.format(name, ', '.join(['?'] * len(columns)))
+		c.executemany(stmt, rows)
+		counts[name] = c.rowcount
+	for stmt in list(indexes) + list(views):
+		c.execute(stmt)
+	c.execute('commit')
+
+	for pragma, value in SQLITE_SAFE_PRAGMAS:
+		c.execute('PRAGMA {0} = {1}'.format(pragma, value))
+	return conn, counts
+
+def _sqlite_text(value):
+	"""Unicode form of a text value; None for no data."""
+	if value is None or value is _MISSING:
+		return None
+	if isinstance(value, str):
+		return value.decode(UNICODE_ENCODING)
+	return unicode(value)
+
+def _sqlite_real(value):
+	"""Float form of a numeric value; None for no data or values that are not numbers."""
+	if value is None:
+		return None
+	try:
+		value = float(value)
+	except (TypeError, ValueError):
+		return None
+	return None if value != value else value	# NaN
+
+def _sqlite_int(value):
+	"""Integer form of a whole-number value; None otherwise."""
+	value = _sqlite_real(value)
+	if value is None or not value.is_integer():
+		return None
+	return int(value)
+
+def _sqlite_generation(gen_list):
+	"""Dict of {year: (gwh, estimated)} for the annual generation of a plant."""
+	if not gen_list:
+		return {}
+	return dict((year, (_sqlite_real(gen.gwh), int(bool(gen.estimated))))
+		for year, gen in _annual_generation_records(gen_list).iteritems())
+
+def _plant_sqlite_records(plants, skipped):
+	"""
+	Generate (values, fuels, generation) for PowerPlant objects.
+
+	`values` are the columns of the normalized `plants` table, `fuels` a list
+	of all fuels and `generation` as from `_sqlite_generation()`. IDs of
+	plants that cannot be converted are appended to `skipped`.
+	"""
+	for plant in plants:
+		try:
+			values = [
+				_sqlite_text(plant.name),
+				_sqlite_text(plant.idnr),
+				_sqlite_real(plant.capacity),
+				_sqlite_int(plant.cap_year),
+				_sqlite_text(plant.country),
+				_sqlite_text(plant.owner),
+				_sqlite_text(plant.source),
+				_sqlite_text(plant.url),
+				_sqlite_real(plant.location.latitude),
+				_sqlite_real(plant.location.longitude),
+				_sqlite_real(plant.estimated_generation_gwh),
+			]
+			fuels = [_sqlite_text(fuel) for fuel in plant.fuel]
+			generation = _sqlite_generation(plant.generation)
+		except Exception:
+			skipped.append(getattr(plant, 'idnr', None))
+			continue
+		yield values, fuels, generation
+
+def _table_sqlite_records(table):
+	"""Generate (values, fuels, generation) for the rows of a PlantTable; see `_plant_sqlite_records()`."""
+	for row in xrange(len(table)):
+		values = [
+			_sqlite_text(table.name[row]),
+			_sqlite_text(table.idnr[row]),
+			_sqlite_real(table.capacity[row]),
+			_sqlite_int(table.cap_year[row]),
+			_sqlite_text(table.countries[table.country_codes[row]]),
+			_sqlite_text(table.owner[row]),
+			_sqlite_text(table.source[row]),
+			_sqlite_text(table.url[row]),
+			_sqlite_real(table.latitude[row]),
+			_sqlite_real(table.longitude[row]),
+			_sqlite_real(table.estimated_generation_gwh[row]),
+		]
+		fuels = [_sqlite_text(fuel) for fuel in table.fuel_sets[row]]
+		yield values, fuels, _sqlite_generation(table.generation[row])
+
+def _wide_sqlite_rows(records):
+	"""Generate rows of `SQLITE_COLUMNS` from (values, fuels, generation) records."""
+	no_generation = (None, 0)
+	for values, fuels, generation in records:
+		row = values[:10]
+		row.extend(fuels[:4])
+		row.extend([None] * (4 - len(row[10:])))
+		row.extend(generation.get(year, no_generation)[0] for year in GENERATION_YEARS)
+		row.append(values[10])
+		yield row
+
+def write_sqlite_database(plants, filename, return_connection=False, normalized=False):
+	"""
+	Write database into sqlite format directly from PowerPlant objects.
+
+	Creates the same powerplants table as `write_sqlite_file()` without the
+	CSV round trip; rows are bulk-inserted and indexes built after the load.
+	Plants that cannot be written (e.g. missing attributes) are skipped.
+	Prints the number of plants written and the throughput.
+
+	With `normalized`, plant attributes go to a `plants` table, fuels to
+	`plant_fuels` (pw_idnr, fuel, position) and annual generation for every
+	reported year to `plant_generation` (pw_idnr, year, gwh, estimated). The
+	`powerplants` view reproduces the wide table; see `sqlite_compatibility_views()`.
+
+	Parameters
+	----------
+	plants : dict or PlantTable
+		Dict of {'pw_idnr': PowerPlant}, or a PlantTable.
+	filename : str
+		Output filepath; should not exist before function call.
+	return_connection : bool (default False)
+		Whether to return an active database connection.
+	normalized : bool (default False)
+		Whether to use the normalized schema.
+
+	Returns
+	-------
+	conn: sqlite3.Connection
+		Only returned if `return_connection` is True.
+
+	Raises
+	------
+	OSError
+		If SQLite cannot make a database connection.
+	sqlite3.Error
+		If database has already been populated.
+
+	"""
+	start_time = time.time()
+	skipped = []
+	if isinstance(plants, PlantTable):
+		records = _table_sqlite_records(plants)
+	else:
+		records = _plant_sqlite_records(plants.itervalues(), skipped)
+
+	if normalized:
+		fuel_rows, generation_rows = [], []
+		def _plant_rows():
+			for values, fuels, generation in records:
+				idnr = values[1]
+				fuel_rows.extend((idnr, fuel, position) for position, fuel in enumerate(fuels, 1))
+				generation_rows.extend((idnr, year, gwh, estimated) for year, (gwh, estimated) in generation.iteritems())
+				yield values
+		tables = [(name, columns, rows) for (name, columns), rows in
+			zip(SQLITE_NORMALIZED_TABLES, [_plant_rows(), fuel_rows, generation_rows])]
+		conn, counts = _bulk_load_sqlite(filename, tables, SQLITE_NORMALIZED_INDEXES, sqlite_compatibility_views())
+		count = counts['plants']
+	else:
+		tables = [('powerplants', SQLITE_COLUMNS, _wide_sqlite_rows(records))]
+		conn, counts = _bulk_load_sqlite(filename, tables, SQLITE_INDEXES)
+		count = counts['powerplants']
+	elapsed = time.time() - start_time
+
+	print(u"Wrote {0} plants to {1} in {2:.2f} s ({3:.0f} plants/s).".format(
+		count, filename, elapsed, count / elapsed if elapsed else float('inf')))
+	if skipped:
+		print(u"Could not write {0} plants, e.g. {1}.".format(len(skipped), u", ".join(unicode(s) for s in skipped[:10])))
+
+	if return_connection:
+		return conn
+	else:
+		conn.close()
+
+def write_sqlite_file(plants_dict, filename, return_connection=False):
+	"""
+	Write database into sqlite format from nested dict.
+
+	Parameters
+	----------
+	plants_dict : dict
+		Has the structure inherited from <read_csv_file_to_dict>.
+	filename : str
+		Output filepath; should not exist before function call.
+	return_connection : bool (default False)
+		Whether to return an active database connection.
+
+	Returns
+	-------
+	conn: sqlite3.Connection
+		Only returned if `return_connection` is True.
+
+	Raises
+	------
+	OSError
+		If SQLite cannot make a database connection.
+	sqlite3.Error
+		If database has already been populated.
+
+	"""
+	columns = [name for name, decl in SQLITE_COLUMNS]
+	rows = ([p[column] for column in columns] for p in plants_dict.itervalues())
+	conn, counts = _bulk_load_sqlite(filename, [('powerplants', SQLITE_COLUMNS, rows)], SQLITE_INDEXES)
+
+	if return_connection:
+		return conn
+	else:
+		conn.close()
+
+
+def copy_csv_to_sqlite(csv_filename, sqlite_filename, return_connection=False):
+	"""
+	Copy the output database from CSV format into SQLite format.
+
+	Parameters
+	----------
+	csv_filename : str
+		Input file to copy.
+	sqlite_filename : str
+		Output database file; should not exist prior to function call.
+	"""
+	pdb = read_csv_file_to_dict(csv_filename)
+	try:
+		conn = write_sqlite_file(pdb, sqlite_filename, return_connection=return_connection)
+	except:
+		raise Exception('Error handling sqlite database')
+	if return_connection:
+		return conn
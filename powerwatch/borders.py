@@ -0,0 +1,251 @@
+"""
+PowerWatch
+borders.py
+Offline country lookup for plant coordinates, from a local country boundary file.
+- Boundaries are read once from a GeoJSON file of country (multi)polygons, such as the
+Natural Earth admin-0 countries, and cached like other resources (see `pw.load_resource()`).
+- Points are prefiltered by the bounding box of each country, then tested with a
+vectorized even-odd (ray casting) point-in-polygon test; each country's edges are split
+into latitude strips so that a point is only tested against the edges its ray can cross.
+"""
+
+import math
+import json
+
+import numpy as np
+
+import powerwatch as pw
+
+### PARAMS ###
+COUNTRY_BOUNDARIES_FILE = pw.make_file_path(fileType = "resource", filename = "country_boundaries.geojson")
+NAME_PROPERTIES = ['ADMIN', 'admin', 'NAME_LONG', 'NAME', 'name']	# feature properties tried for the country name
+COAST_TOLERANCE_KM = 10.0		# points this close to their country (e.g. offshore or on the coast) are accepted
+MAX_CROSSING_TESTS = 1 << 20	# point-edge tests computed at a time
+
+### BOUNDARIES ###
+
+class CountryBoundary(object):
+	"""
+	Boundary of a country: the edges of all rings of its polygons.
+
+	Parameters
+	----------
+	name : unicode
+		Country name.
+	rings : list of array of float, shape (n, 2)
+		Exterior rings and holes of the country's polygons, as (longitude, latitude)
+		vertices; a point is inside if a ray from it crosses an odd number of edges.
+	"""
+
+	def __init__(self, name, rings):
+		self.name = name
+		x1, y1, x2, y2 = [], [], [], []
+		for ring in rings:
+			ring = np.asarray(ring, dtype=float)
+			if len(ring) < 3:
+				continue
+			x1.append(ring[:, 0])
+			y1.append(ring[:, 1])
+			x2.append(np.roll(ring[:, 0], -1))
+			y2.append(np.roll(ring[:, 1], -1))
+		edges = np.array([np.concatenate(v) for v in [x1, y1, x2, y2]]) if x1 else np.zeros((4, 0))
+		self.bbox = (edges[0].min(), edges[1].min(), edges[0].max(), edges[1].max()) if edges.shape[1] else None
+		# horizontal edges are never crossed by a horizontal ray
+		edges = edges[:, edges[1] != edges[3]]
+		self.n_edges = edges.shape[1]
+		self._slope = (edges[2] - edges[0]) / (edges[3] - edges[1])
+		self._edges = edges
+
+		# latitude strips, each with the edges overlapping it
+		self.n_strips = max(1, int(math.sqrt(self.n_edges)))
+		if self.bbox is not None:
+			self._strip_height = max((self.bbox[3] - self.bbox[1]) / self.n_strips, 1e-9)
+			ymin = np.minimum(edges[1], edges[3])
+			ymax = np.maximum(edges[1], edges[3])
+			first = self._strips(ymin)
+			lengths = self._strips(ymax) - first + 1
+			offsets = np.cumsum(lengths) - lengths
+			strips = np.repeat(first - offsets, lengths) + np.arange(lengths.sum())
+			edge_ids = np.repeat(np.arange(self.n_edges), lengths)
+			order = np.argsort(strips, kind='mergesort')
+			bounds = np.searchsorted(strips[order], np.arange(self.n_strips + 1))
+			self._strip_edges = [edge_ids[order[bounds[i]:bounds[i + 1]]] for i in range(self.n_strips)]
+
+	def _strips(self, latitudes):
+		return np.clip(((latitudes - self.bbox[1]) / self._strip_height).astype(np.intp), 0, self.n_strips - 1)
+
+	def in_bbox(self, latitudes, longitudes):
+		"""Check which points are in the bounding box of the country."""
+		if self.bbox is None:
+			return np.zeros(len(latitudes), dtype=bool)
+		return ((longitudes >= self.bbox[0]) & (latitudes >= self.bbox[1]) &
+				(longitudes <= self.bbox[2]) & (latitudes <= self.bbox[3]))
+
+	def contains(self, latitudes, longitudes):
+		"""
+		Check which points are inside the country.
+
+		Parameters
+		----------
+		latitudes, longitudes : array of float
+			Points, in degrees.
+
+		Returns
+		-------
+		inside : array of bool
+		"""
+		latitudes = np.asarray(latitudes, dtype=float)
+		longitudes = np.asarray(longitudes, dtype=float)
+		inside = np.zeros(len(latitudes), dtype=bool)
+		candidates = np.flatnonzero(self.in_bbox(latitudes, longitudes))
+		if not len(candidates):
+			return inside
+		strips = self._strips(latitudes[candidates])
+		for strip in np.unique(strips):
+			points = candidates[strips == strip]
+			edges = self._strip_edges[strip]
+			if not len(edges):
+				continue
+			x1, y1, y2 = self._edges[0, edges], self._edges[1, edges], self._edges[3, edges]
+			slope = self._slope[edges]
+			step = max(1, MAX_CROSSING_TESTS // len(edges))
+			for start in range(0, len(points), step):
+				chunk = points[start:start + step]
+				py = latitudes[chunk, np.newaxis]
+				px = longitudes[chunk, np.newaxis]
+				crossing = ((y1 > py) != (y2 > py)) & (px < x1 + (py - y1) * slope)
+				inside[chunk] = crossing.sum(axis=1) % 2 == 1
+		return inside
+
+def _feature_rings(geometry):
+	"""Get the rings of a GeoJSON Polygon or MultiPolygon geometry."""
+	if not geometry:
+		return []
+	if geometry['type'] == 'Polygon':
+		return list(geometry['coordinates'])
+	if geometry['type'] == 'MultiPolygon':
+		return [ring for polygon in geometry['coordinates'] for ring in polygon]
+	if geometry['type'] == 'GeometryCollection':
+		return [ring for part in geometry['geometries'] for ring in _feature_rings(part)]
+	return []
+
+def make_country_boundaries(country_boundaries_file = COUNTRY_BOUNDARIES_FILE):
+	"""
+	Get a dict mapping country name to `CountryBoundary`.
+	The result is cached and shared between callers; see `load_resource()`.
+
+	Parameters
+	----------
+	country_boundaries_file : str
+		GeoJSON FeatureCollection of country polygons; names are read from the
+		first of NAME_PROPERTIES present and standardized with the country
+		names thesaurus (unrecognized names are kept as they are).
+
+	Returns
+	-------
+	Dict of {'country': CountryBoundary}.
+	"""
+	return pw.load_resource(country_boundaries_file, _read_country_boundaries)
+
+def _read_country_boundaries(country_boundaries_file):
+	"""Parse the country boundaries file (uncached)."""
+	with open(country_boundaries_file, 'rb') as f:
+		collection = json.load(f)
+	country_thesaurus = pw.make_country_names_thesaurus()
+	alias_index = pw.make_country_alias_index(country_thesaurus)
+	rings = {}
+	for feature in collection['features']:
+		properties = feature.get('properties') or {}
+		name = next((properties[key] for key in NAME_PROPERTIES if properties.get(key)), None)
+		if name is None:
+			continue
+		name = alias_index.get(name) or alias_index.get(pw.normalize_country_name(name)) or name
+		rings.setdefault(name, []).extend(_feature_rings(feature.get('geometry')))
+	return dict((name, CountryBoundary(name, country_rings)) for name, country_rings in rings.iteritems())
+
+### LOOKUPS ###
+
+def locate_countries(latitudes, longitudes, boundaries):
+	"""
+	Find the country containing each point.
+
+	Parameters
+	----------
+	latitudes, longitudes : sequence of float
+		Points, in degrees.
+	boundaries : dict of {unicode: CountryBoundary}
+		See `make_country_boundaries()`.
+
+	Returns
+	-------
+	countries : list of unicode
+		Country of each point; NO_DATA_UNICODE if it is in none.
+	"""
+	latitudes = np.asarray(latitudes, dtype=float)
+	longitudes = np.asarray(longitudes, dtype=float)
+	countries = np.empty(len(latitudes), dtype=object)
+	countries[:] = pw.NO_DATA_UNICODE
+	unlocated = np.ones(len(latitudes), dtype=bool)
+	for name in sorted(boundaries):
+		points = np.flatnonzero(unlocated)
+		if not len(points):
+			break
+		inside = boundaries[name].contains(latitudes[points], longitudes[points])
+		countries[points[inside]] = name
+		unlocated[points[inside]] = False
+	return list(countries)
+
+def _offsets(latitudes, longitudes, distance_km):
+	"""Get 8 points around each point at `distance_km`, as arrays of shape (8, n)."""
+	angles = np.radians(np.arange(0, 360, 45))[:, np.newaxis]
+	dlat = math.degrees(distance_km / 6371.0088)
+	cos_lat = np.maximum(np.cos(np.radians(latitudes)), 1e-6)
+	offset_latitudes = np.clip(latitudes + dlat * np.sin(angles), -90, 90)
+	offset_longitudes = (longitudes + dlat * np.cos(angles) / cos_lat + 180) % 360 - 180
+	return offset_latitudes, offset_longitudes
+
+def check_countries(countries, latitudes, longitudes, boundaries, tolerance_km = COAST_TOLERANCE_KM):
+	"""
+	Check that points are in their stated countries.
+
+	Points in their country, or within `tolerance_km` of it (tested at 8
+	surrounding points), pass. For the others, the country they are in is found.
+	Points of a country missing from `boundaries` only fail if they are in another country.
+
+	Parameters
+	----------
+	countries : sequence of unicode
+		Stated country of each point.
+	latitudes, longitudes : sequence of float
+		Points, in degrees.
+	boundaries : dict of {unicode: CountryBoundary}
+		See `make_country_boundaries()`.
+	tolerance_km : float
+		Distance from the stated country within which points pass.
+
+	Returns
+	-------
+	errors : dict of {int: unicode}
+		For each point that fails, its position in the input and the country it
+		is in (NO_DATA_UNICODE if none).
+	"""
+	countries = np.asarray(countries, dtype=object)
+	latitudes = np.asarray(latitudes, dtype=float)
+	longitudes = np.asarray(longitudes, dtype=float)
+	passed = np.zeros(len(countries), dtype=bool)
+	for country in set(countries):
+		if country not in boundaries:
+			continue
+		points = np.flatnonzero(countries == country)
+		passed[points] = boundaries[country].contains(latitudes[points], longitudes[points])
+		if tolerance_km:
+			near = points[~passed[points]]
+			if len(near):
+				offset_latitudes, offset_longitudes = _offsets(latitudes[near], longitudes[near], tolerance_km)
+				inside = boundaries[country].contains(offset_latitudes.ravel(), offset_longitudes.ravel())
+				passed[near] = inside.reshape(offset_latitudes.shape).any(axis=0)
+	failed = np.flatnonzero(~passed)
+	located = locate_countries(latitudes[failed], longitudes[failed], boundaries)
+	# points of countries without a boundary can only be shown to be wrong by being in another country
+	return dict((int(position), country) for position, country in zip(failed, located)
+				if country or countries[position] in boundaries)
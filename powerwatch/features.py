@@ -0,0 +1,122 @@
+"""
+PowerWatch
+features.py
+Feature rows of power plants for the generation estimation model, shared by training
+(utils/estimate_generation/train_generation_estimator.py) and prediction (predict_generation.py).
+- Totals and averages by country and fuel are computed with vectorized group-bys
+(np.unique and np.bincount) over the plant table, in time linear in the number of plants.
+- Columns are in the order of FEATURE_NAMES; the fuel type is an index into the
+model's list of fuel types, so training and prediction encode it the same way.
+"""
+
+import numpy as np
+
+### PARAMS ###
+FEATURE_NAMES = ['fuel_type', 'capacity_mw', 'commissioning_year', 'fuel_avg_cf', 'cap_sh_country', 'cap_sh_country_fuel']
+FEATURE_LABELS = ['Fuel type', 'Capacity (MW)', 'Commissioning year', 'Average CF (fuel)', 'Share nat. cap.', 'Share nat. cap. by fuel']
+
+### GROUP-BY ###
+
+def group_index(*keys):
+	"""
+	Number the distinct combinations of keys of the rows.
+
+	Parameters
+	----------
+	keys : lists or arrays
+		Key values of each row (e.g. countries, fuels).
+
+	Returns
+	-------
+	groups : list of tuple
+		Key values of each group.
+	inverse : array of int
+		Group of each row.
+	"""
+	keys = [np.asarray(key) for key in keys]
+	codes, sizes = [], []
+	for key in keys:
+		values, code = np.unique(key, return_inverse=True)
+		codes.append(code)
+		sizes.append(max(1, len(values)))
+	combined = np.ravel_multi_index(codes, sizes)
+	_, first, inverse = np.unique(combined, return_index=True, return_inverse=True)
+	groups = [tuple(key[row] for key in keys) for row in first]
+	return groups, inverse
+
+def _group_dict(groups, values):
+	"""Dict of the value of each group, keyed by key value (one key) or tuple of key values."""
+	return dict((group if len(group) > 1 else group[0], float(value)) for group, value in zip(groups, values))
+
+def group_totals(values, *keys):
+	"""
+	Sum values by group of keys.
+
+	Returns
+	-------
+	totals : dict
+		Total of each group, keyed by key value (one key) or tuple of key values.
+	"""
+	groups, inverse = group_index(*keys)
+	return _group_dict(groups, np.bincount(inverse, weights=values, minlength=len(groups)))
+
+def group_means(values, *keys):
+	"""
+	Average values by group of keys.
+
+	Returns
+	-------
+	means : dict
+		Average of each group, keyed by key value (one key) or tuple of key values.
+	"""
+	groups, inverse = group_index(*keys)
+	counts = np.bincount(inverse, minlength=len(groups))
+	return _group_dict(groups, np.bincount(inverse, weights=values, minlength=len(groups)) / counts)
+
+### FEATURES ###
+
+def make_features(countries, fuels, capacities, years, fuel_types, average_capacity_factors):
+	"""
+	Make the feature rows of plants.
+
+	Parameters
+	----------
+	countries, fuels : lists or arrays
+		Country and (primary) fuel of each plant.
+	capacities : list or array of float
+		Capacity (MW) of each plant.
+	years : list or array of float
+		Commissioning year of each plant (NaN if unknown).
+	fuel_types : list
+		Fuel types of the model; the fuel type feature is the index into this list.
+	average_capacity_factors : dict of {(country, fuel): float}
+		Average capacity factor by country and fuel.
+
+	Returns
+	-------
+	X : array of float, shape (n_plants, len(FEATURE_NAMES))
+		Feature rows. Capacity shares are relative to the total capacity of all given plants
+		in the same country (and of the same fuel); plants without capacity (NaN) are left out
+		of the totals. Features are NaN where the capacity is unknown, the fuel is not in
+		fuel_types or there is no average capacity factor.
+	"""
+	capacities = np.asarray(capacities, dtype=float)
+	# one plant without capacity must not make the totals of its whole country NaN
+	known_capacities = np.where(np.isfinite(capacities), capacities, 0.0)
+	groups, country_fuel = group_index(countries, fuels)
+	_, country = group_index(countries)
+	capacity_by_country = np.bincount(country, weights=known_capacities)
+	capacity_by_country_fuel = np.bincount(country_fuel, weights=known_capacities, minlength=len(groups))
+	fuel_index = dict((fuel, index) for index, fuel in enumerate(fuel_types))
+	group_fuel_index = np.array([fuel_index.get(fuel, np.nan) for _, fuel in groups], dtype=float)
+	group_capacity_factor = np.array([average_capacity_factors.get(group, np.nan) for group in groups], dtype=float)
+
+	X = np.empty((len(capacities), len(FEATURE_NAMES)))
+	X[:, 0] = group_fuel_index[country_fuel]
+	X[:, 1] = capacities
+	X[:, 2] = years
+	X[:, 3] = group_capacity_factor[country_fuel]
+	with np.errstate(divide='ignore', invalid='ignore'):
+		X[:, 4] = capacities / capacity_by_country[country]
+		X[:, 5] = capacities / capacity_by_country_fuel[country_fuel]
+	return X
@@ -0,0 +1,218 @@
+"""
+PowerWatch
+gbrt.py
+Dependency-free evaluation of gradient boosted regression trees (GBRT).
+- `CompiledGBRT.from_sklearn()` flattens the trees of a trained sklearn
+GradientBoostingRegressor into NumPy node arrays (feature, threshold, children,
+value), with the learning rate folded into the leaf values.
+- `predict()` scores many rows at once, moving every (row, tree) pair down one
+level per step; it matches sklearn's predictions to floating-point tolerance.
+Trees up to COMPLETE_TREE_MAX_DEPTH deep are first padded to complete binary trees,
+so that the children of node i are 2i+1 and 2i+2 and need not be looked up.
+- Models are saved as .npz files, which load in milliseconds without sklearn.
+"""
+
+import json
+
+import numpy as np
+
+### PARAMS ###
+MAX_CHUNK_CELLS = 1 << 16		# (row, tree) pairs evaluated at a time (kept in cache)
+COMPLETE_TREE_MAX_DEPTH = 10	# deeper models are evaluated from their node arrays
+TREE_LEAF = -1					# child index of leaves in sklearn trees
+
+### MODEL ###
+
+class CompiledGBRT(object):
+	"""
+	Gradient boosted regression trees as flat node arrays.
+
+	Parameters
+	----------
+	feature : array of int
+		Feature tested at each node (0 at leaves).
+	threshold : array of float
+		Rows with feature value <= threshold go to the left child.
+	left, right : array of int
+		Children of each node, as indices into the node arrays; leaves point to themselves.
+	value : array of float
+		Contribution of each leaf to the prediction (already scaled by the learning rate).
+	roots : array of int
+		Root node of each tree.
+	init : float
+		Initial (constant) prediction.
+	max_depth : int
+		Depth of the deepest tree.
+	n_features : int
+		Number of features of each row.
+	metadata : dict, optional
+		JSON-serializable information saved with the model (e.g. training parameters).
+	"""
+
+	def __init__(self, feature, threshold, left, right, value, roots, init, max_depth, n_features, metadata = None):
+		self.feature = np.asarray(feature, dtype=np.intp)
+		self.threshold = np.asarray(threshold, dtype=np.float64)
+		self.left = np.asarray(left, dtype=np.intp)
+		self.right = np.asarray(right, dtype=np.intp)
+		self.value = np.asarray(value, dtype=np.float64)
+		self.roots = np.asarray(roots, dtype=np.intp)
+		self.init = float(init)
+		self.max_depth = int(max_depth)
+		self.n_features = int(n_features)
+		self.metadata = metadata or {}
+		self._complete = None
+
+	@classmethod
+	def from_sklearn(cls, estimator, metadata = None):
+		"""
+		Export a trained sklearn GradientBoostingRegressor.
+
+		Parameters
+		----------
+		estimator : GradientBoostingRegressor
+			Trained single-output model; only its attributes are read, so sklearn
+			is not imported by this module.
+		metadata : dict, optional
+			Saved with the model.
+		"""
+		n_features = getattr(estimator, 'n_features_in_', None) or estimator.n_features_
+		if estimator.init_ == 'zero':
+			init = 0.0
+		else:
+			init = float(np.ravel(estimator.init_.predict(np.zeros((1, n_features))))[0])
+		feature, threshold, left, right, value, roots = [], [], [], [], [], []
+		offset = 0
+		max_depth = 0
+		for stage in estimator.estimators_:
+			tree = stage[0].tree_
+			n_nodes = tree.node_count
+			is_leaf = tree.children_left == TREE_LEAF
+			nodes = np.arange(n_nodes)
+			feature.append(np.where(is_leaf, 0, tree.feature))
+			threshold.append(np.where(is_leaf, 0.0, tree.threshold))
+			left.append(offset + np.where(is_leaf, nodes, tree.children_left))
+			right.append(offset + np.where(is_leaf, nodes, tree.children_right))
+			value.append(np.where(is_leaf, estimator.learning_rate * tree.value[:, 0, 0], 0.0))
+			roots.append(offset)
+			max_depth = max(max_depth, _tree_depth(tree.children_left, tree.children_right))
+			offset += n_nodes
+		return cls(np.concatenate(feature), np.concatenate(threshold), np.concatenate(left), np.concatenate(right),
+			np.concatenate(value), roots, init, max_depth, n_features, metadata)
+
+	@property
+	def n_trees(self):
+		return len(self.roots)
+
+	def predict(self, X):
+		"""
+		Predict values for rows of features.
+
+		Parameters
+		----------
+		X : array of float, shape (n_rows, n_features)
+			Feature rows.
+
+		Returns
+		-------
+		predictions : array of float, shape (n_rows,)
+		"""
+		# sklearn trees compare float32 features with float64 thresholds
+		X = np.atleast_2d(np.asarray(X, dtype=np.float32))
+		if X.shape[1] != self.n_features:
+			raise ValueError("Expected {0} features, got {1}".format(self.n_features, X.shape[1]))
+		predictions = np.empty(len(X))
+		chunk_rows = max(1, MAX_CHUNK_CELLS // max(1, self.n_trees))
+		predict_chunk = self._predict_complete if self.max_depth <= COMPLETE_TREE_MAX_DEPTH else self._predict_nodes
+		for start in range(0, len(X), chunk_rows):
+			chunk = X[start:start + chunk_rows]
+			predictions[start:start + len(chunk)] = self.init + predict_chunk(chunk)
+		return predictions
+
+	def _predict_nodes(self, X):
+		"""Sum of the leaf values of each row, following the child arrays."""
+		rows = np.arange(len(X))[:, np.newaxis]
+		nodes = np.repeat(self.roots[np.newaxis, :], len(X), axis=0)
+		for _ in range(self.max_depth):
+			go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+			nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+		return self.value[nodes].sum(axis=1)
+
+	def _complete_trees(self):
+		"""
+		Pad the trees to complete binary trees of depth max_depth.
+
+		Returns
+		-------
+		feature, threshold : array, shape (n_trees, 2 ** max_depth - 1)
+			Split of each internal node; leaves above the last level become splits
+			that always go left (threshold inf), down to a copy of the leaf.
+		value : array, shape (n_trees, 2 ** max_depth)
+			Value of each leaf of the last level.
+		"""
+		if self._complete is None:
+			n_internal = 2 ** self.max_depth - 1
+			node_at = np.empty((self.n_trees, 2 * n_internal + 1), dtype=np.intp)
+			node_at[:, 0] = self.roots
+			for position in range(n_internal):
+				nodes = node_at[:, position]
+				node_at[:, 2 * position + 1] = self.left[nodes]
+				node_at[:, 2 * position + 2] = self.right[nodes]
+			internal = node_at[:, :n_internal]
+			is_leaf = self.left[internal] == internal
+			feature = np.where(is_leaf, 0, self.feature[internal])
+			threshold = np.where(is_leaf, np.inf, self.threshold[internal])
+			self._complete = (feature.ravel(), threshold.ravel(), self.value[node_at[:, n_internal:]].ravel())
+		return self._complete
+
+	def _predict_complete(self, X):
+		"""Sum of the leaf values of each row, in the complete trees."""
+		feature, threshold, value = self._complete_trees()
+		n_internal = 2 ** self.max_depth - 1
+		# float32 features are exactly float64, and float64 comparisons are faster
+		X = X.astype(np.float64).ravel()
+		row_offsets = (np.arange(len(X) // self.n_features) * self.n_features)[:, np.newaxis]
+		tree_offsets = np.arange(self.n_trees) * n_internal
+		# node i of tree t is tree_offsets[t] + i, so its children are 2 * node + 1 - tree_offsets[t] (+ 1)
+		nodes = np.repeat(tree_offsets[np.newaxis, :], len(row_offsets), axis=0)
+		child_shift = 1 - tree_offsets
+		columns = np.empty_like(nodes)
+		go_right = np.empty(nodes.shape, dtype=bool)
+		for _ in range(self.max_depth):
+			np.add(row_offsets, feature.take(nodes), out=columns)
+			np.greater(X.take(columns), threshold.take(nodes), out=go_right)
+			nodes *= 2
+			nodes += child_shift
+			nodes += go_right
+		# leaves of tree t start at t * (n_internal + 1)
+		nodes += np.arange(self.n_trees) - n_internal
+		return value.take(nodes).sum(axis=1)
+
+	### SAVE/LOAD ###
+
+	def save(self, filename):
+		"""Save the model as an .npz file."""
+		np.savez(filename, feature=self.feature.astype(np.int32), threshold=self.threshold,
+			left=self.left.astype(np.int32), right=self.right.astype(np.int32), value=self.value,
+			roots=self.roots.astype(np.int32), init=self.init, max_depth=self.max_depth,
+			n_features=self.n_features, metadata=json.dumps(self.metadata, sort_keys=True))
+
+	@classmethod
+	def load(cls, filename):
+		"""Load a model saved with `save()`."""
+		data = np.load(filename, allow_pickle=False)
+		try:
+			return cls(data['feature'], data['threshold'], data['left'], data['right'], data['value'],
+				data['roots'], data['init'], data['max_depth'], data['n_features'], json.loads(unicode(data['metadata'])))
+		finally:
+			data.close()
+
+def _tree_depth(children_left, children_right):
+	"""Get the depth of a tree from its child arrays (root at depth 0)."""
+	depth = 0
+	level = [0]
+	while True:
+		level = [child for node in level if children_left[node] != TREE_LEAF
+					for child in (children_left[node], children_right[node])]
+		if not level:
+			return depth
+		depth += 1
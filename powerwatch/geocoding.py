@@ -0,0 +1,255 @@
+"""
+PowerWatch
+geocoding.py
+Concurrent, rate-limited reverse geocoding of plant coordinates to countries, with a persistent cache.
+- Requests are made by a pool of `workers` threads and limited to `rate` per second
+by a token bucket shared between them.
+- Results are cached on disk by coordinates rounded to `precision` decimals, so
+co-located plants and repeated runs do not query the service again.
+- Responses are parsed in the format of the Google Maps geocoding API.
+"""
+
+import os
+import time
+import threading
+from multiprocessing.pool import ThreadPool
+
+import requests
+
+import powerwatch as pw
+
+### PARAMS ###
+GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+GEOCODE_CACHE_FILE = os.path.join(pw.RAW_CACHE_DIR, "geocoding", "reverse_geocode_countries.json")
+GEOCODE_WORKERS = 8					# simultaneous requests
+GEOCODE_RATE = 40.0					# requests per second
+GEOCODE_PRECISION = 4				# decimals of the coordinates in cache keys (about 10 m)
+GEOCODE_RETRIES = 3					# attempts after the first one
+GEOCODE_BACKOFF = 1.0				# seconds before first retry, doubled after each
+GEOCODE_TIMEOUT = (5, 30)			# connect and read timeouts in seconds
+GEOCODE_SAVE_EVERY = 100			# new results between cache saves
+
+class GeocodeError(Exception):
+	"""Raised when a location cannot be reverse geocoded."""
+	def __init__(self, message, retryable = True):
+		Exception.__init__(self, message)
+		self.retryable = retryable
+
+### RATE LIMIT ###
+
+class TokenBucket(object):
+	"""
+	Thread-safe token bucket: allows `rate` acquisitions per second on average,
+	and bursts of up to `capacity`.
+	"""
+
+	def __init__(self, rate, capacity = 1):
+		self.rate = float(rate)
+		self.capacity = float(capacity)
+		self._tokens = float(capacity)
+		self._updated = time.time()
+		self._lock = threading.Lock()
+
+	def acquire(self):
+		"""Wait until a token is available and take it."""
+		while True:
+			with self._lock:
+				now = time.time()
+				self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+				self._updated = now
+				if self._tokens >= 1:
+					self._tokens -= 1
+					return
+				wait = (1 - self._tokens) / self.rate
+			time.sleep(wait)
+
+### CACHE ###
+
+class GeocodeCache(object):
+	"""
+	Persistent cache of reverse geocoding results, keyed by rounded coordinates.
+
+	Parameters
+	----------
+	filename : str, optional
+		JSON file the cache is read from and saved to; without it, the cache is in memory only.
+	precision : int
+		Decimals of the coordinates in cache keys.
+	"""
+
+	def __init__(self, filename = None, precision = GEOCODE_PRECISION):
+		self.filename = filename
+		self.precision = precision
+		self._lock = threading.Lock()
+		data = pw._read_json(filename) if filename else None
+		if data and data.get('precision') == precision:
+			self._results = data['results']
+		else:
+			self._results = {}
+		self._unsaved = 0
+
+	def key(self, latitude, longitude):
+		"""Get the cache key of a location."""
+		return "{0:.{2}f},{1:.{2}f}".format(latitude, longitude, self.precision)
+
+	def __len__(self):
+		return len(self._results)
+
+	def __contains__(self, key):
+		return key in self._results
+
+	def get(self, key, default = None):
+		return self._results.get(key, default)
+
+	def put(self, key, country):
+		"""Store a result; the cache is saved every GEOCODE_SAVE_EVERY new results."""
+		with self._lock:
+			self._results[key] = country
+			self._unsaved += 1
+			save = self._unsaved >= GEOCODE_SAVE_EVERY
+		if save:
+			self.save()
+
+	def save(self):
+		"""Save the cache to its file, if it has one."""
+		with self._lock:
+			if not self.filename:
+				return
+			pw._write_json(self.filename, {'precision': self.precision, 'results': dict(self._results)})
+			self._unsaved = 0
+
+### REVERSE GEOCODING ###
+
+def parse_country(response_json):
+	"""
+	Get the country from a reverse geocoding response.
+
+	Returns
+	-------
+	country : unicode
+		Long name of the country of the first result; NO_DATA_UNICODE if there are no results.
+
+	Raises
+	------
+	GeocodeError
+		If the service reports an error.
+	"""
+	status = response_json.get('status', 'OK')
+	if status == 'ZERO_RESULTS':
+		return pw.NO_DATA_UNICODE
+	if status != 'OK':
+		raise GeocodeError("Geocoding service status {0}".format(status),
+			retryable = status in ('OVER_QUERY_LIMIT', 'UNKNOWN_ERROR'))
+	results = response_json.get('results') or []
+	if not results:
+		return pw.NO_DATA_UNICODE
+	for component in results[0].get('address_components', []):
+		if "country" in component.get('types', []):
+			return component['long_name']
+	return pw.NO_DATA_UNICODE
+
+class ReverseGeocoder(object):
+	"""
+	Reverse geocode many locations to countries, concurrently and with a rate limit.
+
+	Parameters
+	----------
+	api_key : str
+		Key of the geocoding service.
+	url : str
+		Reverse geocoding endpoint.
+	cache : GeocodeCache, optional
+		Cache of results; an in-memory one is used if not given.
+	workers : int
+		Simultaneous requests.
+	rate : float
+		Requests per second.
+	retries, backoff, timeout
+		See GEOCODE_RETRIES, GEOCODE_BACKOFF and GEOCODE_TIMEOUT.
+	"""
+
+	def __init__(self, api_key, url = GEOCODE_URL, cache = None, workers = GEOCODE_WORKERS, rate = GEOCODE_RATE,
+					retries = GEOCODE_RETRIES, backoff = GEOCODE_BACKOFF, timeout = GEOCODE_TIMEOUT):
+		self.api_key = api_key
+		self.url = url
+		self.cache = cache if cache is not None else GeocodeCache()
+		self.workers = workers
+		self.bucket = TokenBucket(rate)
+		self.retries = retries
+		self.backoff = backoff
+		self.timeout = timeout
+		self.session = pw.make_download_session(workers)
+
+	def query(self, latitude, longitude):
+		"""
+		Reverse geocode one location, without the cache.
+
+		Raises
+		------
+		GeocodeError
+			If the request still fails after all retries.
+		"""
+		params = {'latlng': "{0},{1}".format(latitude, longitude), 'key': self.api_key}
+		for attempt in range(self.retries + 1):
+			if attempt:
+				time.sleep(self.backoff * 2 ** (attempt - 1))
+			self.bucket.acquire()
+			try:
+				response = self.session.get(self.url, params = params, timeout = self.timeout)
+				if response.status_code != 200:
+					raise GeocodeError("HTTP status {0}".format(response.status_code),
+						retryable = response.status_code >= 500 or response.status_code in (408, 429))
+				return parse_country(response.json())
+			except GeocodeError as e:
+				error = e
+			except (requests.exceptions.RequestException, ValueError) as e:
+				error = GeocodeError(str(e))
+			if not error.retryable:
+				break
+		raise error
+
+	def _lookup(self, key):
+		latitude, longitude = [float(value) for value in key.split(",")]
+		try:
+			country = self.query(latitude, longitude)
+		except GeocodeError as e:
+			return key, None, e
+		self.cache.put(key, country)
+		return key, country, None
+
+	def countries(self, locations, progress = None):
+		"""
+		Reverse geocode locations to countries.
+
+		Parameters
+		----------
+		locations : list of (float, float)
+			Latitude and longitude of each location.
+		progress : function, optional
+			Called with the number of queries done and to do after each query.
+
+		Returns
+		-------
+		countries : list of unicode or None
+			Country of each location (NO_DATA_UNICODE if the service found none),
+			or None where the query failed.
+		errors : dict of {str: GeocodeError}
+			Error of each failed cache key.
+		"""
+		keys = [self.cache.key(latitude, longitude) for latitude, longitude in locations]
+		# co-located plants are queried once
+		missing = sorted(set(key for key in keys if key not in self.cache))
+		failed = {}
+		if missing:
+			pool = ThreadPool(min(self.workers, len(missing)))
+			try:
+				for done, (key, country, error) in enumerate(pool.imap_unordered(self._lookup, missing), 1):
+					if error is not None:
+						failed[key] = error
+					if progress is not None:
+						progress(done, len(missing))
+			finally:
+				pool.close()
+				pool.join()
+				self.cache.save()
+		return [None if key in failed else self.cache.get(key) for key in keys], failed
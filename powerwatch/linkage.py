@@ -0,0 +1,329 @@
+"""
+PowerWatch
+linkage.py
+Match plants between source databases (record linkage), e.g. to generate the
+master plant concordance from the WRI, GEO and CARMA databases.
+- Plants are blocked by country; within a country, a plant is only compared with
+the plants sharing a distinctive name token or lying within `BLOCK_RADIUS_KM`.
+- Candidate pairs are scored on name similarity (token overlap weighted by rarity
+within the country), capacity, fuel and distance; the score is a confidence in [0, 1].
+- Countries are matched in parallel in a process pool.
+"""
+
+import re
+import csv
+import math
+import unicodedata
+import collections
+import multiprocessing
+
+import powerwatch as pw
+from powerwatch import spatial
+
+### PARAMS ###
+MATCH_THRESHOLD = 0.6			# lowest score of a reported match
+BLOCK_RADIUS_KM = 10.0			# plants this close are compared whatever their names
+MAX_TOKEN_BLOCK = 200			# name tokens shared by more plants of a country do not form blocks
+DISTANCE_SCALE_KM = 5.0			# distance at which the distance similarity falls to 1/e
+MATCH_WEIGHTS = {'name': 0.5, 'capacity': 0.2, 'fuel': 0.15, 'distance': 0.15}
+MISSING_SIMILARITY = 0.5		# similarity used for a component missing from either plant
+
+# Words in plant names that do not distinguish plants
+NAME_STOPWORDS = frozenset([u"power", u"plant", u"station", u"generating", u"generation", u"project",
+	u"farm", u"park", u"energy", u"central", u"centrale", u"usina", u"the", u"of", u"de", u"del",
+	u"la", u"el", u"and", u"co", u"inc", u"ltd", u"llc", u"ps", u"gs"])
+
+# Plant attributes used for matching; plain tuples so that blocks can be sent to worker processes
+PlantRecord = collections.namedtuple('PlantRecord', ['idnr', 'tokens', 'capacity', 'fuel', 'latitude', 'longitude'])
+
+### RECORDS ###
+
+def name_tokens(name):
+	"""
+	Split a plant name into normalized tokens.
+
+	Parameters
+	----------
+	name : unicode
+		Plant name.
+
+	Returns
+	-------
+	tokens : tuple of unicode
+		Lowercase tokens without accents or stopwords, in order of appearance.
+	"""
+	if not isinstance(name, unicode):
+		name = pw.format_string(name)
+	name = unicodedata.normalize('NFKD', name or u"")
+	name = u"".join(c for c in name if not unicodedata.combining(c)).lower()
+	return tuple(token for token in re.findall(r"[^\W_]+", name, re.UNICODE) if token not in NAME_STOPWORDS)
+
+def plant_record(plant_id, plant):
+	"""Get the matching attributes of a plant as a PlantRecord."""
+	# attributes may be unset in databases loaded with selected fields only
+	latitude = longitude = None
+	location = getattr(plant, 'location', None)
+	if isinstance(location, pw.LocationObject) and location.latitude and location.longitude:
+		if abs(location.latitude) <= 90 and abs(location.longitude) <= 180:
+			latitude, longitude = location.latitude, location.longitude
+	capacity = getattr(plant, 'capacity', None)
+	capacity = float(capacity) if capacity and capacity > 0 else None
+	return PlantRecord(plant_id, name_tokens(getattr(plant, 'name', u"")), capacity,
+		frozenset(getattr(plant, 'fuel', None) or ()), latitude, longitude)
+
+def plant_records(database):
+	"""
+	Get the matching attributes of the plants of a database, blocked by country.
+
+	Returns
+	-------
+	blocks : dict of {unicode: list of PlantRecord}
+		Records of each country, sorted by plant ID.
+	"""
+	blocks = {}
+	for plant_id in sorted(database):
+		plant = database[plant_id]
+		if not isinstance(plant, pw.PowerPlant) or not getattr(plant, 'country', None):
+			continue
+		blocks.setdefault(plant.country, []).append(plant_record(plant_id, plant))
+	return blocks
+
+### SCORING ###
+
+def token_weights(*blocks):
+	"""Get the weight of each name token in a country: rare tokens weigh more."""
+	frequency = collections.Counter()
+	n = 0
+	for records in blocks:
+		for record in records:
+			frequency.update(set(record.tokens))
+			n += 1
+	return dict((token, math.log(1.0 + float(n) / df)) for token, df in frequency.iteritems())
+
+def name_similarity(tokens1, tokens2, weights):
+	"""Weighted Jaccard similarity of two sets of name tokens."""
+	tokens1, tokens2 = set(tokens1), set(tokens2)
+	union = sum(weights.get(token, 0.0) for token in tokens1 | tokens2)
+	if not union:
+		return None
+	return sum(weights.get(token, 0.0) for token in tokens1 & tokens2) / union
+
+def capacity_similarity(capacity1, capacity2):
+	"""Ratio of the smaller capacity to the larger one."""
+	if capacity1 is None or capacity2 is None:
+		return None
+	return min(capacity1, capacity2) / max(capacity1, capacity2)
+
+def fuel_similarity(fuel1, fuel2):
+	"""1 if the plants share a fuel, 0 if not."""
+	if not fuel1 or not fuel2:
+		return None
+	return 1.0 if fuel1 & fuel2 else 0.0
+
+def distance_similarity(distance_km):
+	"""Similarity decaying exponentially with distance."""
+	if distance_km is None:
+		return None
+	return math.exp(-distance_km / DISTANCE_SCALE_KM)
+
+def match_score(record1, record2, weights, distance_km = None):
+	"""
+	Score a candidate pair of plants.
+
+	Parameters
+	----------
+	record1, record2 : PlantRecord
+		The plants.
+	weights : dict of {unicode: float}
+		Name token weights; see `token_weights()`.
+	distance_km : float, optional
+		Distance between the plants, computed if not given.
+
+	Returns
+	-------
+	score : float
+		Weighted mean of the component similarities, in [0, 1]; components
+		missing from either plant count as MISSING_SIMILARITY.
+	"""
+	if distance_km is None and record1.latitude is not None and record2.latitude is not None:
+		distance_km = float(spatial.haversine_km(record1.latitude, record1.longitude, record2.latitude, record2.longitude))
+	similarities = {
+		'name': name_similarity(record1.tokens, record2.tokens, weights),
+		'capacity': capacity_similarity(record1.capacity, record2.capacity),
+		'fuel': fuel_similarity(record1.fuel, record2.fuel),
+		'distance': distance_similarity(distance_km),
+	}
+	total = 0.0
+	for component, weight in MATCH_WEIGHTS.iteritems():
+		similarity = similarities[component]
+		total += weight * (MISSING_SIMILARITY if similarity is None else similarity)
+	return total / sum(MATCH_WEIGHTS.values())
+
+### MATCHING ###
+
+def match_block(left, right, threshold = MATCH_THRESHOLD, radius_km = BLOCK_RADIUS_KM, max_token_block = MAX_TOKEN_BLOCK):
+	"""
+	Find the best match of each plant of one country among the plants of another database.
+
+	Parameters
+	----------
+	left, right : list of PlantRecord
+		Plants of the country in each database.
+	threshold : float
+		Lowest score of a reported match.
+	radius_km : float
+		Plants within this distance are compared even if their names differ.
+	max_token_block : int
+		Name tokens shared by more plants of `right` are not used for blocking.
+
+	Returns
+	-------
+	matches : list of (str, str, float)
+		Left plant ID, right plant ID and score of the best match of each left
+		plant that has one, in the order of `left`.
+	"""
+	weights = token_weights(left, right)
+	postings = collections.defaultdict(list)
+	for position, record in enumerate(right):
+		for token in set(record.tokens):
+			postings[token].append(position)
+
+	# candidates by location
+	nearby = {}
+	located_right = [position for position, record in enumerate(right) if record.latitude is not None]
+	located_left = [position for position, record in enumerate(left) if record.latitude is not None]
+	if located_right and located_left:
+		index = spatial.SpatialIndex(located_right, [right[p].latitude for p in located_right],
+			[right[p].longitude for p in located_right], cell_degrees = spatial.DEFAULT_CELL_DEGREES)
+		results = index.query_radius([left[p].latitude for p in located_left],
+			[left[p].longitude for p in located_left], radius_km)
+		for position, (positions, distances) in zip(located_left, results):
+			nearby[position] = dict(zip(positions, distances))
+
+	matches = []
+	for position, record in enumerate(left):
+		distances = nearby.get(position, {})
+		candidates = set(distances)
+		for token in set(record.tokens):
+			posting = postings.get(token, ())
+			if len(posting) <= max_token_block:
+				candidates.update(posting)
+		best = None
+		for candidate in sorted(candidates):
+			score = match_score(record, right[candidate], weights, distances.get(candidate))
+			if score >= threshold and (best is None or score > best[1]):
+				best = (candidate, score)
+		if best is not None:
+			matches.append((record.idnr, right[best[0]].idnr, best[1]))
+	return matches
+
+def _match_block_task(task):
+	"""Run match_block() for one (left, right, kwargs) task in a worker process."""
+	left, right, kwargs = task
+	return match_block(left, right, **kwargs)
+
+def link_databases(left_database, right_database, workers = None, **kwargs):
+	"""
+	Match the plants of one database to those of another, country by country.
+
+	Parameters
+	----------
+	left_database, right_database : dict of {str: PowerPlant}
+		Databases to match; each plant of `left_database` gets at most one match.
+	workers : int, optional
+		Number of worker processes; defaults to the number of CPUs. With 1,
+		countries are matched in this process.
+	**kwargs
+		Passed on to match_block(), e.g. `threshold`.
+
+	Returns
+	-------
+	matches : dict of {str: (str, float)}
+		Matched plant ID and score for each matched plant of `left_database`.
+	"""
+	left_blocks = plant_records(left_database)
+	right_blocks = plant_records(right_database)
+	countries = [country for country in left_blocks if country in right_blocks]
+	# largest blocks first, so that they do not finish last
+	countries.sort(key = lambda country: len(left_blocks[country]) * len(right_blocks[country]), reverse = True)
+	tasks = [(left_blocks[country], right_blocks[country], kwargs) for country in countries]
+	if workers == 1 or len(tasks) <= 1:
+		results = map(_match_block_task, tasks)
+	else:
+		pool = multiprocessing.Pool(workers)
+		try:
+			results = pool.map(_match_block_task, tasks, chunksize = 1)
+		finally:
+			pool.close()
+			pool.join()
+	matches = {}
+	for block_matches in results:
+		for left_id, right_id, score in block_matches:
+			matches[left_id] = (right_id, score)
+	return matches
+
+### CONCORDANCE ###
+
+def make_concordance(wri_database, geo_database, carma_database, curated = None, workers = None, **kwargs):
+	"""
+	Generate a plant concordance by matching WRI plants to GEO and CARMA plants.
+
+	Parameters
+	----------
+	wri_database, geo_database, carma_database : dict of {str: PowerPlant}
+		Databases to match.
+	curated : dict of {str: dict}, optional
+		Hand-curated concordance (see `pw.make_plant_concordance()`); its IDs
+		take precedence over automated matches and get a score of 1.
+	workers : int, optional
+		Number of worker processes.
+	**kwargs
+		Passed on to match_block(), e.g. `threshold`.
+
+	Returns
+	-------
+	concordance : dict of {str: dict}
+		Like `pw.make_plant_concordance()`, with the confidence of each match
+		in 'geo_score' and 'carma_score' (None if there is no match).
+	"""
+	concordance = {}
+	for key, database in [('geo', geo_database), ('carma', carma_database)]:
+		for wri_id, (match_id, score) in link_databases(wri_database, database, workers, **kwargs).iteritems():
+			entry = concordance.setdefault(wri_id, {'geo_id': "", 'carma_id': "", 'osm_id': "", 'geo_score': None, 'carma_score': None})
+			entry[key + '_id'] = match_id
+			entry[key + '_score'] = score
+	for wri_id, curated_entry in (curated or {}).iteritems():
+		entry = concordance.setdefault(wri_id, {'geo_id': "", 'carma_id': "", 'osm_id': "", 'geo_score': None, 'carma_score': None})
+		for key in ['geo', 'carma', 'osm']:
+			if curated_entry.get(key + '_id'):
+				entry[key + '_id'] = curated_entry[key + '_id']
+				if key != 'osm':
+					entry[key + '_score'] = 1.0
+	return concordance
+
+def _id_number(plant_id):
+	"""Get the number of a plant ID made by `pw.make_id()`."""
+	return str(int(re.search(r"\d+$", plant_id).group())) if plant_id else ""
+
+def _format_score(score):
+	return "" if score is None else "{0:.3f}".format(score)
+
+def write_concordance(concordance, filename):
+	"""
+	Write a concordance in the format of the master plant concordance file, with
+	'geo_score' and 'carma_score' columns added.
+
+	Parameters
+	----------
+	concordance : dict of {str: dict}
+		See `make_concordance()`.
+	filename : str
+		Output CSV file; it can be read with `pw.make_plant_concordance()`.
+	"""
+	with open(filename, 'wb') as f:
+		writer = csv.writer(f)
+		writer.writerow(['wri_id', 'geo_id', 'carma_id', 'osm_id', 'geo_score', 'carma_score'])
+		for wri_id in sorted(concordance):
+			entry = concordance[wri_id]
+			writer.writerow([_id_number(wri_id), _id_number(entry['geo_id']), _id_number(entry['carma_id']),
+				_id_number(entry['osm_id']), _format_score(entry.get('geo_score')), _format_score(entry.get('carma_score'))])
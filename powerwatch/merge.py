@@ -0,0 +1,372 @@
+"""
+PowerWatch
+merge.py
+Combine source databases into the PowerWatch database.
+- Each build step adds the plants of one source and returns them as a partition:
+a dict with the plants added to PowerWatch ('plants'), all plants for the data
+dump ('datadump'), counts and capacity added per data source ('additions'),
+lines for the build log ('log'), other messages ('warnings'), the CARMA plants
+used for locations ('carma_id_used'), and per-step 'counters' and 'seconds'.
+- Steps do not print, write files or read command-line arguments; see
+build_databases/build_powerwatch.py for the build script.
+"""
+
+import time
+import copy
+import functools
+
+import powerwatch as pw
+
+### PARAMS ###
+MINIMUM_CAPACITY_MW = 1
+
+# Sources counted in database_additions besides the national databases
+MULTINATIONAL_SOURCES = ["WRI", "GEO", "SourceWatch", "WRI with GEO lat/long data", "WRI with CARMA lat/long data"]
+
+### PARTITIONS ###
+
+def new_partition(step):
+	"""Get an empty set of results for one build step."""
+	return {'step': step, 'plants': {}, 'datadump': {}, 'additions': {}, 'log': [], 'warnings': [],
+			'carma_id_used': set(), 'counters': {}, 'seconds': 0.0}
+
+def count(partition, counter, n = 1):
+	"""Increase a per-step counter."""
+	partition['counters'][counter] = partition['counters'].get(counter, 0) + n
+
+def count_addition(partition, dbname, plant):
+	"""Record a plant added to PowerWatch from `dbname`."""
+	additions = partition['additions'].setdefault(dbname, {'count': 0, 'capacity': 0})
+	additions['count'] += 1
+	additions['capacity'] += plant.capacity
+
+def timed_step(function):
+	"""Record the run time of a step function in the 'seconds' of the partition it returns."""
+	@functools.wraps(function)
+	def wrapper(*args, **kwargs):
+		start = time.time()
+		partition = function(*args, **kwargs)
+		partition['seconds'] = time.time() - start
+		return partition
+	return wrapper
+
+def has_location(plant):
+	"""Check whether a plant has non-zero coordinates."""
+	return bool((plant.location.latitude and plant.location.longitude) and (plant.location.latitude != 0 and plant.location.longitude != 0))
+
+### BUILD STEPS ###
+
+@timed_step
+def add_country_plants(country_name, database, minimum_capacity = MINIMUM_CAPACITY_MW):
+	"""
+	STEP 1: Add all data (capacity >= 1MW) from a country with automated data.
+
+	Parameters
+	----------
+	country_name : unicode
+		Country of the national database, used as its data source name.
+	database : dict of {str: PowerPlant}
+		The national database.
+	minimum_capacity : float
+		Smallest capacity (MW) of plants added to PowerWatch.
+	"""
+	partition = new_partition(country_name)
+	coordinate_source = country_name + u" national data"
+	for plant_id,plant in database.iteritems():
+		count(partition, 'plants')
+		plant.coord_source = coordinate_source
+		partition['datadump'][plant_id] = plant
+		if plant.capacity >= minimum_capacity:
+			if has_location(plant):
+				partition['plants'][plant_id] = plant
+				count_addition(partition, country_name, plant)
+				count(partition, 'added')
+			else:
+				plant.idnr = plant_id + u",No"
+				count(partition, 'no location')
+		else:
+			plant.idnr = plant_id + u",No"
+			count(partition, 'below minimum capacity')
+	return partition
+
+@timed_step
+def triage_wri_plants(wri_database, country_dictionary, plant_concordance, geo_database, carma_database,
+						minimum_capacity = MINIMUM_CAPACITY_MW):
+	"""
+	STEP 2: Go through WRI database and triage plants.
+
+	Plants with coordinates are added as they are. Plants without are added
+	with the location of the GEO or CARMA plant they are matched to in the
+	concordance.
+
+	Parameters
+	----------
+	wri_database : dict of {str: PowerPlant}
+		The WRI database.
+	country_dictionary : dict of {unicode: CountryObject}
+		See `pw.make_country_dictionary()`.
+	plant_concordance : dict of {str: dict}
+		See `pw.make_plant_concordance()`.
+	geo_database, carma_database : dict of {str: PowerPlant}
+		Databases supplying locations; only indexed by plant ID, so they can
+		be loaded lazily.
+	minimum_capacity : float
+		Smallest capacity (MW) of plants added to PowerWatch.
+	"""
+	partition = new_partition("WRI")
+	for plant_id, plant in wri_database.iteritems():
+		count(partition, 'plants')
+		# Cases to skip
+		if not isinstance(plant, pw.PowerPlant):
+			partition['log'].append('Error: plant {0} is not a PowerPlant object.\n'.format(plant_id))
+			count(partition, 'not a PowerPlant')
+			continue
+		if plant.country not in country_dictionary:
+			partition['log'].append('Error: country {0} not recognized.\n'.format(plant.country))
+			count(partition, 'unknown country')
+			continue
+		# Skip plants with data loaded directly from a national API
+		if country_dictionary[plant.country].has_api:
+			count(partition, 'national data')
+			continue
+		# Skip plants in countries where we will use GEO data
+		if country_dictionary[plant.country].use_geo:
+			count(partition, 'GEO country')
+			continue
+
+		partition['datadump'][plant_id] = plant
+
+		# Skip plants below minimum capacity cutoff
+		if plant.capacity < minimum_capacity:
+			count(partition, 'below minimum capacity')
+			continue
+
+		# STEP 2.1: If plant has lat/long information, add it to PowerWatch
+		if has_location(plant):
+			plant.idnr = plant_id
+			plant.coord_source = u"WRI data"
+			partition['plants'][plant_id] = plant
+			count_addition(partition, 'WRI', plant)
+			count(partition, 'added with WRI location')
+			continue
+
+		# STEP 2.2: If plant is matched to GEO, add to PowerWatch using GEO lat/long
+		if plant_id in plant_concordance:
+			matching_geo_id = plant_concordance[plant_id]['geo_id']
+			if matching_geo_id:
+				try:
+					plant.location = geo_database[matching_geo_id].location
+				except:
+					partition['log'].append("Matching error: no GEO location for WRI plant {0}, GEO plant {1}\n".format(plant_id,matching_geo_id))
+					count(partition, 'GEO match error')
+					continue
+				if plant.location.latitude and plant.location.longitude:
+					plant.idnr = plant_id
+					plant.coord_source = u"GEO data"
+					partition['plants'][plant_id] = plant
+					count_addition(partition, "WRI with GEO lat/long data", plant)
+					count(partition, 'added with GEO location')
+					continue
+
+		# STEP 2.3: If plant is matched to CARMA, add to PowerWatch using CARMA lat/long
+		if plant_id in plant_concordance:
+			matching_carma_id = plant_concordance[plant_id]['carma_id']
+			if matching_carma_id:
+				try:
+					plant.location = carma_database[matching_carma_id].location
+				except:
+					partition['log'].append("Matching error: no CARMA location for WRI plant {0}, CARMA plant {1}\n".format(plant_id,matching_carma_id))
+					count(partition, 'CARMA match error')
+					continue
+				if plant.location.latitude and plant.location.longitude:
+					plant.idnr = plant_id
+					plant.coord_source = u"CARMA data"
+					partition['plants'][plant_id] = plant
+					partition['carma_id_used'].add(matching_carma_id)
+					count_addition(partition, "WRI with CARMA lat/long data", plant)
+					count(partition, 'added with CARMA location')
+					continue
+		# Note: Would eventually like to refine CARMA locations - known to be inaccurate in some cases
+		count(partition, 'no location')
+	return partition
+
+@timed_step
+def add_geo_plants(geo_database, country_dictionary):
+	"""
+	STEP 3: Go through GEO database and add plants from small countries.
+	Plants in this database only have numeric ID (no prefix) because of concordance matching.
+	"""
+	partition = new_partition("GEO")
+	for plant_id,plant in geo_database.iteritems():
+		count(partition, 'plants')
+		# Catch errors if plants do not have a correct country assigned
+		partition['datadump'][plant_id] = plant
+		if plant.country not in country_dictionary:
+			partition['warnings'].append("Plant {0} has country {1} - not found.".format(plant_id,plant.country))
+			count(partition, 'unknown country')
+			continue
+		if country_dictionary[plant.country].use_geo:
+			if has_location(plant):
+				plant.coord_source = u"GEO data"
+				plant.idnr = plant_id
+				partition['plants'][plant_id] = plant
+				count(partition, 'added')
+				try:
+					count_addition(partition, 'GEO', plant)
+				except:
+					partition['log'].append("Attribute Warning: GEO plant {0} does not have valid capacity information <{1}>\n".format(plant_id, plant.capacity))
+			else:
+				count(partition, 'no location')
+		else:
+			count(partition, 'not a GEO country')
+	return partition
+
+@timed_step
+def add_sourcewatch_plants(sourcewatch_database):
+	"""STEP 4: Add China coal plants from SourceWatch."""
+	partition = new_partition("SourceWatch")
+	for plant_id,plant in sourcewatch_database.iteritems():
+		count(partition, 'plants')
+		partition['datadump'][plant_id] = plant
+		if has_location(plant):
+			plant.coord_source = u"SourceWatch data"
+			partition['plants'][plant_id] = plant
+			count_addition(partition, 'SourceWatch', plant)
+			count(partition, 'added')
+		else:
+			count(partition, 'no location')
+	return partition
+
+@timed_step
+def add_unused_carma_plants(carma_database, carma_id_used):
+	"""
+	STEP 7.2: Add CARMA plants not used for WRI locations to the data dump.
+
+	Parameters
+	----------
+	carma_database : dict of {str: PowerPlant}
+		The CARMA database, with all fields.
+	carma_id_used : set of str
+		IDs of CARMA plants used in STEP 2.
+	"""
+	partition = new_partition("CARMA")
+	for plant_id,plant in carma_database.iteritems():
+		count(partition, 'plants')
+		plant.coord_source = u"CARMA data"
+		if plant_id in carma_id_used:
+			count(partition, 'used for WRI location')
+			continue
+		else:
+			plant.idnr = plant_id + ",No"
+			partition['datadump'][plant_id] = plant
+			count(partition, 'added to data dump')
+	return partition
+
+### MERGE ###
+
+def merge_partitions(partitions, db_sources):
+	"""
+	Combine the results of build steps, in step order.
+
+	Plants are inserted in ID order, so that results read back from a cache
+	give the same dicts (and output files) as freshly computed ones.
+
+	Parameters
+	----------
+	partitions : list of dict
+		Results of the build steps.
+	db_sources : list of str
+		Data source names reported in the additions, even if nothing was added.
+
+	Returns
+	-------
+	result : dict
+		'plants' and 'datadump' (dicts of {str: PowerPlant}), 'additions'
+		(dict of {source: {'count', 'capacity'}}) and 'log' (list of lines).
+	"""
+	result = {'plants': {}, 'datadump': {}, 'log': [],
+				'additions': dict((dbname, {'count': 0, 'capacity': 0}) for dbname in db_sources)}
+	for partition in partitions:
+		for plant_id in sorted(partition['datadump']):
+			result['datadump'][plant_id] = partition['datadump'][plant_id]
+		for plant_id in sorted(partition['plants']):
+			result['plants'][plant_id] = partition['plants'][plant_id]
+		for dbname, data in partition['additions'].iteritems():
+			additions = result['additions'].setdefault(dbname, {'count': 0, 'capacity': 0})
+			additions['count'] += data['count']
+			additions['capacity'] += data['capacity']
+		result['log'].extend(partition['log'])
+	return result
+
+def label_datadump(powerwatch_database, powerwatch_datadump):
+	"""
+	STEP 7.1: Label plants in the data dump by whether they are in PowerWatch.
+
+	Labeled copies replace the plants in `powerwatch_datadump`, so plants
+	shared with `powerwatch_database` keep their IDs.
+	"""
+	for plant_id,plant in powerwatch_datadump.items():
+		plant = copy.copy(plant)
+		if plant_id in powerwatch_database:
+			plant.idnr = plant_id + ",Yes"
+		else:
+			plant.idnr = plant_id + ",No"
+		powerwatch_datadump[plant_id] = plant
+
+def merge_databases(country_databases, wri_database, geo_database, carma_database, sourcewatch_database,
+					country_dictionary, plant_concordance, minimum_capacity = MINIMUM_CAPACITY_MW, dump = False):
+	"""
+	Run all build steps in process and combine their results.
+
+	Parameters
+	----------
+	country_databases : dict of {unicode: dict}
+		National databases by country name, for countries with `has_api`.
+	wri_database, geo_database, carma_database, sourcewatch_database : dict of {str: PowerPlant}
+		Multinational source databases.
+	country_dictionary : dict of {unicode: CountryObject}
+		See `pw.make_country_dictionary()`.
+	plant_concordance : dict of {str: dict}
+		See `pw.make_plant_concordance()`.
+	minimum_capacity : float
+		Smallest capacity (MW) of plants added to PowerWatch.
+	dump : bool
+		Whether to label the data dump and add unused CARMA plants to it.
+
+	Returns
+	-------
+	result : dict
+		As returned by `merge_partitions()`, plus the 'partitions' of each step.
+		Generation is not estimated.
+	"""
+	partitions = [add_country_plants(country_name, database, minimum_capacity)
+					for country_name, database in country_databases.iteritems()]
+	wri_partition = triage_wri_plants(wri_database, country_dictionary, plant_concordance,
+										geo_database, carma_database, minimum_capacity)
+	partitions.append(wri_partition)
+	partitions.append(add_geo_plants(geo_database, country_dictionary))
+	partitions.append(add_sourcewatch_plants(sourcewatch_database))
+	result = merge_partitions(partitions, country_databases.keys() + MULTINATIONAL_SOURCES)
+	if dump:
+		label_datadump(result['plants'], result['datadump'])
+		carma_partition = add_unused_carma_plants(carma_database, wri_partition['carma_id_used'])
+		partitions.append(carma_partition)
+		for plant_id in sorted(carma_partition['datadump']):
+			result['datadump'][plant_id] = carma_partition['datadump'][plant_id]
+	result['partitions'] = partitions
+	return result
+
+def step_report(partitions):
+	"""
+	Get a summary of the counters and run time of each build step.
+
+	Returns
+	-------
+	lines : list of str
+		One line per step, with its run time and counters.
+	"""
+	lines = []
+	for partition in partitions:
+		counters = ", ".join("{0}: {1}".format(name, n) for name, n in sorted(partition['counters'].iteritems()))
+		lines.append(u"{0:<24} {1:>7.2f} s  {2}".format(partition['step'], partition['seconds'], counters))
+	return lines
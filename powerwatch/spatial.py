@@ -0,0 +1,227 @@
+"""
+PowerWatch
+spatial.py
+Spatial index over plant coordinates, with batch radius and k-nearest-neighbour queries.
+- Points are bucketed into a grid of `cell_degrees` latitude/longitude cells and
+sorted by cell, so the points of any cell are a contiguous slice found by binary search.
+- A query only computes haversine distances to points in the cells overlapping the
+bounding box of its search circle; k-nearest-neighbour queries widen the circle until
+k points are found.
+- Results are exact: the same as computing the distance to every point.
+"""
+
+import math
+
+import numpy as np
+
+import powerwatch as pw
+
+### PARAMS ###
+EARTH_RADIUS_KM = 6371.0088		# mean Earth radius
+DEFAULT_CELL_DEGREES = 0.5
+
+### DISTANCES ###
+
+def haversine_km(latitude1, longitude1, latitude2, longitude2):
+	"""
+	Great-circle distance between points, in km.
+
+	Parameters
+	----------
+	latitude1, longitude1, latitude2, longitude2 : float or array of float
+		Coordinates in degrees; arrays are broadcast against each other.
+
+	Returns
+	-------
+	distance : float or array of float
+	"""
+	lat1 = np.radians(latitude1)
+	lat2 = np.radians(latitude2)
+	half_dlat = (lat2 - lat1) / 2.0
+	half_dlon = np.radians(np.subtract(longitude2, longitude1)) / 2.0
+	a = np.sin(half_dlat) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(half_dlon) ** 2
+	return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def _ranges(starts, ends):
+	"""Concatenate np.arange(start, end) for each pair of bounds."""
+	lengths = ends - starts
+	total = lengths.sum()
+	if not total:
+		return np.zeros(0, dtype=np.intp)
+	offsets = np.cumsum(lengths) - lengths
+	return np.repeat(starts - offsets, lengths) + np.arange(total)
+
+### INDEX ###
+
+class SpatialIndex(object):
+	"""
+	Grid index of point coordinates (e.g. plant locations).
+
+	Parameters
+	----------
+	ids : sequence
+		Identifier of each point, returned by queries.
+	latitudes, longitudes : sequence of float
+		Coordinates of each point in degrees.
+	cell_degrees : float
+		Size of grid cells; queries are fastest if it is close to the typical search radius.
+
+	Raises
+	------
+	ValueError
+		If the inputs differ in length or a coordinate is invalid.
+	"""
+
+	def __init__(self, ids, latitudes, longitudes, cell_degrees = DEFAULT_CELL_DEGREES):
+		latitudes = np.asarray(latitudes, dtype=float)
+		longitudes = np.asarray(longitudes, dtype=float)
+		if not (len(ids) == len(latitudes) == len(longitudes)):
+			raise ValueError("ids, latitudes and longitudes must have the same length")
+		if not (np.all(np.abs(latitudes) <= 90) and np.all(np.abs(longitudes) <= 180)):
+			raise ValueError("Coordinates must be finite, with |latitude| <= 90 and |longitude| <= 180")
+		self.cell_degrees = float(cell_degrees)
+		self.n_rows = int(math.ceil(180.0 / self.cell_degrees))
+		self.n_cols = int(math.ceil(360.0 / self.cell_degrees))
+
+		keys = self._rows(latitudes) * self.n_cols + self._cols(longitudes)
+		order = np.argsort(keys, kind='mergesort')
+		self.ids = np.empty(len(ids), dtype=object)
+		self.ids[:] = list(ids)
+		self.ids = self.ids[order]
+		self.latitudes = latitudes[order]
+		self.longitudes = longitudes[order]
+		self._keys = keys[order]
+
+	@classmethod
+	def from_plants(cls, *databases, **kwargs):
+		"""
+		Build an index of plant locations.
+
+		Parameters
+		----------
+		*databases : dict of {str: PowerPlant}
+			Databases to index; plants without coordinates (missing or zero)
+			are left out.
+		**kwargs
+			Passed on to SpatialIndex(), e.g. `cell_degrees`.
+		"""
+		ids, latitudes, longitudes = [], [], []
+		for database in databases:
+			for plant_id, plant in database.iteritems():
+				location = getattr(plant, 'location', None)
+				if not isinstance(location, pw.LocationObject):
+					continue
+				latitude, longitude = location.latitude, location.longitude
+				if not (latitude and longitude) or latitude != latitude or longitude != longitude:
+					continue
+				if abs(latitude) > 90 or abs(longitude) > 180:
+					continue
+				ids.append(plant_id)
+				latitudes.append(latitude)
+				longitudes.append(longitude)
+		return cls(ids, latitudes, longitudes, **kwargs)
+
+	def __len__(self):
+		return len(self.ids)
+
+	def _rows(self, latitudes):
+		return np.clip(np.floor((np.asarray(latitudes) + 90.0) / self.cell_degrees).astype(np.int64), 0, self.n_rows - 1)
+
+	def _cols(self, longitudes):
+		return np.floor((np.asarray(longitudes) + 180.0) / self.cell_degrees).astype(np.int64) % self.n_cols
+
+	def _candidates(self, latitude, longitude, radius_km):
+		"""Get positions of the points in cells overlapping the bounding box of a search circle."""
+		angle = radius_km / EARTH_RADIUS_KM
+		if angle >= math.pi:
+			return np.arange(len(self.ids))
+		dlat = math.degrees(angle)
+		rows = np.arange(self._rows(latitude - dlat), self._rows(latitude + dlat) + 1)
+		cos_lat = math.cos(math.radians(latitude))
+		if latitude + dlat >= 90 or latitude - dlat <= -90 or math.sin(angle) >= cos_lat:
+			cols = np.arange(self.n_cols)	# circle contains a pole
+		else:
+			dlon = math.degrees(math.asin(math.sin(angle) / cos_lat))
+			first = int(math.floor((longitude - dlon + 180.0) / self.cell_degrees))
+			last = int(math.floor((longitude + dlon + 180.0) / self.cell_degrees))
+			if last - first + 1 >= self.n_cols:
+				cols = np.arange(self.n_cols)
+			else:
+				cols = np.arange(first, last + 1) % self.n_cols
+		keys = (rows[:, np.newaxis] * self.n_cols + cols[np.newaxis, :]).ravel()
+		keys.sort()
+		return _ranges(np.searchsorted(self._keys, keys, 'left'), np.searchsorted(self._keys, keys, 'right'))
+
+	def _within(self, latitude, longitude, radius_km):
+		"""Get positions and distances of the points within `radius_km` of a point, nearest first."""
+		positions = self._candidates(latitude, longitude, radius_km)
+		distances = haversine_km(latitude, longitude, self.latitudes[positions], self.longitudes[positions])
+		inside = distances <= radius_km
+		positions, distances = positions[inside], distances[inside]
+		order = np.argsort(distances, kind='mergesort')
+		return positions[order], distances[order]
+
+	def query_radius(self, latitudes, longitudes, radius_km):
+		"""
+		Find the points within a distance of each query point.
+
+		Parameters
+		----------
+		latitudes, longitudes : float or sequence of float
+			Query points, in degrees.
+		radius_km : float or sequence of float
+			Search radius, for all queries or for each one.
+
+		Returns
+		-------
+		results : list of (array of ids, array of float)
+			For each query point, the IDs of points within the radius and their
+			distances in km, nearest first.
+		"""
+		latitudes = np.atleast_1d(np.asarray(latitudes, dtype=float))
+		longitudes = np.atleast_1d(np.asarray(longitudes, dtype=float))
+		radii = np.broadcast_to(np.asarray(radius_km, dtype=float), latitudes.shape)
+		results = []
+		for latitude, longitude, radius in zip(latitudes, longitudes, radii):
+			positions, distances = self._within(latitude, longitude, radius)
+			results.append((self.ids[positions], distances))
+		return results
+
+	def query_nearest(self, latitudes, longitudes, k = 1, max_distance_km = None):
+		"""
+		Find the k nearest points to each query point.
+
+		Parameters
+		----------
+		latitudes, longitudes : float or sequence of float
+			Query points, in degrees.
+		k : int
+			Number of neighbours.
+		max_distance_km : float, optional
+			Ignore points further away than this.
+
+		Returns
+		-------
+		ids : array of object, shape (queries, k)
+			IDs of the nearest points, nearest first; None where fewer than k were found.
+		distances : array of float, shape (queries, k)
+			Distances in km; inf where fewer than k points were found.
+		"""
+		latitudes = np.atleast_1d(np.asarray(latitudes, dtype=float))
+		longitudes = np.atleast_1d(np.asarray(longitudes, dtype=float))
+		limit = math.pi * EARTH_RADIUS_KM if max_distance_km is None else float(max_distance_km)
+		start_radius = min(limit, math.radians(self.cell_degrees) * EARTH_RADIUS_KM)
+		ids = np.empty((len(latitudes), k), dtype=object)
+		distances = np.full((len(latitudes), k), np.inf)
+		for i, (latitude, longitude) in enumerate(zip(latitudes, longitudes)):
+			radius = start_radius
+			while True:
+				positions, found = self._within(latitude, longitude, radius)
+				# every point within `radius` was found, so the k nearest are exact
+				if len(positions) >= k or radius >= limit:
+					break
+				radius = min(limit, radius * 2)
+			n = min(k, len(positions))
+			ids[i, :n] = self.ids[positions[:n]]
+			distances[i, :n] = found[:n]
+		return ids, distances
@@ -0,0 +1,50 @@
+"""
+PowerWatch
+benchmark_database_format.py
+Compare load times of the legacy pickle and PWDB formats for the source databases.
+Each database is converted to PWDB in a temporary directory; times are the best of several runs.
+"""
+
+import sys
+import os
+import glob
+import shutil
+import tempfile
+import timeit
+import argparse
+
+sys.path.insert(0, os.path.join(os.pardir, os.pardir))
+import powerwatch as pw
+
+def best_time(func, repeat):
+	"""Best wall time in seconds of `repeat` calls to `func`."""
+	return min(timeit.repeat(func, number=1, repeat=repeat))
+
+### MAIN ###
+if __name__ == '__main__':
+	argparser = argparse.ArgumentParser(description="Benchmark source database formats.")
+	argparser.add_argument('databases', nargs='*',
+		help="legacy database files; all files in source_databases/ by default")
+	argparser.add_argument('--repeat', type=int, default=3, help="runs per measurement")
+	args = argparser.parse_args()
+	if not args.databases:
+		args.databases = sorted(glob.glob(os.path.join(pw.SOURCE_DB_BIN_DIR, '*.bin')))
+
+	tempdir = tempfile.mkdtemp()
+	try:
+		totals = [0, 0.0, 0.0, 0.0]
+		print("{:<24} {:>8} {:>12} {:>12} {:>14}".format("database", "plants", "legacy (s)", "pwdb (s)", "location (s)"))
+		for filename in args.databases:
+			plants = pw.load_database(filename)
+			basename = os.path.basename(filename)
+			pw.save_database(plants, basename[:-len("-Database.bin")], tempdir)
+			converted = os.path.join(tempdir, basename)
+			legacy = best_time(lambda: pw.load_database(filename), args.repeat)
+			full = best_time(lambda: pw.load_database(converted), args.repeat)
+			location = best_time(lambda: pw.load_database(converted, fields=['location']), args.repeat)
+			print("{:<24} {:>8} {:>12.3f} {:>12.3f} {:>14.3f}".format(basename, len(plants), legacy, full, location))
+			for i, value in enumerate([len(plants), legacy, full, location]):
+				totals[i] += value
+		print("{:<24} {:>8} {:>12.3f} {:>12.3f} {:>14.3f}".format("total", *totals))
+	finally:
+		shutil.rmtree(tempdir)
@@ -0,0 +1,97 @@
+"""
+PowerWatch
+benchmark_gbrt.py
+Benchmark the NumPy GBRT evaluator (powerwatch.gbrt) on a model the size of the
+generation estimation model (1200 trees of depth 6, 6 features).
+Time loading the compiled model and predicting all rows at once; with sklearn installed,
+also fit a GradientBoostingRegressor of that size and compare with its predictions,
+per row (as predict_generation.py did) and batched, and with unpickling it.
+"""
+
+import sys
+import os
+import time
+import pickle
+import shutil
+import tempfile
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.pardir, os.pardir))
+from powerwatch import gbrt
+
+def timed(func):
+	"""Result of one call to `func` and its wall time in seconds."""
+	start_time = time.time()
+	result = func()
+	return result, time.time() - start_time
+
+def synthetic_model(n_trees, depth, n_features, rng):
+	"""Compiled model of random complete trees."""
+	n_nodes = 2 ** (depth + 1) - 1
+	nodes = np.arange(n_nodes)
+	is_leaf = nodes >= 2 ** depth - 1
+	feature, threshold, left, right, value = [], [], [], [], []
+	for tree in range(n_trees):
+		offset = tree * n_nodes
+		feature.append(np.where(is_leaf, 0, rng.randint(n_features, size=n_nodes)))
+		threshold.append(np.where(is_leaf, 0.0, rng.rand(n_nodes)))
+		left.append(offset + np.where(is_leaf, nodes, 2 * nodes + 1))
+		right.append(offset + np.where(is_leaf, nodes, 2 * nodes + 2))
+		value.append(np.where(is_leaf, 0.003 * rng.normal(size=n_nodes), 0.0))
+	return gbrt.CompiledGBRT(np.concatenate(feature), np.concatenate(threshold), np.concatenate(left),
+		np.concatenate(right), np.concatenate(value), np.arange(n_trees) * n_nodes, 0.5, depth, n_features)
+
+### MAIN ###
+if __name__ == '__main__':
+	argparser = argparse.ArgumentParser(description="Benchmark powerwatch.gbrt.")
+	argparser.add_argument('-n', '--rows', type=int, default=30000, help="rows (plants) to predict")
+	argparser.add_argument('--trees', type=int, default=1200)
+	argparser.add_argument('--depth', type=int, default=6)
+	args = argparser.parse_args()
+
+	n_features = 6
+	rng = np.random.RandomState(0)
+	X = rng.rand(args.rows, n_features)
+	try:
+		from sklearn.ensemble import GradientBoostingRegressor
+	except ImportError:
+		GradientBoostingRegressor = None
+		print("sklearn is not installed; timing a synthetic compiled model only.")
+
+	tempdir = tempfile.mkdtemp()
+	try:
+		if GradientBoostingRegressor is not None:
+			y = X[:, 0] + np.sin(6 * X[:, 1]) + 0.1 * rng.normal(size=len(X))
+			est = GradientBoostingRegressor(n_estimators=args.trees, max_depth=args.depth, learning_rate=0.003,
+				subsample=0.5, loss='huber', random_state=0)
+			est.fit(X[:5000], y[:5000])
+			model = gbrt.CompiledGBRT.from_sklearn(est)
+			pickle_file = os.path.join(tempdir, "model.pickle")
+			with open(pickle_file, 'wb') as f:
+				pickle.dump(est, f, pickle.HIGHEST_PROTOCOL)
+		else:
+			model = synthetic_model(args.trees, args.depth, n_features, rng)
+		compiled_file = os.path.join(tempdir, "model.npz")
+		model.save(compiled_file)
+
+		model, load_time = timed(lambda: gbrt.CompiledGBRT.load(compiled_file))
+		predictions, predict_time = timed(lambda: model.predict(X))
+		print("{:<40} {:>10}".format("{0} trees, {1} rows".format(model.n_trees, len(X)), "time (s)"))
+		print("{:<40} {:>10.4f}".format("load compiled model", load_time))
+		print("{:<40} {:>10.3f}".format("compiled, batched", predict_time))
+		if GradientBoostingRegressor is not None:
+			def unpickle():
+				with open(pickle_file, 'rb') as f:
+					return pickle.load(f)
+			_, unpickle_time = timed(unpickle)
+			sk_predictions, sk_time = timed(lambda: est.predict(X))
+			sample = X[:1000]
+			_, sk_row_time = timed(lambda: [est.predict(row.reshape(1, -1)) for row in sample])
+			print("{:<40} {:>10.4f}".format("unpickle sklearn model", unpickle_time))
+			print("{:<40} {:>10.3f}".format("sklearn, batched", sk_time))
+			print("{:<40} {:>10.3f}".format("sklearn, per row (estimated)", sk_row_time * len(X) / len(sample)))
+			print("Largest difference from sklearn: {0:.3g}".format(np.max(np.abs(predictions - sk_predictions))))
+	finally:
+		shutil.rmtree(tempdir)
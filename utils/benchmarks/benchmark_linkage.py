@@ -0,0 +1,85 @@
+"""
+PowerWatch
+benchmark_linkage.py
+Benchmark matching plants between two source databases (powerwatch.linkage),
+by default WRI against GEO.
+Compare blocked matching with scoring every pair of plants in the same country
+for a sample of plants, check how many of the exhaustive matches blocking finds,
+and estimate the time of a naive all-pairs comparison.
+"""
+
+import sys
+import os
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.pardir, os.pardir))
+import powerwatch as pw
+from powerwatch import linkage
+
+FIELDS = ['name', 'country', 'capacity', 'fuel', 'location']
+
+def timed(func):
+	"""Result of one call to `func` and its wall time in seconds."""
+	start_time = time.time()
+	result = func()
+	return result, time.time() - start_time
+
+def load_source(save_code):
+	"""Load the matching fields of a source database."""
+	filename = pw.make_file_path(fileType="src_bin", filename=save_code + "-Database.bin")
+	if not os.path.exists(filename):
+		sys.exit("{0} not found.".format(os.path.basename(filename)))
+	return pw.load_database(filename, compact=True, fields=FIELDS)
+
+def exhaustive_matches(left_blocks, right_blocks, threshold):
+	"""Best match of each plant, scoring every plant of the same country; also the number of pairs scored."""
+	matches = {}
+	pairs = 0
+	for country, left in left_blocks.iteritems():
+		right = right_blocks.get(country, [])
+		weights = linkage.token_weights(left, right)
+		for record in left:
+			best = None
+			for candidate in right:
+				score = linkage.match_score(record, candidate, weights)
+				if score >= threshold and (best is None or score > best[1]):
+					best = (candidate.idnr, score)
+			pairs += len(right)
+			if best is not None:
+				matches[record.idnr] = best
+	return matches, pairs
+
+### MAIN ###
+if __name__ == '__main__':
+	argparser = argparse.ArgumentParser(description="Benchmark powerwatch.linkage.")
+	argparser.add_argument('--left', default="WRI", help="save code of the database to match")
+	argparser.add_argument('--right', default="GEODB", help="save code of the database to match against")
+	argparser.add_argument('-n', '--sample', type=int, default=500, help="plants in the exhaustive comparison")
+	argparser.add_argument('-j', '--workers', type=int, default=None, help="worker processes")
+	args = argparser.parse_args()
+
+	left_database = load_source(args.left)
+	right_database = load_source(args.right)
+	print("Matching {0} {1} plants against {2} {3} plants.".format(len(left_database), args.left,
+		len(right_database), args.right))
+
+	matches, link_time = timed(lambda: linkage.link_databases(left_database, right_database, args.workers))
+	_, serial_time = timed(lambda: linkage.link_databases(left_database, right_database, 1))
+
+	random.seed(0)
+	sample_ids = random.sample(sorted(left_database), min(args.sample, len(left_database)))
+	left_blocks = linkage.plant_records(dict((plant_id, left_database[plant_id]) for plant_id in sample_ids))
+	right_blocks = linkage.plant_records(right_database)
+	(expected, pairs), exhaustive_time = timed(lambda: exhaustive_matches(left_blocks, right_blocks, linkage.MATCH_THRESHOLD))
+	found = sum(1 for plant_id, (match_id, _) in expected.iteritems() if matches.get(plant_id, (None,))[0] == match_id)
+	all_pairs_time = exhaustive_time / max(pairs, 1) * len(left_database) * len(right_database)
+
+	print("{:<48} {:>10}".format("method", "time (s)"))
+	print("{:<48} {:>10.2f}".format("blocked, process pool", link_time))
+	print("{:<48} {:>10.2f}".format("blocked, 1 process", serial_time))
+	print("{:<48} {:>10.2f}".format("same country, {0} plants ({1} pairs)".format(len(sample_ids), pairs), exhaustive_time))
+	print("{:<48} {:>10.0f}".format("all pairs (estimated)", all_pairs_time))
+	print("Matched {0} plants; blocking found {1} of the {2} exhaustive matches in the sample.".format(
+		len(matches), found, len(expected)))
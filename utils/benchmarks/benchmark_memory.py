@@ -0,0 +1,61 @@
+"""
+PowerWatch
+benchmark_memory.py
+Measure the in-memory size of the source databases, with and without compaction.
+Size is the deep size (sys.getsizeof) of every object reachable from the plant dict,
+counting shared objects once.
+"""
+
+import sys
+import os
+import glob
+import argparse
+
+sys.path.insert(0, os.path.join(os.pardir, os.pardir))
+import powerwatch as pw
+
+def deep_sizeof(obj, seen=None):
+	"""Size in bytes of `obj` and everything reachable from it, counting shared objects once."""
+	if seen is None:
+		seen = set()
+	size = 0
+	stack = [obj]
+	while stack:
+		o = stack.pop()
+		if id(o) in seen:
+			continue
+		seen.add(id(o))
+		size += sys.getsizeof(o)
+		if isinstance(o, dict):
+			stack.extend(o.iterkeys())
+			stack.extend(o.itervalues())
+		elif isinstance(o, (list, tuple, set, frozenset)):
+			stack.extend(o)
+		else:
+			if hasattr(o, '__dict__'):
+				stack.append(o.__dict__)
+			for attr in getattr(type(o), '__slots__', ()):
+				if hasattr(o, attr):
+					stack.append(getattr(o, attr))
+	return size
+
+### MAIN ###
+if __name__ == '__main__':
+	argparser = argparse.ArgumentParser(description="Measure memory use of source databases.")
+	argparser.add_argument('databases', nargs='*',
+		help="database files; all files in source_databases/ by default")
+	args = argparser.parse_args()
+	if not args.databases:
+		args.databases = sorted(glob.glob(os.path.join(pw.SOURCE_DB_BIN_DIR, '*.bin')))
+
+	total_plants, total_loaded, total_compact = 0, 0, 0
+	print("{:<24} {:>8} {:>12} {:>12}".format("database", "plants", "loaded (MB)", "compact (MB)"))
+	for filename in args.databases:
+		plants = pw.load_database(filename)
+		loaded = deep_sizeof(plants)
+		compact = deep_sizeof(pw.compact_database(plants))
+		print("{:<24} {:>8} {:>12.2f} {:>12.2f}".format(os.path.basename(filename), len(plants), loaded / 1e6, compact / 1e6))
+		total_plants += len(plants)
+		total_loaded += loaded
+		total_compact += compact
+	print("{:<24} {:>8} {:>12.2f} {:>12.2f}".format("total", total_plants, total_loaded / 1e6, total_compact / 1e6))
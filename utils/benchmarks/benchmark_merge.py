@@ -0,0 +1,88 @@
+"""
+PowerWatch
+benchmark_merge.py
+Run the PowerWatch merge steps (powerwatch.merge) in process on the source
+databases and print per-step counters and timings.
+Compare the data dump labelling (STEP 7.1) and the GEO country checks with the
+list-based membership tests build_powerwatch.py used before.
+Missing source databases (e.g. WRI or CARMA) are replaced by empty ones.
+"""
+
+import sys
+import os
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.pardir, os.pardir))
+import powerwatch as pw
+from powerwatch import merge
+
+def timed(func):
+	"""Result of one call to `func` and its wall time in seconds."""
+	start_time = time.time()
+	result = func()
+	return result, time.time() - start_time
+
+def load_source(save_code, **kwargs):
+	"""Load a source database, or get an empty one if it is missing."""
+	filename = pw.make_file_path(fileType="src_bin", filename=save_code + "-Database.bin")
+	if not os.path.exists(filename):
+		print("{0} not found; using an empty database.".format(os.path.basename(filename)))
+		return {}
+	return pw.load_database(filename, compact=True, **kwargs)
+
+def legacy_label_datadump(powerwatch_database, powerwatch_datadump):
+	"""STEP 7.1 as in the previous build_powerwatch.py, with a list of IDs."""
+	pw_idnrs = powerwatch_database.keys()
+	for plant_id,plant in powerwatch_datadump.iteritems():
+		if plant_id in pw_idnrs:
+			plant.idnr = plant_id + ",Yes"
+		else:
+			plant.idnr = plant_id + ",No"
+
+def legacy_geo_countries(geo_database, country_dictionary):
+	"""Country checks of STEP 3 as in the previous build_powerwatch.py."""
+	return sum(1 for plant in geo_database.itervalues() if plant.country not in country_dictionary.keys())
+
+def new_geo_countries(geo_database, country_dictionary):
+	"""Country checks of STEP 3 as in powerwatch.merge."""
+	return sum(1 for plant in geo_database.itervalues() if plant.country not in country_dictionary)
+
+### MAIN ###
+if __name__ == '__main__':
+	argparser = argparse.ArgumentParser(description="Benchmark powerwatch.merge.")
+	argparser.add_argument('-n', '--dump-plants', type=int, default=10000,
+		help="plants in the data dump for the STEP 7.1 comparison (the list-based version is quadratic)")
+	args = argparser.parse_args()
+
+	country_dictionary = pw.make_country_dictionary()
+	plant_concordance = pw.make_plant_concordance()
+	country_databases = dict((name, load_source(country.iso_code))
+		for name, country in country_dictionary.iteritems() if country.has_api == 1)
+	wri_database = load_source("WRI")
+	geo_database = load_source("GEODB")
+	carma_database = load_source("CARMA")
+	sourcewatch_database = load_source("SRCWT")
+
+	result, merge_time = timed(lambda: merge.merge_databases(country_databases, wri_database, geo_database,
+		carma_database, sourcewatch_database, country_dictionary, plant_concordance, dump=True))
+	print("Merged {0} plants ({1} in data dump) in {2:.3f} s:".format(
+		len(result['plants']), len(result['datadump']), merge_time))
+	for line in merge.step_report(result['partitions']):
+		print(line)
+
+	sample_ids = sorted(result['datadump'])[:args.dump_plants]
+	datadump = dict((plant_id, result['datadump'][plant_id]) for plant_id in sample_ids)
+	plants = dict((plant_id, plant) for plant_id, plant in result['plants'].iteritems() if plant_id in datadump)
+	_, legacy_label_time = timed(lambda: legacy_label_datadump(plants, datadump))
+	legacy_labels = dict((plant_id, plant.idnr) for plant_id, plant in datadump.iteritems())
+	_, label_time = timed(lambda: merge.label_datadump(plants, datadump))
+	labels = dict((plant_id, plant.idnr) for plant_id, plant in datadump.iteritems())
+	legacy_unknown, legacy_geo_time = timed(lambda: legacy_geo_countries(geo_database, country_dictionary))
+	unknown, geo_time = timed(lambda: new_geo_countries(geo_database, country_dictionary))
+
+	print("{:<40} {:>10} {:>10} {:>10}".format("step", "list (s)", "dict (s)", "identical"))
+	print("{:<40} {:>10.3f} {:>10.3f} {:>10}".format("label data dump ({0} plants)".format(len(datadump)),
+		legacy_label_time, label_time, str(labels == legacy_labels)))
+	print("{:<40} {:>10.3f} {:>10.3f} {:>10}".format("GEO country checks ({0} plants)".format(len(geo_database)),
+		legacy_geo_time, geo_time, str(unknown == legacy_unknown)))
@@ -0,0 +1,85 @@
+"""
+PowerWatch
+benchmark_spatial.py
+Benchmark the spatial index (powerwatch.spatial) on the CARMA, GEO and WRI
+plant locations combined.
+Time batch radius and k-nearest-neighbour queries from a sample of the plants
+against a brute-force scan of all haversine distances, and check the results agree.
+Missing source databases (e.g. WRI or CARMA) are left out.
+"""
+
+import sys
+import os
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.pardir, os.pardir))
+import powerwatch as pw
+from powerwatch import spatial
+
+def timed(func):
+	"""Result of one call to `func` and its wall time in seconds."""
+	start_time = time.time()
+	result = func()
+	return result, time.time() - start_time
+
+def load_source(save_code):
+	"""Load the locations of a source database, or get an empty one if it is missing."""
+	filename = pw.make_file_path(fileType="src_bin", filename=save_code + "-Database.bin")
+	if not os.path.exists(filename):
+		print("{0} not found; leaving it out.".format(os.path.basename(filename)))
+		return {}
+	return pw.load_database(filename, compact=True, fields=['location'])
+
+def brute_radius(index, latitudes, longitudes, radius_km):
+	"""Radius queries by computing the distance to every point."""
+	results = []
+	for latitude, longitude in zip(latitudes, longitudes):
+		distances = spatial.haversine_km(latitude, longitude, index.latitudes, index.longitudes)
+		inside = np.flatnonzero(distances <= radius_km)
+		order = np.argsort(distances[inside], kind='mergesort')
+		results.append((index.ids[inside[order]], distances[inside[order]]))
+	return results
+
+def brute_nearest(index, latitudes, longitudes, k):
+	"""k-nearest-neighbour distances by computing the distance to every point."""
+	distances = np.empty((len(latitudes), k))
+	for i, (latitude, longitude) in enumerate(zip(latitudes, longitudes)):
+		distances[i] = np.sort(spatial.haversine_km(latitude, longitude, index.latitudes, index.longitudes))[:k]
+	return distances
+
+### MAIN ###
+if __name__ == '__main__':
+	argparser = argparse.ArgumentParser(description="Benchmark powerwatch.spatial.")
+	argparser.add_argument('-n', '--queries', type=int, default=2000, help="number of query points")
+	argparser.add_argument('-r', '--radius', type=float, default=10.0, help="radius of radius queries (km)")
+	argparser.add_argument('-k', type=int, default=5, help="neighbours in k-nearest-neighbour queries")
+	argparser.add_argument('--cell-degrees', type=float, default=spatial.DEFAULT_CELL_DEGREES)
+	args = argparser.parse_args()
+
+	databases = [load_source(save_code) for save_code in ["CARMA", "GEODB", "WRI"]]
+	index, build_time = timed(lambda: spatial.SpatialIndex.from_plants(*databases, cell_degrees=args.cell_degrees))
+	print("Indexed {0} plant locations in {1:.3f} s.".format(len(index), build_time))
+	if not len(index):
+		sys.exit("No plant locations to index.")
+
+	rng = np.random.RandomState(0)
+	sample = rng.randint(0, len(index), args.queries)
+	latitudes, longitudes = index.latitudes[sample], index.longitudes[sample]
+
+	radius, radius_time = timed(lambda: index.query_radius(latitudes, longitudes, args.radius))
+	brute_radius_results, brute_radius_time = timed(lambda: brute_radius(index, latitudes, longitudes, args.radius))
+	radius_identical = all(sorted(ids) == sorted(expected_ids) and np.allclose(distances, expected_distances)
+		for (ids, distances), (expected_ids, expected_distances) in zip(radius, brute_radius_results))
+
+	(_, nearest), nearest_time = timed(lambda: index.query_nearest(latitudes, longitudes, k=args.k))
+	brute_nearest_results, brute_nearest_time = timed(lambda: brute_nearest(index, latitudes, longitudes, args.k))
+	nearest_identical = np.allclose(nearest, brute_nearest_results)
+
+	print("{:<40} {:>10} {:>10} {:>10}".format("query ({0} points)".format(args.queries), "scan (s)", "index (s)", "identical"))
+	print("{:<40} {:>10.3f} {:>10.3f} {:>10}".format("radius {0} km".format(args.radius),
+		brute_radius_time, radius_time, str(radius_identical)))
+	print("{:<40} {:>10.3f} {:>10.3f} {:>10}".format("{0} nearest".format(args.k),
+		brute_nearest_time, nearest_time, str(nearest_identical)))
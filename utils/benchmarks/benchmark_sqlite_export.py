@@ -0,0 +1,61 @@
+"""
+PowerWatch
+benchmark_sqlite_export.py
+Compare building the SQLite database through CSV (write_csv_file + copy_csv_to_sqlite)
+with the direct exporter (write_sqlite_database).
+Plants without capacity are left out, since read_csv_file_to_dict cannot parse them.
+"""
+
+import sys
+import os
+import glob
+import shutil
+import tempfile
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.pardir, os.pardir))
+import powerwatch as pw
+
+def timed(func):
+	"""Wall time in seconds of one call to `func`, with stdout silenced."""
+	stdout = sys.stdout
+	sys.stdout = open(os.devnull, 'w')
+	try:
+		start_time = time.time()
+		func()
+		return time.time() - start_time
+	finally:
+		sys.stdout.close()
+		sys.stdout = stdout
+
+### MAIN ###
+if __name__ == '__main__':
+	argparser = argparse.ArgumentParser(description="Benchmark SQLite export.")
+	argparser.add_argument('databases', nargs='*',
+		help="database files; all files in source_databases/ by default")
+	args = argparser.parse_args()
+	if not args.databases:
+		args.databases = sorted(glob.glob(os.path.join(pw.SOURCE_DB_BIN_DIR, '*.bin')))
+
+	plants = {}
+	for filename in args.databases:
+		for plant_id, plant in pw.load_database(filename).iteritems():
+			if getattr(plant, 'capacity', None) is not None:
+				plants[plant_id] = plant
+
+	tempdir = tempfile.mkdtemp()
+	try:
+		csv_file = os.path.join(tempdir, 'plants.csv')
+		via_csv = timed(lambda: pw.write_csv_file(plants, csv_file)) + \
+			timed(lambda: pw.copy_csv_to_sqlite(csv_file, os.path.join(tempdir, 'via_csv.sqlite')))
+		direct = timed(lambda: pw.write_sqlite_database(plants, os.path.join(tempdir, 'direct.sqlite')))
+		table = pw.PlantTable.from_dict(dict((k, p) for k, p in plants.iteritems()
+			if all(hasattr(p, field) for field in pw.DATABASE_FIELDS)))
+		from_table = timed(lambda: pw.write_sqlite_database(table, os.path.join(tempdir, 'table.sqlite')))
+		print("{:<24} {:>10} {:>14}".format("method", "time (s)", "plants/s"))
+		for name, seconds, count in [("via CSV", via_csv, len(plants)), ("direct (dict)", direct, len(plants)),
+				("direct (PlantTable)", from_table, len(table))]:
+			print("{:<24} {:>10.3f} {:>14.0f}".format(name, seconds, count / seconds))
+	finally:
+		shutil.rmtree(tempdir)
@@ -0,0 +1,60 @@
+"""
+PowerWatch
+benchmark_summary.py
+Compare the per-country summary queries (country_summary) with the grouped
+SQLite queries (summarize_sqlite) and the in-memory summary (summarize_plants).
+Without an input CSV, one is written from the source databases (plants with a capacity).
+"""
+
+import sys
+import os
+import glob
+import shutil
+import tempfile
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.pardir, os.pardir))
+sys.path.insert(0, os.pardir)
+import powerwatch as pw
+import powerwatch_summary
+
+def timed(func):
+	"""Result of one call to `func` and its wall time in seconds."""
+	start_time = time.time()
+	result = func()
+	return result, time.time() - start_time
+
+### MAIN ###
+if __name__ == '__main__':
+	argparser = argparse.ArgumentParser(description="Benchmark powerwatch_summary.")
+	argparser.add_argument('-i', '--input', type=str, help="PowerWatch CSV database")
+	args = argparser.parse_args()
+
+	tempdir = tempfile.mkdtemp()
+	try:
+		if not args.input:
+			plants = {}
+			for filename in sorted(glob.glob(os.path.join(pw.SOURCE_DB_BIN_DIR, '*.bin'))):
+				for plant_id, plant in pw.load_database(filename).iteritems():
+					if getattr(plant, 'capacity', None) is not None:
+						plants[plant_id] = plant
+			args.input = os.path.join(tempdir, 'plants.csv')
+			pw.write_csv_file(plants, args.input)
+
+		countries = dict((v.iso_code, k) for k, v in pw.make_country_dictionary().iteritems())
+		plants_dict = pw.read_csv_file_to_dict(args.input)
+		db_conn = pw.copy_csv_to_sqlite(args.input, ':memory:', return_connection=True)
+
+		per_country, loop_time = timed(lambda: dict((iso_code, powerwatch_summary.country_summary(db_conn, country, iso_code))
+			for iso_code, country in countries.iteritems()))
+		grouped, grouped_time = timed(lambda: powerwatch_summary.summarize_sqlite(db_conn, countries))
+		in_memory, memory_time = timed(lambda: powerwatch_summary.summarize_plants(plants_dict, countries))
+
+		print("{0} plants, {1} countries".format(len(plants_dict), len(countries)))
+		print("{:<28} {:>10} {:>10}".format("method", "time (s)", "identical"))
+		for name, result, seconds in [("per-country queries", per_country, loop_time),
+				("grouped queries", grouped, grouped_time), ("in memory", in_memory, memory_time)]:
+			print("{:<28} {:>10.3f} {:>10}".format(name, seconds, str(result == per_country)))
+	finally:
+		shutil.rmtree(tempdir)
@@ -0,0 +1,99 @@
+"""
+PowerWatch
+benchmark_write_csv.py
+Compare write_csv_file with the previous per-row DictWriter implementation.
+All source databases are merged into one plant dict and written by both writers;
+the outputs are checked to be byte-identical.
+"""
+
+import sys
+import os
+import csv
+import glob
+import shutil
+import tempfile
+import timeit
+import filecmp
+import argparse
+
+sys.path.insert(0, os.path.join(os.pardir, os.pardir))
+import powerwatch as pw
+
+def legacy_write_csv_file(plants_dictionary, csv_filename, dump=False):
+	"""The write_csv_file implementation before rows were precomputed (error messages dropped)."""
+	def _dict_row(powerplant):
+		ret = {}
+		ret['name'] = powerplant.name.encode(pw.UNICODE_ENCODING)
+		ret['pw_idnr'] = powerplant.idnr.encode(pw.UNICODE_ENCODING)
+		ret['capacity_mw'] = powerplant.capacity
+		ret['year_of_capacity_data'] = powerplant.cap_year
+		ret['country'] = powerplant.country.encode(pw.UNICODE_ENCODING)
+		ret['owner'] = powerplant.owner.encode(pw.UNICODE_ENCODING)
+		ret['source'] = powerplant.source
+		if ret['source'] is not None:
+			ret['source'] = ret['source'].encode(pw.UNICODE_ENCODING)
+		ret['url'] = powerplant.url.encode(pw.UNICODE_ENCODING)
+		ret['latitude'] = powerplant.location.latitude
+		ret['longitude'] = powerplant.location.longitude
+		ret['commissioning_year'] = powerplant.commissioning_year
+		for i, fuel in enumerate(powerplant.fuel):
+			if i == 4:
+				break
+			ret['fuel{0}'.format(i + 1)] = fuel
+		for year in pw.GENERATION_YEARS:
+			ret['generation_gwh_{0}'.format(year)] = pw.annual_generation(powerplant.generation, year)
+		ret['estimated_generation_gwh'] = powerplant.estimated_generation_gwh
+		return ret
+
+	fieldnames = ["name", "pw_idnr", "capacity_mw", "year_of_capacity_data", "country", "owner",
+		"source", "url", "latitude", "longitude", "commissioning_year", "fuel1", "fuel2", "fuel3",
+		"fuel4"] + ["generation_gwh_{0}".format(year) for year in pw.GENERATION_YEARS] + ["estimated_generation_gwh"]
+	if dump:
+		fieldnames.insert(2, 'in_pw')
+	with open(csv_filename, 'wb') as fout:
+		fout.write("NOTE: This Power Watch database of power plants is currently in draft status and not yet published. Please do not reference or cite the data as basis for research or publications until the data is officially published.\n")
+		writer = csv.DictWriter(fout, fieldnames=fieldnames)
+		writer.writeheader()
+		sort_key = lambda x: (plants_dictionary[x].country, plants_dictionary[x].name)
+		for k in sorted(plants_dictionary.keys(), key=sort_key):
+			try:
+				writer.writerow(_dict_row(plants_dictionary[k]))
+			except:
+				pass
+
+def best_time(func, repeat):
+	"""Best wall time in seconds of `repeat` calls to `func`, with stdout silenced."""
+	stdout = sys.stdout
+	sys.stdout = open(os.devnull, 'w')
+	try:
+		return min(timeit.repeat(func, number=1, repeat=repeat))
+	finally:
+		sys.stdout.close()
+		sys.stdout = stdout
+
+### MAIN ###
+if __name__ == '__main__':
+	argparser = argparse.ArgumentParser(description="Benchmark write_csv_file.")
+	argparser.add_argument('databases', nargs='*',
+		help="database files; all files in source_databases/ by default")
+	argparser.add_argument('--repeat', type=int, default=3, help="runs per measurement")
+	args = argparser.parse_args()
+	if not args.databases:
+		args.databases = sorted(glob.glob(os.path.join(pw.SOURCE_DB_BIN_DIR, '*.bin')))
+
+	plants = {}
+	for filename in args.databases:
+		plants.update(pw.load_database(filename))
+
+	tempdir = tempfile.mkdtemp()
+	try:
+		print("{:<8} {:>8} {:>12} {:>12} {:>10}".format("mode", "plants", "legacy (s)", "stream (s)", "identical"))
+		for dump in [False, True]:
+			legacy_file = os.path.join(tempdir, 'legacy.csv')
+			stream_file = os.path.join(tempdir, 'stream.csv')
+			legacy = best_time(lambda: legacy_write_csv_file(plants, legacy_file, dump), args.repeat)
+			stream = best_time(lambda: pw.write_csv_file(plants, stream_file, dump), args.repeat)
+			identical = filecmp.cmp(legacy_file, stream_file, shallow=False)
+			print("{:<8} {:>8} {:>12.3f} {:>12.3f} {:>10}".format("dump" if dump else "clean", len(plants), legacy, stream, str(identical)))
+	finally:
+		shutil.rmtree(tempdir)
@@ -4,23 +4,25 @@ PowerWatch
 confirm_geolocation.py
 Use google maps reverse geocoding API to test if lat/long coordinates are in the correct country.
 Add Google API key as API_KEY.
-Searches for plants ranging from PLANT_START to PLANT_STOP in database (in order).
+Searches for plants ranging from PLANT_START to PLANT_STOP in database (in order of ID).
+Requests are concurrent and rate-limited, and results are cached on disk by rounded coordinates
+(see powerwatch.geocoding), so co-located plants and repeated runs are not queried again.
 Incorrect country locations are logged in LOG_FILE.
+See confirm_geolocation_offline.py to check all plants without a geocoding service.
 """
 
 import sys
 import os
 import csv
-import json
-import requests
 import argparse
 
 sys.path.insert(0, os.path.join(os.pardir,os.pardir))
 import powerwatch as pw
+from powerwatch import geocoding
 
 # params
 ENCODING = 'utf-8'
-URL_BASE = "https://maps.googleapis.com/maps/api/geocode/json?"
+URL_BASE = geocoding.GEOCODE_URL
 API_KEY = 'ADD KEY HERE'
 LOG_FILE = "geolocation_errors.csv"
 PLANT_START = 0
@@ -40,6 +42,9 @@ country_synonyms = {	'United States':'United States of America',
 # parse args
 parser = argparse.ArgumentParser()
 parser.add_argument("powerplant_database", help = "name of power plant csv file")
+parser.add_argument("--workers", type = int, default = geocoding.GEOCODE_WORKERS, help = "simultaneous requests")
+parser.add_argument("--rate", type = float, default = geocoding.GEOCODE_RATE, help = "requests per second")
+parser.add_argument("--cache", default = geocoding.GEOCODE_CACHE_FILE, help = "reverse geocoding cache file")
 args = parser.parse_args()
 
 # open powerplant csv file
@@ -58,61 +63,48 @@ with open(args.powerplant_database,'rU') as f:
 			continue
 		plants[idval] = {'country':country,'latitude':latitude,'longitude':longitude}
 
+# only check plants in the start/stop range
+idvals = sorted(plants)[PLANT_START:PLANT_STOP + 1]
+
 # check coordinates
-print("Checking plants...")
-plant_count = 0
+print("Checking {0} plants...".format(len(idvals)))
+def report_progress(done, total):
+	if done % 50 == 0 or done == total:
+		print("...made {0} of {1} requests...".format(done, total))
+
+cache = geocoding.GeocodeCache(args.cache)
+geocoder = geocoding.ReverseGeocoder(API_KEY, url = URL_BASE, cache = cache, workers = args.workers, rate = args.rate)
+countries_google, failures = geocoder.countries([(plants[idval]['latitude'], plants[idval]['longitude']) for idval in idvals],
+	progress = report_progress)
 bad_geolocations = []
 
 f = open(LOG_FILE,'a')
 f.write('idval,latitude,longitude,pw_country,google_country\n')
 
-for idval,plant in plants.iteritems():
-
-	# only check plants in the start/stop range
-	if plant_count < PLANT_START:
-		plant_count += 1
-		continue
-	if plant_count > PLANT_STOP:
-		break
-
-	if plant_count % 50 == 0:
-		print("...checked {0} plants...".format(plant_count))
-	plant_count += 1
+for idval,country_google in zip(idvals, countries_google):
+	plant = plants[idval]
 	country_powerwatch = plant['country']
 	latitude = plant['latitude']
 	longitude = plant['longitude']
 
-	# build url and sent request
-	URL = URL_BASE + "latlng={0},{1}".format(latitude,longitude) 
-	URL = URL + "&key={0}".format(API_KEY)
-	try:
-		res = requests.get(URL)
-		j = json.loads(res.text)
-		address_components = j['results'][0]['address_components']
-		for component in address_components:
-			country_google = ''
-			if "country" in component['types']:
-				country_google = component['long_name']
-				break
-		if not country_google:
-			# problem case
-			print("Plant {0}: PW country: {1}; Google country not found.".format(idval,country_powerwatch))
-			bad_geolocations.append(idval)
-			f.write('{0},{1},{2},{3},not found\n'.format(idval,latitude,longitude,country_powerwatch))
-		if country_powerwatch != country_google:
-			# problem case unless it's a synonym
-			if country_google in country_synonyms.keys():
-				if country_synonyms[country_google] == country_powerwatch:
-					continue
-			print("Plant {0}: PW country: {1}; Google country: {2}".format(idval,country_powerwatch,country_google))
-			bad_geolocations.append(idval)
-			f.write('{0},{1},{2},{3},{4}\n'.format(idval,latitude,longitude,country_powerwatch,country_google))
-	except:
+	if country_google is None:
 		print("Error with plant {0}, counting as an error.".format(idval))
-		try:
-			f.write('{0},{1},{2},{3},unknown\n'.format(idval,latitude,longitude,country_powerwatch))
-		except:
-			print("...unable to save to log.")
+		bad_geolocations.append(idval)
+		f.write('{0},{1},{2},{3},unknown\n'.format(idval,latitude,longitude,country_powerwatch))
+		continue
+	country_google = country_google.encode(ENCODING)
+	if not country_google:
+		# problem case
+		print("Plant {0}: PW country: {1}; Google country not found.".format(idval,country_powerwatch))
+		bad_geolocations.append(idval)
+		f.write('{0},{1},{2},{3},not found\n'.format(idval,latitude,longitude,country_powerwatch))
+	elif country_powerwatch != country_google:
+		# problem case unless it's a synonym
+		if country_synonyms.get(country_google) == country_powerwatch:
+			continue
+		print("Plant {0}: PW country: {1}; Google country: {2}".format(idval,country_powerwatch,country_google))
+		bad_geolocations.append(idval)
+		f.write('{0},{1},{2},{3},{4}\n'.format(idval,latitude,longitude,country_powerwatch,country_google))
 
 # close log file
 f.close()
@@ -121,5 +113,6 @@ f.close()
 print("Bad geolocations:")
 for idval in bad_geolocations:
 	print(idval)
+print("Reverse geocoding cache: {0} locations; {1} failed requests.".format(len(cache), len(failures)))
 
 print("Finished.")
@@ -0,0 +1,74 @@
+# This Python file uses the following encoding: utf-8
+"""
+PowerWatch
+confirm_geolocation_offline.py
+Test if lat/long coordinates are in the correct country, offline, using a local
+country boundary file (see powerwatch.borders); no API key or network access is needed.
+Checks every plant in the database.
+Plants outside their country (by more than the coastal tolerance) are logged in LOG_FILE,
+in the same format as confirm_geolocation.py, with the country they are in or 'not found'.
+"""
+
+import sys
+import os
+import csv
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.pardir,os.pardir))
+import powerwatch as pw
+from powerwatch import borders
+
+# params
+ENCODING = 'utf-8'
+LOG_FILE = "geolocation_errors.csv"
+
+# parse args
+parser = argparse.ArgumentParser()
+parser.add_argument("powerplant_database", help = "name of power plant csv file")
+parser.add_argument("--boundaries", default = borders.COUNTRY_BOUNDARIES_FILE,
+	help = "GeoJSON file of country boundaries (e.g. Natural Earth admin-0 countries)")
+parser.add_argument("--tolerance", type = float, default = borders.COAST_TOLERANCE_KM,
+	help = "distance (km) outside their country within which plants are accepted")
+args = parser.parse_args()
+
+if not os.path.exists(args.boundaries):
+	sys.exit("Error: country boundary file {0} not found; download a GeoJSON file of country boundaries (e.g. Natural Earth admin-0 countries) or pass --boundaries.".format(args.boundaries))
+
+# open powerplant csv file
+idvals, countries, latitudes, longitudes = [], [], [], []
+with open(args.powerplant_database,'rU') as f:
+	datareader = csv.reader(f)
+	headers1 = datareader.next()
+	headers2 = datareader.next()
+	for row in datareader:
+		try:
+			latitude = float(row[8])
+			longitude = float(row[9])
+		except:
+			continue
+		idvals.append(row[1].decode(ENCODING))
+		countries.append(row[4].decode(ENCODING))
+		latitudes.append(latitude)
+		longitudes.append(longitude)
+
+# check coordinates
+start_time = time.time()
+boundaries = borders.make_country_boundaries(args.boundaries)
+print("Loaded boundaries of {0} countries in {1:.1f} s.".format(len(boundaries), time.time() - start_time))
+print("Checking {0} plants...".format(len(idvals)))
+start_time = time.time()
+errors = borders.check_countries(countries, latitudes, longitudes, boundaries, tolerance_km = args.tolerance)
+print("...checked in {0:.1f} s.".format(time.time() - start_time))
+
+# log and report location errors
+with open(LOG_FILE,'w') as f:
+	f.write('idval,latitude,longitude,pw_country,google_country\n')
+	for position in sorted(errors):
+		found_country = errors[position] or u"not found"
+		# encoded, as unicode boundary names cannot be printed to a pipe
+		print(u"Plant {0}: PW country: {1}; boundary country: {2}".format(idvals[position],countries[position],found_country).encode(ENCODING))
+		f.write(u'{0},{1},{2},{3},{4}\n'.format(idvals[position],latitudes[position],longitudes[position],countries[position],found_country).encode(ENCODING))
+
+print("Found {0} bad geolocations; logged in {1}.".format(len(errors), LOG_FILE))
+print("Finished.")
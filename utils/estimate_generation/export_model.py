@@ -0,0 +1,48 @@
+# This Python file uses the following encoding: utf-8
+"""
+PowerWatch
+export_model.py
+Export a trained generation estimation model (pickle of the sklearn GBRT model, as saved by
+train_generation_estimator.py) to a compiled .npz model for predict_generation.py.
+The compiled model is evaluated with NumPy only (see powerwatch.gbrt); its predictions are
+checked against the sklearn model on random feature rows.
+"""
+
+import pickle
+import argparse
+import numpy as np
+
+import sys, os
+sys.path.insert(0, os.path.join(os.pardir,os.pardir))
+from powerwatch import gbrt
+
+# parse args
+parser = argparse.ArgumentParser()
+parser.add_argument("model_filename", help = "pickle file of trained model")
+parser.add_argument("compiled_model_filename", nargs = "?", help = "compiled model file (default: model filename with .npz)")
+args = parser.parse_args()
+compiled_model_filename = args.compiled_model_filename or os.path.splitext(args.model_filename)[0] + ".npz"
+
+# load and export model
+with open(args.model_filename,'r') as f:
+	model_data = pickle.load(f)
+est = model_data['model']
+metadata = dict((k,v) for k,v in model_data.iteritems() if k != 'model')
+compiled_model = gbrt.CompiledGBRT.from_sklearn(est, metadata)
+print("Exported {0} trees (max. depth {1}, {2} nodes).".format(compiled_model.n_trees, compiled_model.max_depth, len(compiled_model.feature)))
+
+# check predictions on random rows spanning the split thresholds of each feature
+rng = np.random.RandomState(0)
+splits = compiled_model.left != np.arange(len(compiled_model.left))
+X_check = np.zeros((1000, compiled_model.n_features))
+for feature in range(compiled_model.n_features):
+	thresholds = compiled_model.threshold[splits & (compiled_model.feature == feature)]
+	if len(thresholds):
+		X_check[:,feature] = rng.uniform(thresholds.min() - 1, thresholds.max() + 1, len(X_check))
+max_difference = np.max(np.abs(compiled_model.predict(X_check) - est.predict(X_check)))
+print("Largest difference from sklearn predictions: {0:.3g}".format(max_difference))
+if max_difference > 1e-9:
+	sys.exit("Error: compiled model does not match the sklearn model.")
+
+compiled_model.save(compiled_model_filename)
+print("Saved compiled model to {0}.".format(compiled_model_filename))
@@ -4,29 +4,75 @@ PowerWatch
 predict_generation.py
 Use a trained Gradient Boosted Regression Tree (GBRT) model to estimate/predict power plant electricity 
 generation.
+Feature rows of all plants are assembled into one matrix and predicted in chunks of PREDICT_CHUNK_SIZE,
+optionally spread across a pool of processes (--workers).
+Features are made by powerwatch.features, as in training.
+The model is either a compiled .npz model (see powerwatch.gbrt and export_model.py), which needs
+no sklearn, or a pickle of the sklearn model.
 """
 
 import csv
 import numpy as np
-import matplotlib.pyplot as plt
 import pickle
-from sklearn.ensemble import GradientBoostingRegressor
+import multiprocessing
 import argparse
 
 import sys, os 
 sys.path.insert(0, os.path.join(os.pardir,os.pardir))
 import powerwatch as pw
+from powerwatch import gbrt
+from powerwatch import features
 
 # parse args
 parser = argparse.ArgumentParser()
 parser.add_argument("powerplant_database", help = "powerplant database (CSV)")
-parser.add_argument("model_filename", help = "pickle file of trained model")
+parser.add_argument("model_filename", help = "compiled (.npz) or pickle file of trained model")
 parser.add_argument("country_generation", help = "generation by country by fuel")
+parser.add_argument("--workers", type = int, default = 1, help = "processes used for prediction")
 args = parser.parse_args()
 
 # params
 CSV_SAVEFILE = 'plants_with_estimated_generation.csv'
 CF_CONVERSION_FACTOR = 1 / float( 0.001 * 24 * 365 )
+PREDICT_CHUNK_SIZE = 10000			# feature rows predicted per call
+
+def predict_chunk(X_chunk):
+	"""Predict capacity factors for a chunk of feature rows with the loaded model."""
+	return est.predict(X_chunk)
+
+def predict_capacity_factors(X, workers = 1, chunk_size = PREDICT_CHUNK_SIZE):
+	"""
+	Predict capacity factors for a matrix of feature rows, in chunks.
+
+	Parameters
+	----------
+	X : np.array
+		Feature rows (n_plants x n_features).
+	workers : int
+		Number of processes; chunks are spread across a pool if more than 1.
+	chunk_size : int
+		Largest number of rows predicted per call.
+
+	Returns
+	-------
+	np.array of predicted capacity factors.
+	"""
+	if not len(X):
+		return np.zeros(0)
+	if workers > 1:
+		chunk_size = min(chunk_size, int(np.ceil(len(X) / float(workers))))
+	chunks = [X[start:start + chunk_size] for start in range(0, len(X), chunk_size)]
+	if workers > 1 and len(chunks) > 1:
+		# workers are forked after the model is loaded, so they share it
+		pool = multiprocessing.Pool(min(workers, len(chunks)))
+		try:
+			results = pool.map(predict_chunk, chunks)
+		finally:
+			pool.close()
+			pool.join()
+	else:
+		results = map(predict_chunk, chunks)
+	return np.concatenate(results)
 
 # make country names thesaurus
 country_names_thesaurus = pw.make_country_names_thesaurus()
@@ -36,25 +82,29 @@ generation_by_country_by_fuel = {}
 with open(args.country_generation,'r') as f:
 	datareader = csv.reader(f)
 	header = datareader.next()
-	for row in datareader:
-		country_name_iea = row[0]
-		# translate name to standard version
-		for country_name,other_names in country_names_thesaurus.iteritems():
-			if country_name_iea in other_names:
-				standard_country_name = country_name
-				continue
-		if standard_country_name not in generation_by_country_by_fuel.keys():
-			generation_by_country_by_fuel[standard_country_name] = {}
-		fuel_type = row[1]
-		if fuel_type not in generation_by_country_by_fuel[standard_country_name].keys():
-			generation_by_country_by_fuel[standard_country_name][fuel_type] = float(row[2])
-		else:
-			print("Error with generation file.")
+	rows = list(datareader)
+
+# translate names to standard version
+standard_country_names = pw.standardize_countries([row[0] for row in rows], country_names_thesaurus)
+for row, standard_country_name in zip(rows, standard_country_names):
+	if not standard_country_name:
+		continue
+	if standard_country_name not in generation_by_country_by_fuel:
+		generation_by_country_by_fuel[standard_country_name] = {}
+	fuel_type = row[1]
+	if fuel_type not in generation_by_country_by_fuel[standard_country_name]:
+		generation_by_country_by_fuel[standard_country_name][fuel_type] = float(row[2])
+	else:
+		print("Error with generation file.")
 
 # load estimation model
-with open(args.model_filename,'r') as f:
-	model_data = pickle.load(f)
-est = model_data['model']
+if args.model_filename.endswith('.npz'):
+	est = gbrt.CompiledGBRT.load(args.model_filename)
+	model_data = est.metadata
+else:
+	with open(args.model_filename,'r') as f:
+		model_data = pickle.load(f)		# needs sklearn
+	est = model_data['model']
 params = model_data['params']
 num_folds = model_data['num_folds']
 fuel_types = model_data['fuel_types']
@@ -72,87 +122,51 @@ else:
 
 print("Loaded {0} plants from file {1}.".format(len(plants),args.powerplant_database))
 
-# set up arrays
-fuel_type_list = []
-capacity_by_country_by_fuel = {}				# will hold total capacity by country and fuel
-feature_name_list = ['fuel_type','capacity_mw','commissioning_year','fuel_avg_cf','cap_sh_country','cap_sh_country_fuel']
-
-# read data from plant database
-count_full_data = 0
-count_partial_data = 0
-plants_for_generation_estimation = {}
-for plant_id,plant in plants.iteritems():
-
-	# deal with country
-	if plant.country not in capacity_by_country_by_fuel.keys():
-		capacity_by_country_by_fuel[plant.country] = {}
-
-	# get fuel type and capacity
-	fuel_type = next(iter(plant.fuel))   # TODO: deal with multi-fuel plants better
-	if fuel_type not in fuel_type_list:
-		fuel_type_list.append(fuel_type)
-	fuel_index = fuel_type_list.index(fuel_type)
-
-	if fuel_type in capacity_by_country_by_fuel[plant.country].keys():
-		capacity_by_country_by_fuel[plant.country][fuel_type] += plant.capacity
-	else:
-		capacity_by_country_by_fuel[plant.country][fuel_type] = plant.capacity 
-
-	# try to get commissioning year
-	if plant.commissioning_year != pw.NO_DATA_NUMERIC:
-		count_full_data += 1
-	else:
-		count_partial_data += 1
-		continue
-
-	plants_for_generation_estimation[plant_id] = [plant.country,fuel_index,plant.capacity,plant.commissioning_year]
-
-print("Full data: {0}; partial data: {1}".format(count_full_data,count_partial_data))
+# make plant table (in order of ID) of plants with capacity; capacity totals include plants without commissioning year
+plant_ids = sorted(plants)
+plant_capacities = np.array([plants[plant_id].capacity for plant_id in plant_ids], dtype=float)	# NaN if no data
+has_capacity = np.isfinite(plant_capacities)
+if not has_capacity.all():
+	print("No capacity for {0} plants; not estimating their generation.".format(np.count_nonzero(~has_capacity)))
+plant_ids = [plant_id for plant_id,known in zip(plant_ids, has_capacity) if known]
+plant_capacities = plant_capacities[has_capacity]
+plant_countries = [plants[plant_id].country for plant_id in plant_ids]
+plant_fuels = [next(iter(plants[plant_id].fuel)) for plant_id in plant_ids]   # TODO: deal with multi-fuel plants better
+plant_years = np.array([plants[plant_id].commissioning_year for plant_id in plant_ids], dtype=float)	# NaN if no data
+
+count_full_data = np.count_nonzero(~np.isnan(plant_years))
+print("Full data: {0}; partial data: {1}".format(count_full_data,len(plant_ids) - count_full_data))
+capacity_by_country_by_fuel = features.group_totals(plant_capacities, plant_countries, plant_fuels)
 print(capacity_by_country_by_fuel)
 
 # calculate average capacity factor by fuel for each country
 average_capacity_factors = {}
-for country,fuel_list in capacity_by_country_by_fuel.iteritems():
-	average_capacity_factors[country] = {}
-	for fuel_type,total_capacity in fuel_list.iteritems():
-		gen = generation_by_country_by_fuel[country][fuel_type]
-		capacity_factor = CF_CONVERSION_FACTOR * gen / float(total_capacity)
-		average_capacity_factors[country][fuel_type] = capacity_factor
-
-# calculate total capacity by country
-capacity_total_by_country = {}
-for country, fuel_list in capacity_by_country_by_fuel.iteritems():
-	capacity_total_by_country[country] = 0
-	for fuel,capacity in fuel_list.iteritems():
-		capacity_total_by_country[country] += capacity
-
-# now include these values in plant independent variable list
-for plant_id,plant_info in plants_for_generation_estimation.iteritems():
-
-	country = plant_info[0]
-	fuel_index = plant_info[1]
-	fuel_type = fuel_type_list[fuel_index]
-	capacity = plant_info[2]
-	year = plant_info[3]
-
-	fuel_av_cf = average_capacity_factors[country][fuel_type]
-	plants_for_generation_estimation[plant_id].append(fuel_av_cf)
-
-	cap_sh_country = capacity / float(capacity_total_by_country[country])
-	plants_for_generation_estimation[plant_id].append(cap_sh_country)
-
-	cap_sh_country_fuel = capacity / float(capacity_by_country_by_fuel[country][fuel_type])
-	plants_for_generation_estimation[plant_id].append(cap_sh_country_fuel)
-
-	# now make prediction; translate from cf to generation (GWh)
-	X_data = np.array(plants_for_generation_estimation[plant_id][1:]).reshape(1,-1)
-	est_cf = est.predict(X_data)[0]
-	if est_cf < 0 or est_cf > 1:
-		print(u'ERROR: Estimated capacity factor outside of [0,1]')
-	est_gen_gwh = est_cf * capacity / CF_CONVERSION_FACTOR
-	plants[plant_id].estimated_generation_gwh = est_gen_gwh
+for (country,fuel_type),total_capacity in capacity_by_country_by_fuel.iteritems():
+	gen = generation_by_country_by_fuel.get(country, {}).get(fuel_type)
+	if gen is None or not total_capacity:
+		print(u"No generation data for {0} in {1}; not estimating its generation.".format(fuel_type,country))
+		continue
+	average_capacity_factors[(country,fuel_type)] = CF_CONVERSION_FACTOR * gen / float(total_capacity)
+
+# make feature rows; fuel type is an index into the model's fuel types
+unknown_fuels = sorted(set(plant_fuels) - set(fuel_types))
+if unknown_fuels:
+	print(u"Fuel types not in model, not estimating their generation: {0}".format(unknown_fuels))
+X_all = features.make_features(plant_countries, plant_fuels, plant_capacities, plant_years, fuel_types, average_capacity_factors)
+estimation_rows = np.flatnonzero(np.isfinite(X_all).all(axis=1))
+estimation_ids = [plant_ids[row] for row in estimation_rows]
+X_data = X_all[estimation_rows]
+
+# now make predictions for all plants at once; translate from cf to generation (GWh)
+est_cf = predict_capacity_factors(X_data, workers = args.workers)
+out_of_range = np.count_nonzero((est_cf < 0) | (est_cf > 1))
+if out_of_range:
+	print(u'ERROR: Estimated capacity factor outside of [0,1] for {0} plants'.format(out_of_range))
+est_gen_gwh = est_cf * X_data[:,1] / CF_CONVERSION_FACTOR
+for plant_id,gen_gwh in zip(estimation_ids, est_gen_gwh):
+	plants[plant_id].estimated_generation_gwh = float(gen_gwh)
 
 # now write the result
 pw.write_csv_file(plants,CSV_SAVEFILE)
-print(u"Wrote data file with {0} total plants; {1} with estimated generation.".format(len(plants),len(plants_for_generation_estimation)))
+print(u"Wrote data file with {0} total plants; {1} with estimated generation.".format(len(plants),len(estimation_ids)))
 
@@ -10,22 +10,48 @@ https://www.datarobot.com/blog/gradient-boosted-regression-trees/
 http://machinelearningmastery.com/configure-gradient-boosting-algorithm/
 http://machinelearningmastery.com/evaluate-gradient-boosting-models-xgboost-python/
 https://medium.com/towards-data-science/train-test-split-and-cross-validation-in-python-80b61beca4b6
+
+Cross-validation folds (and, with --grid, every configuration of param_grid) are fitted
+concurrently in a pool of processes, with a fixed random seed. Fitted fold models and
+scores are cached in cache_dir, keyed by a hash of the training data, the parameters
+and the fold, so unchanged configurations are not refitted.
 """
 
 import numpy as np
 import csv
+import os
+import time
+import json
+import hashlib
+import argparse
+import itertools
+import multiprocessing
 import matplotlib.pyplot as plt
 import pickle
+import sys
 from sklearn.ensemble import GradientBoostingRegressor
-from sklearn.model_selection import GridSearchCV, KFold, cross_val_score, cross_val_predict
+from sklearn.model_selection import KFold, cross_val_predict
 from sklearn import metrics
 
+sys.path.insert(0, os.path.join(os.pardir,os.pardir))
+from powerwatch import gbrt
+from powerwatch import features
+
+# parse args
+parser = argparse.ArgumentParser()
+parser.add_argument("--grid", help = "cross-validate every configuration of param_grid", action = "store_true")
+parser.add_argument("--workers", type = int, default = multiprocessing.cpu_count(), help = "processes fitting folds")
+parser.add_argument("--no-cache", help = "do not read or write cached fold results", action = "store_true")
+args = parser.parse_args()
 
 # set parameters
 data_filename = "generation_data_ARG_EGY_IND_USA.csv"
 model_filename = "generation_estimation_model_v01.pickle"
+compiled_model_filename = "generation_estimation_model_v01.npz"		# for prediction without sklearn
+cache_dir = "cv_cache"				# fitted fold models and scores
 
 num_folds = 10						# number of cross-validation folds
+random_seed = 0						# seed of the estimator (subsampling)
 
 params = {							# parameters for training estimator
 	'n_estimators': 1200,           # AKA number of trees; optimum = 1500 (?)
@@ -35,19 +61,140 @@ params = {							# parameters for training estimator
 	'loss':'huber'					# unclear: good choice is 'huber'
 }
 
+param_grid = {						# values searched with --grid; other parameters as in params
+	'n_estimators': [600, 1200, 1800],
+	'max_depth': [4, 6, 8],
+	'learning_rate': [0.003, 0.01],
+}
+
+# cross-validation functions
+def data_hash(X, y):
+	"""Get a hash of the training data, used in cache keys."""
+	sha = hashlib.sha1()
+	sha.update(np.ascontiguousarray(X, dtype = float).tostring())
+	sha.update(np.ascontiguousarray(y, dtype = float).tostring())
+	return sha.hexdigest()
+
+def expand_grid(base_params, grid):
+	"""Get the parameters of each configuration of a grid; parameters not in the grid are taken from base_params."""
+	names = sorted(grid)
+	return [dict(base_params, **dict(zip(names, values))) for values in itertools.product(*[grid[name] for name in names])]
+
+_X_train = None
+_y_train = None
+
+def _init_worker(X, y):
+	"""Give a worker process the training data once, instead of with every task."""
+	global _X_train, _y_train
+	_X_train, _y_train = X, y
+
+def fit_fold(task):
+	"""
+	Fit and score one fold of one configuration, or load it from the cache.
+
+	Parameters
+	----------
+	task : tuple
+		Configuration number, fold number, parameters, train and test indices, and cache file (or None).
+
+	Returns
+	-------
+	Configuration number, fold number and dict of 'score' (R2), 'predictions' (on the test indices),
+	'fit_seconds', 'cached', and 'start' and 'end' times.
+	"""
+	config, fold, config_params, train_index, test_index, cache_file = task
+	start = time.time()
+	if cache_file and os.path.exists(cache_file):
+		with open(cache_file,'rb') as f:
+			cached = pickle.load(f)
+		result = {'score': cached['score'], 'predictions': cached['predictions'], 'fit_seconds': cached['fit_seconds'], 'cached': True}
+	else:
+		est = GradientBoostingRegressor()
+		est.set_params(random_state = random_seed, **config_params)
+		est.fit(_X_train[train_index], _y_train[train_index])
+		predictions = est.predict(_X_train[test_index])
+		result = {'score': metrics.r2_score(_y_train[test_index], predictions), 'predictions': predictions,
+					'fit_seconds': time.time() - start, 'cached': False}
+		if cache_file:
+			temp_file = "{0}.{1}.tmp".format(cache_file, os.getpid())
+			with open(temp_file,'wb') as f:
+				pickle.dump(dict(result, model = est), f, pickle.HIGHEST_PROTOCOL)
+			os.rename(temp_file, cache_file)
+	result['start'] = start
+	result['end'] = time.time()
+	return config, fold, result
+
+def cross_validate(X, y, folds, configurations, workers = 1, cache_dir = None):
+	"""
+	Cross-validate configurations of the estimator, fitting all their folds concurrently.
+
+	Parameters
+	----------
+	X, y : np.array
+		Training data.
+	folds : list of (np.array, np.array)
+		Train and test indices of each fold.
+	configurations : list of dict
+		Estimator parameters of each configuration.
+	workers : int
+		Number of processes.
+	cache_dir : str, optional
+		Directory of cached fold results; no caching if None.
+
+	Returns
+	-------
+	List with a dict for each configuration: 'params', fold 'scores', their 'mean' and 'std',
+	out-of-fold 'predictions', 'wall_seconds' (first fold start to last fold end),
+	'fit_seconds' (sum over folds) and number of 'cached' folds.
+	"""
+	key = data_hash(X, y)
+	if cache_dir and not os.path.isdir(cache_dir):
+		os.makedirs(cache_dir)
+	tasks = []
+	for config, config_params in enumerate(configurations):
+		config_key = hashlib.sha1(json.dumps([key, config_params, random_seed, len(folds)], sort_keys = True)).hexdigest()
+		for fold, (train_index, test_index) in enumerate(folds):
+			cache_file = os.path.join(cache_dir, "{0}-fold{1:02d}.pickle".format(config_key, fold)) if cache_dir else None
+			tasks.append((config, fold, config_params, train_index, test_index, cache_file))
+
+	results = [{'params': config_params, 'scores': [None] * len(folds), 'predictions': np.zeros(len(y)),
+				'start': float('inf'), 'end': 0.0, 'fit_seconds': 0.0, 'cached': 0} for config_params in configurations]
+	if workers > 1:
+		pool = multiprocessing.Pool(workers, _init_worker, (X, y))
+		try:
+			fold_results = list(pool.imap_unordered(fit_fold, tasks))
+		finally:
+			pool.close()
+			pool.join()
+	else:
+		_init_worker(X, y)
+		fold_results = map(fit_fold, tasks)
+	for config, fold, fold_result in fold_results:
+		result = results[config]
+		result['scores'][fold] = fold_result['score']
+		result['predictions'][folds[fold][1]] = fold_result['predictions']
+		result['start'] = min(result['start'], fold_result['start'])
+		result['end'] = max(result['end'], fold_result['end'])
+		result['fit_seconds'] += fold_result['fit_seconds']
+		result['cached'] += fold_result['cached']
+	for result in results:
+		result['mean'] = np.mean(result['scores'])
+		result['std'] = np.std(result['scores'])
+		result['wall_seconds'] = result['end'] - result['start']
+	return results
+
 # main
 countries = []						# will hold list of countries
-fuel_types = []						# will hold list of fuel types
-capacity_factors = {}   			# will hold plant-level cfs by country and fuel
-fuel_capacity_factors = {}			# will hold average cfs by country and fuel
-capacity_totals = {}				# will hold total capacity by country and fuel
-capacity_totals_by_fuel = {}		# will hold total capacity by country
+fuel_types = []						# will hold list of fuel types (fuel type feature is the index)
 
-feature_name_list = ['Fuel type','Capacity (MW)','Commissioning year','Average CF (fuel)','Share nat. cap.','Share nat. cap. by fuel']
+feature_name_list = features.FEATURE_LABELS
 
-# load data
-X_data = []
-y_data = []
+# plant table: one entry per plant with capacity
+plant_countries = []
+plant_fuels = []
+plant_capacities = []
+plant_years = []
+plant_capacity_factors = []			# NaN for plants without (valid) generation
 
 # read in data
 with open(data_filename,'rU') as f:
@@ -63,119 +210,88 @@ with open(data_filename,'rU') as f:
 		country_name = row[1]
 		if country_name not in countries:
 			countries.append(country_name)
-		country = countries.index(country_name)
 
 		# handle fuel type
 		fuel_name = row[6]
 		if fuel_name not in fuel_types:
 			fuel_types.append(fuel_name)
-		fuel = fuel_types.index(fuel_name)
 
 		# handle plant capacity
 		capacity_mw = float(row[7])
 		if not capacity_mw:
 			print("No capacity for plant in country {0}".format(country_name))
 			continue
-		if country not in capacity_totals:
-			capacity_totals[country] = 0
-		if country not in capacity_totals_by_fuel:
-			capacity_totals_by_fuel[country] = {}
-		if fuel not in capacity_totals_by_fuel[country]:
-			capacity_totals_by_fuel[country][fuel] = 0
-		capacity_totals[country] += capacity_mw
-		capacity_totals_by_fuel[country][fuel] += capacity_mw
 
 		# handle year
 		year = int(row[9].split('.')[0])
 
-		# check if generation data exists before adding independent variables to observation list
+		# plants without (valid) generation data count towards capacity totals, but are not observations
+		capacity_factor = np.nan
 		if not row[8]:
 			print("No generation for {0} plant in country {1}".format(fuel_name,country_name))
-			continue
-
-		# calculate capacity factor (dependent variable)
-		generation_mwh = float(row[8])
-		capacity_factor = generation_mwh / (24.0 * 365 * capacity_mw)
-		if capacity_factor <= 0.0 or capacity_factor > 1.0:
-			continue    # reject all plants with capacity factors out of range OR zero-generation plants
-
-		# add data to training set
-		X_data.append([country,fuel,capacity_mw,year])   	# order must match feature_name_list (others added later)
-		y_data.append(capacity_factor)
-
-		# add capacity factor to list for averaging by country and fuel
-		if country not in capacity_factors.keys():
-			capacity_factors[country] = {}
-		if fuel not in capacity_factors[country].keys():
-			capacity_factors[country][fuel] = []
-		capacity_factors[country][fuel].append(capacity_factor)
-
-print(u'Read in {0} observations.'.format(len(X_data)))
-
-# calculate fuel-specific capacity factors for each country
-for country,fuel_list in capacity_factors.iteritems():
-	if country not in fuel_capacity_factors.keys():
-		fuel_capacity_factors[country] = {}
-	for fuel,cfs in fuel_list.iteritems():
-		avg_cf = 0.0 if not len(cfs) else float(sum(cfs)) / len(cfs)
-		fuel_capacity_factors[country][fuel] = avg_cf
-		print(u'{:12}; {:10}: av c.f.: {:1.2f}'.format(countries[country],fuel_types[fuel],avg_cf))
-
-# add fuel-specific capacity factors to X data
-for observation in X_data:
-	country = observation[0]
-	fuel = observation[1]
-	try:
-		observation.append(fuel_capacity_factors[country][fuel])
-	except:
-		print("Error with fuel_cap_factors; country: {0}, fuel: {1}".format(country,fuel))
-		X_data.remove(observation)
-
-# add plant-specific share of total (country) capacity and total (country,fuel-type) capacity
-for observation in X_data:
-	country = observation[0]
-	if country > len(countries):
-		print("Error with country.")
-	fuel = observation[1]
-	if fuel > len(fuel_types):
-		print("Error with fuel type.")
-	capacity = observation[2]
-	capacity_country_share = capacity / capacity_totals[country]
-	observation.append(capacity_country_share)
-	capacity_country_fuel_share = capacity / capacity_totals_by_fuel[country][fuel]
-	observation.append(capacity_country_fuel_share)
-
-# convert X_data, y_data to numpy arrays
-X_data_np = np.array(X_data)
-y_data_np = np.array(y_data)
-
-# now that we've used country we can remove before the fit
-X_data_np = np.delete(X_data_np,0,1)
-
-# now report on total capacity being used in training data; capacity is now index 1
-for country,total_capacity in capacity_totals.iteritems():
-	print("{0} capacity total: {1} MW".format(country,total_capacity))
+		else:
+			# calculate capacity factor (dependent variable)
+			generation_mwh = float(row[8])
+			capacity_factor = generation_mwh / (24.0 * 365 * capacity_mw)
+			if capacity_factor <= 0.0 or capacity_factor > 1.0:
+				capacity_factor = np.nan    # reject all plants with capacity factors out of range OR zero-generation plants
+
+		plant_countries.append(country_name)
+		plant_fuels.append(fuel_name)
+		plant_capacities.append(capacity_mw)
+		plant_years.append(year)
+		plant_capacity_factors.append(capacity_factor)
+
+plant_countries = np.array(plant_countries)
+plant_fuels = np.array(plant_fuels)
+plant_capacity_factors = np.array(plant_capacity_factors)
+observed = ~np.isnan(plant_capacity_factors)
+y_data_np = plant_capacity_factors[observed]
+print(u'Read in {0} observations.'.format(len(y_data_np)))
+
+# calculate fuel-specific capacity factors for each country (average over observations)
+fuel_capacity_factors = features.group_means(y_data_np, plant_countries[observed], plant_fuels[observed])
+for (country_name,fuel_name),avg_cf in sorted(fuel_capacity_factors.iteritems()):
+	print(u'{:12}; {:10}: av c.f.: {:1.2f}'.format(country_name,fuel_name,avg_cf))
+
+# make feature rows of observations; shares of total (country) and total (country,fuel-type) capacity include all plants
+X_data_np = features.make_features(plant_countries, plant_fuels, plant_capacities, plant_years, fuel_types,
+	fuel_capacity_factors)[observed]
+
+# now report on total capacity being used in training data; capacity is index 1
+for country_name,total_capacity in sorted(features.group_totals(plant_capacities, plant_countries).iteritems()):
+	print("{0} capacity total: {1} MW".format(country_name,total_capacity))
 print("Total capacity in training data: {0} MW".format(np.sum(X_data_np[:,1])))
 
 # set up k-fold object for cross-validation
 kfold = KFold(n_splits = num_folds)
+folds = list(kfold.split(X_data_np))
+
+# cross-validation (and grid search)
+configurations = expand_grid(params, param_grid) if args.grid else [params]
+print("Doing cross-validation of {0} configuration(s) with {1} workers...".format(len(configurations), args.workers))
+start_time = time.time()
+cv_results = cross_validate(X_data_np, y_data_np, folds, configurations, args.workers, None if args.no_cache else cache_dir)
+print("...finished cross-validation in {:.1f} s.".format(time.time() - start_time))
+print("{:>8} {:>8} {:>10} {:>10} {:>7}  {}".format("R2", "+/-", "wall (s)", "fit (s)", "cached", "parameters"))
+for result in sorted(cv_results, key = lambda result: -result['mean']):
+	print("{:8.3f} {:8.3f} {:10.1f} {:10.1f} {:>7}  {}".format(result['mean'], result['std'], result['wall_seconds'],
+		result['fit_seconds'], "{0}/{1}".format(result['cached'], num_folds), json.dumps(result['params'], sort_keys = True)))
+best_result = max(cv_results, key = lambda result: result['mean'])
+params = best_result['params']
+acc = best_result['mean']
+dev = best_result['std']
+print("Cross val: {:4.3f} (+/-{:4.3f})".format(acc,dev))
 
 # create fit estimator
 est = GradientBoostingRegressor()
-est.set_params(**params)
+est.set_params(random_state = random_seed, **params)
 
 # do fit
 print("Fitting model...")
 est.fit(X_data_np, y_data_np)
 print("...finished fit.")
 
-# cross-validation
-print("Doing cross-validation...")
-results = cross_val_score(est, X_data_np, y_data_np, cv=kfold)
-acc = results.mean()
-dev = results.std()
-print("Cross val: {:4.3f} (+/-{:4.3f})".format(acc,dev))
-
 # make prediction plot
 fig = plt.figure(figsize=(14,5))
 fig.subplots_adjust(left=0.05)
@@ -278,9 +394,9 @@ for cap_class in X_data_by_capacity.keys():
 
 """
 
-# do overall prediction and calculate r2
+# do overall prediction and calculate r2 (out-of-fold predictions from cross-validation)
 print(u"Calculating overall predictions...")
-predictions_all_fuels = cross_val_predict(est,X_data_np,y_data_np,cv=kfold)
+predictions_all_fuels = best_result['predictions']
 r2_score = metrics.r2_score(y_data_np,predictions_all_fuels)
 print("R2: {:4.3f}".format(r2_score))
 
@@ -320,6 +436,9 @@ with open(model_filename,'w') as f:
 	model_data = {'model': est, 'params': params, 'num_folds': num_folds, 'fuel_types': fuel_types}
 	pickle.dump(model_data,f)
 print("Saved trained model to {0}.".format(model_filename))
+compiled_model = gbrt.CompiledGBRT.from_sklearn(est, {'params': params, 'num_folds': num_folds, 'fuel_types': fuel_types})
+compiled_model.save(compiled_model_filename)
+print("Saved compiled model to {0}.".format(compiled_model_filename))
 
 # build fuel-specific plot
 fig = plt.figure(figsize=(10,7))
@@ -0,0 +1,56 @@
+# This Python file uses the following encoding: utf-8
+"""
+PowerWatch
+match_plants.py
+Generate a plant concordance by matching WRI plants to GEO and CARMA plants (see powerwatch.linkage).
+Entries of the hand-curated master plant concordance take precedence unless --no-curated is given.
+The concordance is written to OUTPUT_FILE, with the confidence of each match; pass it to
+pw.make_plant_concordance() to use it in a build.
+"""
+
+import sys
+import os
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.pardir,os.pardir))
+import powerwatch as pw
+from powerwatch import linkage
+
+# params
+WRI_DATABASE_FILE = pw.make_file_path(fileType = "src_bin", filename = "WRI-Database.bin")
+GEO_DATABASE_FILE = pw.make_file_path(fileType = "src_bin", filename = "GEODB-Database.bin")
+CARMA_DATABASE_FILE = pw.make_file_path(fileType = "src_bin", filename = "CARMA-Database.bin")
+OUTPUT_FILE = pw.make_file_path(fileType = "output", filename = "automated_plant_concordance.csv")
+
+# parse args
+parser = argparse.ArgumentParser()
+parser.add_argument("-o", "--output", default = OUTPUT_FILE, help = "concordance csv file to write")
+parser.add_argument("-j", "--workers", type = int, default = None, help = "worker processes (default: number of CPUs)")
+parser.add_argument("--threshold", type = float, default = linkage.MATCH_THRESHOLD, help = "lowest score of a match")
+parser.add_argument("--no-curated", action = "store_true", help = "ignore the hand-curated master plant concordance")
+args = parser.parse_args()
+
+# load databases
+fields = ['name', 'country', 'capacity', 'fuel', 'location']
+databases = []
+for filename in [WRI_DATABASE_FILE, GEO_DATABASE_FILE, CARMA_DATABASE_FILE]:
+	if not os.path.exists(filename):
+		sys.exit("Error: {0} not found; build it first.".format(filename))
+	databases.append(pw.load_database(filename, compact = True, fields = fields))
+	print("Loaded {0} plants from {1}.".format(len(databases[-1]), os.path.basename(filename)))
+curated = None if args.no_curated else pw.make_plant_concordance()
+
+# match plants
+print("Matching plants...")
+start_time = time.time()
+concordance = linkage.make_concordance(*databases, curated = curated, workers = args.workers, threshold = args.threshold)
+print("...matched in {0:.1f} s.".format(time.time() - start_time))
+for key in ['geo', 'carma']:
+	scores = [entry[key + '_score'] for entry in concordance.itervalues() if entry[key + '_score'] is not None]
+	print("WRI plants matched to {0}: {1}".format(key.upper(), len(scores)))
+
+# write concordance
+linkage.write_concordance(concordance, args.output)
+print("Wrote {0} entries to {1}.".format(len(concordance), args.output))
+print("Finished.")
@@ -3,6 +3,7 @@
 import sys
 import os
 import csv
+import sqlite3
 import argparse
 
 sys.path.insert(0, os.pardir)
@@ -208,6 +209,188 @@ def country_summary(db_conn, country, iso_code):
 	return summary
 
 
+def _fuel_column_names():
+	"""List of (fuel, column suffix) for the fuel-specific summaries."""
+	return [(fuel, '_'.join(fuel.lower().split())) for fuel in pw.make_fuel_thesaurus().keys()]
+
+def _empty_summary(country, iso_code):
+	return {'country': country, 'iso_code': iso_code, 'count': 0}
+
+def _is_null(value):
+	"""Whether SQLite would store `value` as NULL (it stores NaN as NULL)."""
+	return value is None or (isinstance(value, float) and value != value)
+
+def summarize_sqlite(db_conn, countries):
+	"""
+	Get country-level summaries of the database with grouped queries.
+
+	Gives the same result as `country_summary()` for each country, using one
+	scan of the powerplants table for all countries and metrics (with
+	conditional aggregation for fuels and null counts), plus one for the
+	number of distinct fuels.
+
+	Parameters
+	----------
+	db_conn : sqlite3.Connection
+		Open database connection.
+	countries : dict
+		Dict of {iso_code: standard country name used in the database}.
+
+	Returns
+	-------
+	Dict of {iso_code: dict holding the summarized metrics for the country}.
+
+	"""
+	fuel_columns = ['fuel1', 'fuel2', 'fuel3', 'fuel4']
+	generation_columns = ['generation_gwh_{0}'.format(year) for year in range(2012, 2017)]
+	fuels = _fuel_column_names()
+	fuel_match = '({0})'.format(' OR '.join('{0}=?'.format(column) for column in fuel_columns))
+
+	# (summary field, SQL expression, parameters)
+	metrics = [
+		('count', 'COUNT(*)', []),
+		('total_capacity_mw', 'SUM(capacity_mw)', []),
+		('max_capacity_mw', 'MAX(capacity_mw)', []),
+	]
+	for fuel, name in fuels:
+		metrics.append(('count_fuel_{0}'.format(name), 'SUM(CASE WHEN {0} THEN 1 ELSE 0 END)'.format(fuel_match), [fuel] * 4))
+		metrics.append(('capacity_mw_fuel_{0}'.format(name), 'SUM(CASE WHEN {0} THEN capacity_mw END)'.format(fuel_match), [fuel] * 4))
+	for field in ['name', 'owner', 'source']:
+		metrics.append(('count_distinct_{0}'.format(field), 'COUNT(DISTINCT {0})'.format(field), []))
+	for field in ['name', 'pw_idnr', 'capacity_mw', 'year_of_capacity_data', 'owner', 'source', 'url', 'latitude', 'longitude']:
+		metrics.append(('count_null_{0}'.format(field), 'SUM({0} IS NULL)'.format(field), []))
+	metrics.append(('count_null_fuel', 'SUM({0})'.format(' AND '.join('{0} IS NULL'.format(c) for c in fuel_columns)), []))
+	metrics.append(('count_null_generation_gwh_all', 'SUM({0})'.format(' AND '.join('{0} IS NULL'.format(c) for c in generation_columns)), []))
+	for column in generation_columns:
+		metrics.append(('count_{0}'.format(column), 'COUNT({0})'.format(column), []))
+
+	names = countries.values()
+	placeholders = ', '.join(['?'] * len(names))
+	c = db_conn.cursor()
+	stmt = 'SELECT country, {0} FROM powerplants WHERE country IN ({1}) GROUP BY country'.format(
+		', '.join(expression for field, expression, params in metrics), placeholders)
+	params = [p for field, expression, metric_params in metrics for p in metric_params] + names
+	grouped = {}
+	for row in c.execute(stmt, params):
+		grouped[row[0]] = dict(zip([field for field, expression, params in metrics], row[1:]))
+
+	stmt = '''SELECT country, COUNT(DISTINCT fuel) FROM (
+				{0}
+				) WHERE fuel IS NOT NULL GROUP BY country'''.format('\n\t\t\t\tUNION ALL\n\t\t\t\t'.join(
+		'SELECT country, {0} AS fuel FROM powerplants WHERE country IN ({1})'.format(column, placeholders) for column in fuel_columns))
+	distinct_fuels = dict(c.execute(stmt, names * len(fuel_columns)).fetchall())
+
+	summaries = {}
+	for iso_code, country in countries.iteritems():
+		values = grouped.get(country)
+		summary = _empty_summary(country, iso_code)
+		if values:
+			summary.update(values)
+			summary['count_distinct_fuel'] = distinct_fuels.get(country, 0)
+			_finish_summary(summary, fuels)
+		summaries[iso_code] = summary
+	return summaries
+
+def summarize_plants(plants_dict, countries):
+	"""
+	Get country-level summaries of the database without SQLite.
+
+	Gives the same result as `summarize_sqlite()` on a database made from
+	the same plants, with one pass over `plants_dict`.
+
+	Parameters
+	----------
+	plants_dict : dict
+		Has the structure returned by `pw.read_csv_file_to_dict()`.
+	countries : dict
+		Dict of {iso_code: standard country name used in the database}.
+
+	Returns
+	-------
+	Dict of {iso_code: dict holding the summarized metrics for the country}.
+
+	"""
+	fuel_columns = ['fuel1', 'fuel2', 'fuel3', 'fuel4']
+	generation_columns = ['generation_gwh_{0}'.format(year) for year in range(2012, 2017)]
+	null_fields = ['name', 'pw_idnr', 'capacity_mw', 'year_of_capacity_data', 'owner', 'source', 'url', 'latitude', 'longitude']
+	fuels = _fuel_column_names()
+	names = set(countries.values())
+
+	groups = {}
+	for plant in plants_dict.itervalues():
+		country = plant['country']
+		if country not in names:
+			continue
+		group = groups.get(country)
+		if group is None:
+			group = groups[country] = {'count': 0, 'capacities': [], 'fuels': set(),
+				'distinct': dict((field, set()) for field in ['name', 'owner', 'source']),
+				'null': dict((field, 0) for field in null_fields + ['fuel', 'generation_gwh_all']),
+				'generation': dict((column, 0) for column in generation_columns),
+				'fuel_count': dict((fuel, 0) for fuel, name in fuels),
+				'fuel_capacities': dict((fuel, []) for fuel, name in fuels)}
+		group['count'] += 1
+		capacity = None if _is_null(plant['capacity_mw']) else plant['capacity_mw']
+		if capacity is not None:
+			group['capacities'].append(capacity)
+		plant_fuels = set(plant[column] for column in fuel_columns if plant[column] is not None)
+		group['fuels'].update(plant_fuels)
+		for fuel in plant_fuels:
+			if fuel in group['fuel_count']:
+				group['fuel_count'][fuel] += 1
+				if capacity is not None:
+					group['fuel_capacities'][fuel].append(capacity)
+		for field, values in group['distinct'].iteritems():
+			if plant[field] is not None:
+				values.add(plant[field])
+		for field in null_fields:
+			if _is_null(plant[field]):
+				group['null'][field] += 1
+		if not plant_fuels:
+			group['null']['fuel'] += 1
+		has_generation = False
+		for column in generation_columns:
+			if plant[column] is not None:
+				group['generation'][column] += 1
+				has_generation = True
+		if not has_generation:
+			group['null']['generation_gwh_all'] += 1
+
+	summaries = {}
+	for iso_code, country in countries.iteritems():
+		group = groups.get(country)
+		summary = _empty_summary(country, iso_code)
+		if group:
+			summary['total_capacity_mw'] = sum(group['capacities']) if group['capacities'] else None
+			summary['max_capacity_mw'] = max(group['capacities']) if group['capacities'] else None
+			summary['count'] = group['count']
+			summary['count_distinct_fuel'] = len(group['fuels'])
+			for field, values in group['distinct'].iteritems():
+				summary['count_distinct_{0}'.format(field)] = len(values)
+			for field, count in group['null'].iteritems():
+				summary['count_null_{0}'.format(field)] = count
+			for column, count in group['generation'].iteritems():
+				summary['count_{0}'.format(column)] = count
+			for fuel, name in fuels:
+				summary['count_fuel_{0}'.format(name)] = group['fuel_count'][fuel]
+				capacities = group['fuel_capacities'][fuel]
+				summary['capacity_mw_fuel_{0}'.format(name)] = sum(capacities) if capacities else None
+			_finish_summary(summary, fuels)
+		summaries[iso_code] = summary
+	return summaries
+
+def _finish_summary(summary, fuels):
+	"""Convert capacity totals in MW to the GW values of `summary_fieldnames()`, in place."""
+	summary['total_capacity_gw'] = summary.pop('total_capacity_mw') / 1000
+	for fuel, name in fuels:
+		fuel_capacity_mw = summary.pop('capacity_mw_fuel_{0}'.format(name))
+		summary_name = 'capacity_gw_fuel_{0}'.format(name)
+		if fuel_capacity_mw is None:
+			summary[summary_name] = 0
+		else:
+			summary[summary_name] = fuel_capacity_mw / 1000
+
+
 ### MAIN ###
 if __name__ == '__main__':
 	argparser = argparse.ArgumentParser(description="Summarize PowerWatch.")
@@ -215,6 +398,8 @@ if __name__ == '__main__':
 	argparser.add_argument('-o', '--output', type=str, default=DEFAULT_SUMMARY_FILE)
 	argparser.add_argument('--country', type=str, nargs='+',
 		help="ISO-3 country codes; all countries are processed by default.")
+	argparser.add_argument('-s', '--sqlite', type=str,
+		help="SQLite database to summarize instead of the input CSV, if the file exists.")
 	args = argparser.parse_args()
 
 	# prepare list of country codes
@@ -227,13 +412,14 @@ if __name__ == '__main__':
 			if iso_code not in countries:
 				raise ValueError('iso code <{0}> is invalid'.format(iso_code))
 
-	# make sqlite database
-	db_conn = pw.copy_csv_to_sqlite(args.input, ':memory:', return_connection=True)
-
 	# summarize country-level data
-	country_summaries = {}
-	for iso_code in args.country:
-		country_summaries[iso_code] = country_summary(db_conn, countries[iso_code], iso_code)
+	selected = dict((iso_code, countries[iso_code]) for iso_code in args.country)
+	if args.sqlite and os.path.exists(args.sqlite):
+		db_conn = sqlite3.connect(args.sqlite)
+		country_summaries = summarize_sqlite(db_conn, selected)
+		db_conn.close()
+	else:
+		country_summaries = summarize_plants(pw.read_csv_file_to_dict(args.input), selected)
 
 	# write summary output
 	with open(args.output, 'wb') as fout:
@@ -0,0 +1,82 @@
+# This Python file uses the following encoding: utf-8
+"""Tests on the offline country boundary checks."""
+
+import sys
+import os
+import json
+import math
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.pardir, os.pardir))
+import powerwatch as pw
+from powerwatch import borders
+
+
+def square(x0, y0, x1, y1):
+	return [[x0, y0], [x1, y0], [x1, y1], [x0, y1], [x0, y0]]
+
+def star(x, y, radius, points = 12):
+	angles = np.linspace(0, 2 * math.pi, 2 * points, endpoint = False)
+	radii = np.where(np.arange(2 * points) % 2, radius / 3.0, radius)
+	return [[x + r * math.cos(a), y + r * math.sin(a)] for r, a in zip(radii, angles)]
+
+def ray_casting(x, y, ring):
+	"""Point-in-polygon test for one point and one ring, for reference."""
+	inside = False
+	for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+		if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+			inside = not inside
+	return inside
+
+class TestBorders(unittest.TestCase):
+
+	def setUp(self):
+		features = [
+			("United States", {'type': 'Polygon', 'coordinates': [square(0, 0, 10, 10), square(4, 4, 6, 6)]}),
+			("Chile", {'type': 'Polygon', 'coordinates': [square(4, 4, 6, 6)]}),
+			("Fiji", {'type': 'MultiPolygon', 'coordinates': [[square(177, -19, 180, -16)], [square(-180, -19, -178, -16)]]}),
+			("Atlantis", {'type': 'Polygon', 'coordinates': [star(-30, 30, 5)]}),
+		]
+		self.tempdir = tempfile.mkdtemp()
+		self.filename = os.path.join(self.tempdir, "boundaries.geojson")
+		with open(self.filename, 'w') as f:
+			json.dump({'type': 'FeatureCollection', 'features': [{'type': 'Feature', 'properties': {'ADMIN': name},
+				'geometry': geometry} for name, geometry in features]}, f)
+		self.boundaries = borders.make_country_boundaries(self.filename)
+
+	def tearDown(self):
+		shutil.rmtree(self.tempdir)
+
+	def test_names(self):
+		self.assertEqual(sorted(self.boundaries), [u"Atlantis", u"Chile", u"Fiji", u"United States of America"])
+
+	def test_contains(self):
+		ring = star(-30, 30, 5)
+		rng = np.random.RandomState(0)
+		longitudes = rng.uniform(-36, -24, 2000)
+		latitudes = rng.uniform(24, 36, 2000)
+		expected = [ray_casting(x, y, ring) for x, y in zip(longitudes, latitudes)]
+		self.assertEqual(list(self.boundaries[u"Atlantis"].contains(latitudes, longitudes)), expected)
+
+	def test_locate(self):
+		countries = borders.locate_countries([1, 5, -17, -17, 50], [1, 5, 179, -179, 50], self.boundaries)
+		self.assertEqual(countries, [u"United States of America", u"Chile", u"Fiji", u"Fiji", u""])
+
+	def test_check(self):
+		countries = [u"United States of America", u"United States of America", u"Chile", u"Chile", u"Brazil", u"Brazil"]
+		latitudes = [1.0, 5.0, 5.0, 10.05, 1.0, 50.0]
+		longitudes = [1.0, 5.0, 5.0, 5.0, 1.0, 50.0]
+		errors = borders.check_countries(countries, latitudes, longitudes, self.boundaries, tolerance_km = 10.0)
+		# in a hole of its country; too far from its country; Brazil has no boundary but is in another country
+		self.assertEqual(errors, {1: u"Chile", 3: u"", 4: u"United States of America"})
+		errors = borders.check_countries([u"United States of America"], [10.05], [5.0], self.boundaries, tolerance_km = 10.0)
+		self.assertEqual(errors, {})
+		errors = borders.check_countries([u"United States of America"], [10.05], [5.0], self.boundaries, tolerance_km = 0)
+		self.assertEqual(errors, {0: u""})
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,68 @@
+"""Tests on the build orchestrator, with stand-in builder scripts."""
+
+import sys
+import os
+import unittest
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.join(os.pardir, os.pardir))
+from build_databases import build_all
+
+
+# each script checks that its inputs exist before writing its output
+SCRIPT = """
+import os, sys, time
+for name in {inputs!r}:
+	if not os.path.exists(name):
+		sys.exit(3)
+time.sleep({sleep})
+if {write!r}:
+	with open({output!r}, "w") as f:
+		f.write("built")
+sys.exit({code})
+"""
+
+class TestBuildAll(unittest.TestCase):
+
+	def setUp(self):
+		self.tmpdir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.tmpdir)
+
+	def builder(self, name, inputs = [], sleep = 0, write = True, code = 0):
+		output = os.path.join(self.tmpdir, name + ".out")
+		inputs = [os.path.join(self.tmpdir, i + ".out") for i in inputs]
+		script = name + ".py"
+		with open(os.path.join(self.tmpdir, script), "w") as f:
+			f.write(SCRIPT.format(inputs = inputs, sleep = sleep, write = write, output = output, code = code))
+		return build_all.Builder(name, script, inputs, [output], [])
+
+	def test_dependency_graph(self):
+		builders = [self.builder("a"), self.builder("b", ["a"]), self.builder("c", ["a", "b"])]
+		self.assertEqual(build_all.dependency_graph(builders), {"a": set(), "b": set(["a"]), "c": set(["a", "b"])})
+
+	def test_cycle(self):
+		builders = [self.builder("a", ["b"]), self.builder("b", ["a"])]
+		self.assertRaises(ValueError, build_all.dependency_graph, builders)
+
+	def test_run_in_dependency_order(self):
+		builders = [self.builder("c", ["a", "b"]), self.builder("a", sleep = 0.3), self.builder("b")]
+		results = build_all.run_builders(builders, jobs = 2, cwd = self.tmpdir)
+		self.assertEqual(dict((name, r[0]) for name, r in results.items()), {"a": "built", "b": "built", "c": "built"})
+
+	def test_failure_skips_dependents(self):
+		builders = [self.builder("a", code = 2), self.builder("b", ["a"]), self.builder("c", write = False)]
+		results = build_all.run_builders(builders, jobs = 2, cwd = self.tmpdir, log_dir = self.tmpdir)
+		self.assertEqual(dict((name, r[0]) for name, r in results.items()), {"a": "failed", "b": "skipped", "c": "unchanged"})
+		self.assertTrue(os.path.exists(os.path.join(self.tmpdir, "a.log")))
+
+	def test_critical_path(self):
+		dependencies = {"a": set(), "b": set(["a"]), "c": set()}
+		path, seconds = build_all.critical_path(dependencies, {"a": 2.0, "b": 1.0, "c": 2.5})
+		self.assertEqual(path, ["a", "b"])
+		self.assertEqual(seconds, 3.0)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,258 @@
+"""Tests on the raw file download engine, against a local HTTP server."""
+
+import sys
+import os
+import unittest
+import shutil
+import tempfile
+import threading
+import hashlib
+import BaseHTTPServer
+import SocketServer
+
+sys.path.insert(0, os.path.join(os.pardir, os.pardir))
+import powerwatch as pw
+
+
+FILES = {
+	"/small.csv": "name,capacity\nPlant A,10\nPlant B,20\n",
+	"/large.bin": "".join(chr(i % 251) for i in xrange(300000)),
+}
+
+class StandInHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+	"""
+	Serve the server's files with Range and ETag support.
+	/flaky fails twice, /truncated sends half then succeeds.
+	"""
+
+	def log_message(self, *args):
+		pass
+
+	def do_GET(self):
+		server = self.server
+		with server.lock:
+			server.requests.append((self.path, self.headers.get("Range")))
+			server.conditional.append(self.headers.get("If-None-Match"))
+			server.hits[self.path] = server.hits.get(self.path, 0) + 1
+			hits = server.hits[self.path]
+		if self.path == "/flaky" and hits <= 2:
+			self.send_error(503)
+			return
+		if self.path in ("/flaky", "/truncated"):
+			body = server.files["/small.csv"]
+		else:
+			body = server.files.get(self.path)
+		if body is None:
+			self.send_error(404)
+			return
+		etag = '"{0}"'.format(hashlib.sha1(body).hexdigest())
+		if self.headers.get("If-None-Match") == etag:
+			self.send_response(304)
+			self.end_headers()
+			return
+		start = 0
+		byte_range = self.headers.get("Range")
+		if byte_range:
+			start = int(byte_range.split("=")[1].split("-")[0])
+			self.send_response(206)
+			self.send_header("Content-Range", "bytes {0}-{1}/{2}".format(start, len(body) - 1, len(body)))
+		else:
+			self.send_response(200)
+		self.send_header("Content-Length", str(len(body) - start))
+		self.send_header("ETag", etag)
+		self.end_headers()
+		if self.path == "/truncated" and hits == 1:
+			self.wfile.write(body[start:len(body) // 2])
+			self.close_connection = 1
+			return
+		self.wfile.write(body[start:])
+
+class StandInServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+	daemon_threads = True
+
+class StandInServerTestCase(unittest.TestCase):
+	"""Run a stand-in HTTP server and a temporary download directory for each test."""
+
+	def setUp(self):
+		self.server = StandInServer(("127.0.0.1", 0), StandInHandler)
+		self.server.lock = threading.Lock()
+		self.server.requests = []
+		self.server.hits = {}
+		self.server.conditional = []
+		self.server.files = dict(FILES)
+		self.thread = threading.Thread(target = self.server.serve_forever)
+		self.thread.daemon = True
+		self.thread.start()
+		self.base_url = "http://127.0.0.1:{0}".format(self.server.server_address[1])
+		self.tmpdir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		self.server.shutdown()
+		self.server.server_close()
+		shutil.rmtree(self.tmpdir)
+
+	def path(self, name):
+		return os.path.join(self.tmpdir, name)
+
+	def read(self, name):
+		with open(self.path(name), "rb") as f:
+			return f.read()
+
+class TestDownload(StandInServerTestCase):
+
+	def test_parallel_downloads(self):
+		files = {self.path("small.csv"): self.base_url + "/small.csv",
+				self.path("large.bin"): self.base_url + "/large.bin"}
+		errors = pw.download_files(files, workers = 2, progress = None)
+		self.assertEqual(errors, {})
+		self.assertEqual(self.read("small.csv"), FILES["/small.csv"])
+		self.assertEqual(self.read("large.bin"), FILES["/large.bin"])
+		self.assertEqual(sorted(os.listdir(self.tmpdir)), ["large.bin", "small.csv"])
+
+	def test_resume_partial_file(self):
+		body = FILES["/large.bin"]
+		with open(self.path("large.bin.part"), "wb") as f:
+			f.write(body[:100000])
+		size = pw.download_file(self.base_url + "/large.bin", self.path("large.bin"), progress = None)
+		self.assertEqual(size, len(body))
+		self.assertEqual(self.read("large.bin"), body)
+		self.assertEqual(self.server.requests, [("/large.bin", "bytes=100000-")])
+		self.assertFalse(os.path.exists(self.path("large.bin.part")))
+
+	def test_retry_with_backoff(self):
+		pw.download_file(self.base_url + "/flaky", self.path("flaky.csv"), backoff = 0.01, progress = None)
+		self.assertEqual(self.server.hits["/flaky"], 3)
+		self.assertEqual(self.read("flaky.csv"), FILES["/small.csv"])
+
+	def test_truncated_transfer_resumes(self):
+		pw.download_file(self.base_url + "/truncated", self.path("truncated.csv"), backoff = 0.01, progress = None)
+		self.assertEqual(self.read("truncated.csv"), FILES["/small.csv"])
+		self.assertEqual(self.server.requests[-1][1], "bytes={0}-".format(len(FILES["/small.csv"]) // 2))
+
+	def test_missing_file_fails_without_retry(self):
+		with open(self.path("missing.csv"), "wb") as f:
+			f.write("old contents")
+		errors = pw.download_files({self.path("missing.csv"): self.base_url + "/missing.csv"},
+									backoff = 0.01, progress = None)
+		self.assertEqual(errors.keys(), [self.path("missing.csv")])
+		self.assertFalse(errors[self.path("missing.csv")].retryable)
+		self.assertEqual(self.server.hits["/missing.csv"], 1)
+		self.assertEqual(self.read("missing.csv"), "old contents")
+
+	def test_progress_reported(self):
+		reports = []
+		pw.download_file(self.base_url + "/large.bin", self.path("large.bin"), chunk_size = 4096,
+						progress = lambda filename, done, total: reports.append((done, total)))
+		self.assertEqual(reports[-1], (len(FILES["/large.bin"]), len(FILES["/large.bin"])))
+		self.assertTrue(len(reports) > 2)
+		self.assertEqual(reports, sorted(reports))
+
+class TestHTTPCache(StandInServerTestCase):
+
+	def setUp(self):
+		StandInServerTestCase.setUp(self)
+		self.cache_dir = self.path("cache")
+
+	def fetch(self, name):
+		return pw.download_file(self.base_url + "/" + name, self.path(name), progress = None,
+								cache_dir = self.cache_dir)
+
+	def test_not_modified(self):
+		self.fetch("small.csv")
+		mtime = os.path.getmtime(self.path("small.csv"))
+		self.fetch("small.csv")
+		self.assertEqual(self.server.conditional, [None, self.server.conditional[1]])
+		self.assertIsNotNone(self.server.conditional[1])
+		self.assertEqual(os.path.getmtime(self.path("small.csv")), mtime)
+		self.assertEqual(self.read("small.csv"), FILES["/small.csv"])
+
+	def test_modified_upstream(self):
+		self.fetch("small.csv")
+		self.server.files["/small.csv"] = "name,capacity\nPlant C,30\n"
+		self.fetch("small.csv")
+		self.assertEqual(self.read("small.csv"), "name,capacity\nPlant C,30\n")
+
+	def test_modified_locally(self):
+		self.fetch("small.csv")
+		with open(self.path("small.csv"), "wb") as f:
+			f.write("edited")
+		self.fetch("small.csv")
+		self.assertEqual(self.server.conditional, [None, None])
+		self.assertEqual(self.read("small.csv"), FILES["/small.csv"])
+
+class TestInputsChanged(unittest.TestCase):
+
+	def setUp(self):
+		self.tmpdir = tempfile.mkdtemp()
+		self.cache_dir = os.path.join(self.tmpdir, "cache")
+		self.raw_file = os.path.join(self.tmpdir, "raw.csv")
+		with open(self.raw_file, "wb") as f:
+			f.write("name,capacity\nPlant A,10\n")
+		self.plants = {"TST0000001": pw.PowerPlant("TST0000001", u"Plant A", u"Testland")}
+
+	def tearDown(self):
+		shutil.rmtree(self.tmpdir)
+
+	def changed(self, force = False):
+		return pw.inputs_changed([self.raw_file], "TST", self.tmpdir, force = force, cache_dir = self.cache_dir)
+
+	def save(self):
+		pw.save_database(self.plants, "TST", self.tmpdir)
+		pw.record_inputs([self.raw_file], os.path.join(self.tmpdir, "TST-Database.bin"), cache_dir = self.cache_dir)
+
+	def test_unchanged_after_build(self):
+		self.assertTrue(self.changed())
+		self.save()
+		self.assertFalse(self.changed())
+		self.assertTrue(self.changed(force = True))
+
+	def test_touched_but_same_content(self):
+		self.save()
+		os.utime(self.raw_file, (0, 0))
+		self.assertFalse(self.changed())
+
+	def test_changed_content(self):
+		self.save()
+		with open(self.raw_file, "ab") as f:
+			f.write("Plant B,20\n")
+		self.assertTrue(self.changed())
+
+	def test_missing_database(self):
+		self.save()
+		os.remove(os.path.join(self.tmpdir, "TST-Database.bin"))
+		self.assertTrue(self.changed())
+
+	def test_changed_script(self):
+		script = os.path.join(self.tmpdir, "build_database_TST.py")
+		with open(script, "wb") as f:
+			f.write("# parse raw.csv\n")
+		inputs = [self.raw_file, script]
+		pw.save_database(self.plants, "TST", self.tmpdir)
+		pw.record_inputs(inputs, os.path.join(self.tmpdir, "TST-Database.bin"), cache_dir = self.cache_dir)
+		self.assertFalse(pw.inputs_changed(inputs, "TST", self.tmpdir, cache_dir = self.cache_dir))
+		with open(script, "ab") as f:
+			f.write("# parse raw.csv differently\n")
+		self.assertTrue(pw.inputs_changed(inputs, "TST", self.tmpdir, cache_dir = self.cache_dir))
+
+	def test_changed_package_source(self):
+		package_dir = os.path.join(self.tmpdir, "package")
+		os.mkdir(package_dir)
+		with open(os.path.join(package_dir, "module.py"), "wb") as f:
+			f.write("VERSION = 1\n")
+		original = pw.PACKAGE_DIR
+		pw.PACKAGE_DIR = package_dir
+		try:
+			self.assertIn(os.path.join(package_dir, "module.py"), pw.build_source_inputs())
+			self.save()
+			# compiled files are not build inputs
+			with open(os.path.join(package_dir, "module.pyc"), "wb") as f:
+				f.write("compiled")
+			self.assertFalse(self.changed())
+			with open(os.path.join(package_dir, "module.py"), "ab") as f:
+				f.write("VERSION = 2\n")
+			self.assertTrue(self.changed())
+		finally:
+			pw.PACKAGE_DIR = original
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,56 @@
+"""Tests on the feature rows of the generation estimation model."""
+
+import sys
+import os
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.pardir, os.pardir))
+from powerwatch import features
+
+
+class TestFeatures(unittest.TestCase):
+
+	def setUp(self):
+		self.countries = [u"Chile", u"Chile", u"Chile", u"Peru", u"Peru"]
+		self.fuels = [u"Hydro", u"Coal", u"Hydro", u"Hydro", u"Wind"]
+		self.capacities = [10.0, 30.0, 40.0, 5.0, 15.0]
+		self.years = [1990, 2000, np.nan, 2010, 2015]
+
+	def test_group_by(self):
+		groups, inverse = features.group_index(self.countries, self.fuels)
+		self.assertEqual(len(groups), 4)
+		self.assertEqual([groups[group] for group in inverse], zip(self.countries, self.fuels))
+		self.assertEqual(features.group_totals(self.capacities, self.countries), {u"Chile": 80.0, u"Peru": 20.0})
+		self.assertEqual(features.group_means(self.capacities, self.countries, self.fuels),
+			{(u"Chile", u"Hydro"): 25.0, (u"Chile", u"Coal"): 30.0, (u"Peru", u"Hydro"): 5.0, (u"Peru", u"Wind"): 15.0})
+
+	def test_make_features(self):
+		fuel_types = [u"Coal", u"Hydro", u"Gas"]
+		average_capacity_factors = {(u"Chile", u"Hydro"): 0.4, (u"Chile", u"Coal"): 0.7, (u"Peru", u"Hydro"): 0.5}
+		X = features.make_features(self.countries, self.fuels, self.capacities, self.years, fuel_types,
+			average_capacity_factors)
+		self.assertEqual(X.shape, (5, len(features.FEATURE_NAMES)))
+		np.testing.assert_allclose(X[:4], [
+			[1, 10.0, 1990, 0.4, 10.0 / 80, 10.0 / 50],
+			[0, 30.0, 2000, 0.7, 30.0 / 80, 1.0],
+			[1, 40.0, np.nan, 0.4, 40.0 / 80, 40.0 / 50],
+			[1, 5.0, 2010, 0.5, 5.0 / 20, 1.0]])
+		# fuel not in the model, and no average capacity factor
+		self.assertTrue(np.isnan(X[4, 0]))
+		self.assertTrue(np.isnan(X[4, 3]))
+		np.testing.assert_allclose(X[4, [1, 2, 4, 5]], [15.0, 2015, 15.0 / 20, 1.0])
+
+	def test_unknown_capacity(self):
+		# plants without capacity are left out of the totals of their country
+		average_capacity_factors = {(u"Chile", u"Hydro"): 0.4, (u"Chile", u"Coal"): 0.7}
+		X = features.make_features(self.countries[:3] + [u"Chile"], self.fuels[:3] + [u"Hydro"],
+			self.capacities[:3] + [np.nan], self.years[:3] + [2000], [u"Coal", u"Hydro"], average_capacity_factors)
+		expected = features.make_features(self.countries[:3], self.fuels[:3], self.capacities[:3], self.years[:3],
+			[u"Coal", u"Hydro"], average_capacity_factors)
+		np.testing.assert_array_equal(X[:3], expected)
+		self.assertTrue(np.isnan(X[3, [1, 4, 5]]).all())
+
+if __name__ == '__main__':
+	unittest.main()
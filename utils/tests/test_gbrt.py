@@ -0,0 +1,140 @@
+"""Tests on the NumPy evaluator of gradient boosted regression trees."""
+
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.pardir, os.pardir))
+from powerwatch import gbrt
+
+try:
+	from sklearn.ensemble import GradientBoostingRegressor
+except ImportError:
+	GradientBoostingRegressor = None
+
+
+class StandInTree(object):
+	"""Random regression tree with the node arrays of a fitted sklearn tree (tree_)."""
+
+	def __init__(self, rng, n_features, max_depth):
+		self.children_left, self.children_right, self.feature, self.threshold, self.value = [], [], [], [], []
+		self._grow(rng, n_features, max_depth)
+		self.node_count = len(self.feature)
+		self.children_left = np.array(self.children_left)
+		self.children_right = np.array(self.children_right)
+		self.feature = np.array(self.feature)
+		self.threshold = np.array(self.threshold)
+		self.value = np.array(self.value).reshape(-1, 1, 1)
+
+	def _grow(self, rng, n_features, depth):
+		node = len(self.feature)
+		for values in [self.children_left, self.children_right, self.feature, self.threshold]:
+			values.append(gbrt.TREE_LEAF if values is not self.threshold else -2.0)
+		self.value.append(rng.normal())
+		if depth and rng.rand() < 0.8:
+			self.feature[node] = rng.randint(n_features)
+			# midpoint between two float32 values, like sklearn thresholds
+			self.threshold[node] = (float(np.float32(rng.rand())) + float(np.float32(rng.rand()))) / 2
+			self.children_left[node] = self._grow(rng, n_features, depth - 1)
+			self.children_right[node] = self._grow(rng, n_features, depth - 1)
+		return node
+
+	def predict(self, row):
+		node = 0
+		while self.children_left[node] != gbrt.TREE_LEAF:
+			if np.float32(row[self.feature[node]]) <= self.threshold[node]:
+				node = self.children_left[node]
+			else:
+				node = self.children_right[node]
+		return self.value[node, 0, 0]
+
+class StandInStage(object):
+	def __init__(self, tree):
+		self.tree_ = tree
+
+class StandInInit(object):
+	def predict(self, X):
+		return np.full((len(X), 1), 0.25)
+
+class StandInRegressor(object):
+	"""Object with the attributes of a fitted sklearn GradientBoostingRegressor."""
+
+	def __init__(self, n_trees = 50, n_features = 5, max_depth = 6, seed = 0):
+		rng = np.random.RandomState(seed)
+		self.n_features_ = n_features
+		self.learning_rate = 0.1
+		self.init_ = StandInInit()
+		self.estimators_ = np.empty((n_trees, 1), dtype=object)
+		for i in range(n_trees):
+			self.estimators_[i, 0] = StandInStage(StandInTree(rng, n_features, max_depth))
+
+	def predict(self, X):
+		return np.array([0.25 + self.learning_rate * sum(stage[0].tree_.predict(row) for stage in self.estimators_)
+							for row in X])
+
+class TestGBRT(unittest.TestCase):
+
+	def setUp(self):
+		rng = np.random.RandomState(1)
+		self.X = rng.rand(300, 5)
+		# some rows exactly representable in float32, as the trees compare them
+		self.X[:20] = np.float32(self.X[:20])
+
+	def test_predict(self):
+		regressor = StandInRegressor()
+		model = gbrt.CompiledGBRT.from_sklearn(regressor)
+		self.assertEqual(model.n_trees, 50)
+		self.assertLessEqual(model.max_depth, 6)
+		np.testing.assert_allclose(model.predict(self.X), regressor.predict(self.X), rtol=1e-12, atol=1e-12)
+
+	def test_chunks(self):
+		model = gbrt.CompiledGBRT.from_sklearn(StandInRegressor())
+		expected = model.predict(self.X)
+		original = gbrt.MAX_CHUNK_CELLS
+		gbrt.MAX_CHUNK_CELLS = 7 * model.n_trees
+		try:
+			np.testing.assert_array_equal(model.predict(self.X), expected)
+		finally:
+			gbrt.MAX_CHUNK_CELLS = original
+		self.assertRaises(ValueError, model.predict, self.X[:, :4])
+
+	def test_node_arrays(self):
+		# models too deep to pad to complete trees follow the child arrays
+		model = gbrt.CompiledGBRT.from_sklearn(StandInRegressor())
+		expected = model.predict(self.X)
+		original = gbrt.COMPLETE_TREE_MAX_DEPTH
+		gbrt.COMPLETE_TREE_MAX_DEPTH = model.max_depth - 1
+		try:
+			np.testing.assert_allclose(model.predict(self.X), expected, rtol=1e-12, atol=1e-12)
+		finally:
+			gbrt.COMPLETE_TREE_MAX_DEPTH = original
+
+	def test_save_load(self):
+		model = gbrt.CompiledGBRT.from_sklearn(StandInRegressor(), metadata={'fuel_types': [u"Coal", u"Gas"]})
+		tempdir = tempfile.mkdtemp()
+		try:
+			filename = os.path.join(tempdir, "model.npz")
+			model.save(filename)
+			loaded = gbrt.CompiledGBRT.load(filename)
+		finally:
+			shutil.rmtree(tempdir)
+		self.assertEqual(loaded.metadata, {'fuel_types': [u"Coal", u"Gas"]})
+		np.testing.assert_array_equal(loaded.predict(self.X), model.predict(self.X))
+
+	@unittest.skipIf(GradientBoostingRegressor is None, "sklearn is not installed")
+	def test_sklearn(self):
+		rng = np.random.RandomState(2)
+		y = self.X[:, 0] * 2 + np.sin(self.X[:, 1] * 6) + rng.normal(scale=0.1, size=len(self.X))
+		est = GradientBoostingRegressor(n_estimators=100, max_depth=4, learning_rate=0.05, subsample=0.5,
+			loss='huber', random_state=0)
+		est.fit(self.X, y)
+		model = gbrt.CompiledGBRT.from_sklearn(est)
+		X_test = rng.rand(1000, 5)
+		np.testing.assert_allclose(model.predict(X_test), est.predict(X_test), rtol=1e-10, atol=1e-10)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,139 @@
+"""Tests on the reverse geocoding client, against a local stub geocoder."""
+
+import sys
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+import urlparse
+import BaseHTTPServer
+import SocketServer
+
+sys.path.insert(0, os.path.join(os.pardir, os.pardir))
+import powerwatch as pw
+from powerwatch import geocoding
+
+
+class StubGeocoderHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+	"""
+	Answer reverse geocoding requests like the Google Maps API: latitudes above 0
+	are in Canada, below 0 in Chile, and at 0 nowhere. Latitude 45 fails once
+	with a 503 and latitude 66 is refused.
+	"""
+
+	def log_message(self, *args):
+		pass
+
+	def do_GET(self):
+		server = self.server
+		query = urlparse.parse_qs(urlparse.urlparse(self.path).query)
+		latitude = float(query['latlng'][0].split(",")[0])
+		with server.lock:
+			server.requests.append(query['latlng'][0])
+			server.active += 1
+			server.max_active = max(server.max_active, server.active)
+			attempts = server.requests.count(query['latlng'][0])
+		try:
+			time.sleep(server.delay)
+			if latitude == 45 and attempts == 1:
+				self.send_error(503)
+				return
+			if latitude == 66:
+				body = {'status': 'REQUEST_DENIED', 'results': []}
+			elif latitude == 0:
+				body = {'status': 'ZERO_RESULTS', 'results': []}
+			else:
+				country = u"Canada" if latitude > 0 else u"Chile"
+				body = {'status': 'OK', 'results': [{'address_components': [
+					{'long_name': u"Somewhere", 'types': ["locality"]},
+					{'long_name': country, 'types': ["country", "political"]}]}]}
+			body = json.dumps(body)
+			self.send_response(200)
+			self.send_header("Content-Type", "application/json")
+			self.send_header("Content-Length", str(len(body)))
+			self.end_headers()
+			self.wfile.write(body)
+		finally:
+			with server.lock:
+				server.active -= 1
+
+class StubGeocoder(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+	daemon_threads = True
+
+class TestGeocoding(unittest.TestCase):
+
+	def setUp(self):
+		self.server = StubGeocoder(("127.0.0.1", 0), StubGeocoderHandler)
+		self.server.lock = threading.Lock()
+		self.server.requests = []
+		self.server.active = 0
+		self.server.max_active = 0
+		self.server.delay = 0.0
+		self.thread = threading.Thread(target = self.server.serve_forever)
+		self.thread.daemon = True
+		self.thread.start()
+		self.url = "http://127.0.0.1:{0}/geocode/json".format(self.server.server_address[1])
+		self.tempdir = tempfile.mkdtemp()
+		self.cache_file = os.path.join(self.tempdir, "geocode.json")
+
+	def tearDown(self):
+		self.server.shutdown()
+		self.server.server_close()
+		shutil.rmtree(self.tempdir)
+
+	def make_geocoder(self, **kwargs):
+		kwargs.setdefault('cache', geocoding.GeocodeCache(self.cache_file))
+		kwargs.setdefault('rate', 1000.0)
+		kwargs.setdefault('backoff', 0.01)
+		return geocoding.ReverseGeocoder("KEY", url = self.url, **kwargs)
+
+	def test_countries(self):
+		locations = [(10.0, 10.0), (-10.0, 10.0), (0.0, 0.0), (45.0, 1.0), (66.0, 1.0)]
+		countries, errors = self.make_geocoder().countries(locations)
+		self.assertEqual(countries, [u"Canada", u"Chile", u"", u"Canada", None])
+		self.assertEqual(errors.keys(), ["66.0000,1.0000"])
+		self.assertFalse(errors["66.0000,1.0000"].retryable)
+		# refused requests are not retried
+		self.assertEqual(self.server.requests.count("66.0,1.0"), 1)
+
+	def test_cache(self):
+		locations = [(10.0, 10.0), (10.00001, 10.00001), (-10.0, 10.0)]
+		countries, _ = self.make_geocoder().countries(locations)
+		# co-located plants are queried once
+		self.assertEqual(len(self.server.requests), 2)
+		self.assertEqual(countries, [u"Canada", u"Canada", u"Chile"])
+		# results are reused by later runs
+		countries, _ = self.make_geocoder().countries(locations + [(-20.0, 10.0)])
+		self.assertEqual(len(self.server.requests), 3)
+		self.assertEqual(countries, [u"Canada", u"Canada", u"Chile", u"Chile"])
+		# failures are not cached
+		self.make_geocoder().countries([(66.0, 1.0)])
+		self.make_geocoder().countries([(66.0, 1.0)])
+		self.assertEqual(self.server.requests.count("66.0,1.0"), 2)
+
+	def test_concurrency(self):
+		self.server.delay = 0.05
+		locations = [(float(i), 1.0) for i in range(1, 25)]
+		start = time.time()
+		countries, _ = self.make_geocoder(workers = 4, cache = None).countries(locations)
+		elapsed = time.time() - start
+		self.assertEqual(countries, [u"Canada"] * 24)
+		self.assertEqual(self.server.max_active, 4)
+		self.assertTrue(elapsed < 24 * 0.05)
+
+	def test_rate_limit(self):
+		bucket = geocoding.TokenBucket(rate = 50.0)
+		start = time.time()
+		for _ in range(11):
+			bucket.acquire()
+		self.assertTrue(time.time() - start >= 0.19)
+		locations = [(float(i), 1.0) for i in range(1, 11)]
+		start = time.time()
+		self.make_geocoder(workers = 4, rate = 50.0, cache = None).countries(locations)
+		self.assertTrue(time.time() - start >= 0.17)
+
+if __name__ == '__main__':
+	unittest.main()
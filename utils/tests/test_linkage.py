@@ -0,0 +1,83 @@
+# This Python file uses the following encoding: utf-8
+"""Tests on matching plants between databases."""
+
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.pardir, os.pardir))
+import powerwatch as pw
+from powerwatch import linkage
+
+
+def make_plant(idnr, name, country, capacity = None, fuel = None, latitude = None, longitude = None):
+	location = pw.LocationObject(u"", latitude, longitude)
+	return pw.PowerPlant(idnr, name, country, plant_capacity = capacity, plant_location = location,
+		plant_fuel = set(fuel or []))
+
+class TestLinkage(unittest.TestCase):
+
+	def setUp(self):
+		self.wri = {
+			"WRI1000001": make_plant("WRI1000001", u"Grand Rapids", u"Canada", 470.0, [u"Hydro"]),
+			"WRI1000002": make_plant("WRI1000002", u"Usina Itaipú", u"Brazil", 14000.0, [u"Hydro"], -25.4, -54.6),
+			"WRI1000003": make_plant("WRI1000003", u"North Station 2", u"Canada", 50.0, [u"Gas"], 45.0, -75.0),
+			"WRI1000004": make_plant("WRI1000004", u"Nowhere", u"Canada", 10.0, [u"Wind"], 60.0, -100.0),
+			"WRI1000005": make_plant("WRI1000005", u"Grand Rapids", u"Chile", 470.0, [u"Hydro"]),
+		}
+		self.geo = {
+			"GEODB0000001": make_plant("GEODB0000001", u"Grand Rapids Generating Station Canada", u"Canada", 472.0, [u"Hydro"], 53.2, -99.3),
+			"GEODB0000002": make_plant("GEODB0000002", u"Itaipu Hydroelectric Power Plant", u"Brazil", 14000.0, [u"Hydro"], -25.41, -54.59),
+			"GEODB0000003": make_plant("GEODB0000003", u"Ottawa Gas Plant", u"Canada", 52.0, [u"Gas"], 45.01, -75.01),
+			"GEODB0000004": make_plant("GEODB0000004", u"Rapids Creek Wind", u"Canada", 10.0, [u"Wind"], 49.0, -120.0),
+		}
+		self.carma = {
+			"CARMA0000001": make_plant("CARMA0000001", u"GRAND RAPIDS", u"Canada", 470.0, None, 53.2, -99.3),
+		}
+
+	def test_name_tokens(self):
+		self.assertEqual(linkage.name_tokens(u"Usina Itaipú Power-Plant"), (u"itaipu",))
+		self.assertEqual(linkage.name_tokens("North Station 2"), (u"north", u"2"))
+
+	def test_scores(self):
+		records = dict((r.idnr, r) for rs in linkage.plant_records(self.geo).values() for r in rs)
+		weights = linkage.token_weights(records.values())
+		same = linkage.match_score(records["GEODB0000001"], records["GEODB0000001"], weights)
+		other = linkage.match_score(records["GEODB0000001"], records["GEODB0000004"], weights)
+		self.assertAlmostEqual(same, 1.0)
+		self.assertTrue(0.0 <= other < linkage.MATCH_THRESHOLD)
+
+	def test_link(self):
+		matches = linkage.link_databases(self.wri, self.geo, workers = 1)
+		self.assertEqual(matches["WRI1000001"][0], "GEODB0000001")
+		self.assertEqual(matches["WRI1000002"][0], "GEODB0000002")
+		# names differ: below the threshold, but a candidate by location
+		self.assertNotIn("WRI1000003", matches)
+		self.assertEqual(linkage.link_databases(self.wri, self.geo, workers = 1, threshold = 0.4)["WRI1000003"][0], "GEODB0000003")
+		self.assertNotIn("WRI1000004", matches)
+		# blocked by country
+		self.assertNotIn("WRI1000005", matches)
+		self.assertTrue(all(linkage.MATCH_THRESHOLD <= score <= 1.0 for _, score in matches.values()))
+		self.assertEqual(linkage.link_databases(self.wri, self.geo, workers = 2), matches)
+
+	def test_concordance(self):
+		curated = {"WRI1000004": {'geo_id': "GEODB0000004", 'carma_id': "", 'osm_id': ""}}
+		concordance = linkage.make_concordance(self.wri, self.geo, self.carma, curated = curated, workers = 1)
+		self.assertEqual(concordance["WRI1000001"]['carma_id'], "CARMA0000001")
+		self.assertEqual(concordance["WRI1000004"]['geo_score'], 1.0)
+		tempdir = tempfile.mkdtemp()
+		try:
+			filename = os.path.join(tempdir, "concordance.csv")
+			linkage.write_concordance(concordance, filename)
+			loaded = pw.make_plant_concordance(filename)
+		finally:
+			shutil.rmtree(tempdir)
+		self.assertEqual(sorted(loaded), sorted(concordance))
+		for wri_id, entry in loaded.iteritems():
+			for key in ['geo_id', 'carma_id', 'osm_id']:
+				self.assertEqual(entry[key], concordance[wri_id][key])
+
+if __name__ == '__main__':
+	unittest.main()
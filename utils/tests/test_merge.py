@@ -0,0 +1,84 @@
+# This Python file uses the following encoding: utf-8
+"""Tests on the PowerWatch merge steps."""
+
+import sys
+import os
+import unittest
+
+sys.path.insert(0, os.path.join(os.pardir, os.pardir))
+import powerwatch as pw
+from powerwatch import merge
+
+
+def make_plant(idnr, country, capacity = 10.0, latitude = None, longitude = None):
+	location = pw.LocationObject(u"", latitude, longitude)
+	return pw.PowerPlant(idnr, u"Plant " + idnr, country, plant_capacity = capacity, plant_location = location)
+
+class TestMerge(unittest.TestCase):
+
+	def setUp(self):
+		self.country_dictionary = pw.make_country_dictionary()
+		self.chile = {
+			"CHL0000001": make_plant("CHL0000001", u"Chile", 50.0, -33.0, -70.0),
+			"CHL0000002": make_plant("CHL0000002", u"Chile", 0.5, -33.0, -70.0),
+			"CHL0000003": make_plant("CHL0000003", u"Chile", 50.0),
+		}
+		self.wri = {
+			"WRI1000001": make_plant("WRI1000001", u"Canada", 20.0, 45.0, -75.0),
+			"WRI1000002": make_plant("WRI1000002", u"Canada", 30.0),
+			"WRI1000003": make_plant("WRI1000003", u"Canada", 40.0),
+			"WRI1000004": make_plant("WRI1000004", u"Chile", 40.0, -30.0, -70.0),
+			"WRI1000005": make_plant("WRI1000005", u"Atlantis", 40.0, 1.0, 1.0),
+		}
+		self.geo = {
+			"GEODB0000001": make_plant("GEODB0000001", u"Canada", 30.0, 46.0, -74.0),
+			"GEODB0000002": make_plant("GEODB0000002", u"Fiji", 5.0, -17.0, 178.0),
+		}
+		self.carma = {
+			"CARMA0000001": make_plant("CARMA0000001", u"Canada", 40.0, 47.0, -73.0),
+			"CARMA0000002": make_plant("CARMA0000002", u"Canada", 40.0, 48.0, -72.0),
+		}
+		self.concordance = {
+			"WRI1000002": {'geo_id': "GEODB0000001", 'carma_id': "", 'osm_id': ""},
+			"WRI1000003": {'geo_id': "", 'carma_id': "CARMA0000001", 'osm_id': ""},
+		}
+
+	def run_merge(self, dump = False):
+		return merge.merge_databases({u"Chile": self.chile}, self.wri, self.geo, self.carma, {},
+										self.country_dictionary, self.concordance, dump = dump)
+
+	def test_triage(self):
+		result = self.run_merge()
+		self.assertEqual(sorted(result['plants']),
+			["CHL0000001", "GEODB0000002", "WRI1000001", "WRI1000002", "WRI1000003"])
+		self.assertEqual(result['plants']["WRI1000002"].coord_source, u"GEO data")
+		self.assertEqual(result['plants']["WRI1000002"].location.latitude, 46.0)
+		self.assertEqual(result['plants']["WRI1000003"].coord_source, u"CARMA data")
+		self.assertEqual(result['additions'][u"Chile"], {'count': 1, 'capacity': 50.0})
+		self.assertEqual(result['additions']["WRI with CARMA lat/long data"]['count'], 1)
+		self.assertEqual(result['additions']["SourceWatch"]['count'], 0)
+		self.assertEqual(result['log'], ['Error: country Atlantis not recognized.\n'])
+
+	def test_counters(self):
+		result = self.run_merge()
+		steps = dict((p['step'], p) for p in result['partitions'])
+		self.assertEqual(steps[u"Chile"]['counters'], {'plants': 3, 'added': 1, 'below minimum capacity': 1, 'no location': 1})
+		self.assertEqual(steps["WRI"]['counters']['national data'], 1)
+		self.assertEqual(steps["WRI"]['counters']['unknown country'], 1)
+		self.assertEqual(steps["WRI"]['carma_id_used'], set(["CARMA0000001"]))
+		self.assertTrue(all(p['seconds'] >= 0 for p in result['partitions']))
+		self.assertEqual(len(merge.step_report(result['partitions'])), len(result['partitions']))
+
+	def test_dump(self):
+		result = self.run_merge(dump = True)
+		datadump = result['datadump']
+		self.assertEqual(datadump["CHL0000001"].idnr, "CHL0000001,Yes")
+		self.assertEqual(datadump["CHL0000002"].idnr, "CHL0000002,No")
+		self.assertIn("CARMA0000002", datadump)
+		self.assertNotIn("CARMA0000001", datadump)
+		# labels are only in the dump
+		for plant_id, plant in result['plants'].iteritems():
+			self.assertEqual(plant.idnr, plant_id)
+
+if __name__ == '__main__':
+	unittest.main()
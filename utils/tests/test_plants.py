@@ -0,0 +1,252 @@
+# This Python file uses the following encoding: utf-8
+"""Tests on PowerPlant objects and database handling."""
+
+import sys
+import os
+import csv
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.pardir, os.pardir))
+import powerwatch as pw
+
+
+def make_test_plant(idnr=u"TST0000001", name=u"Test Plant", country=u"Chile",
+		capacity=100.0, fuel=u"Coal", latitude=-33.0, longitude=-70.0, generation=pw.NO_DATA_OTHER):
+	location = pw.LocationObject(u"", latitude, longitude)
+	return pw.PowerPlant(idnr, name, country, plant_capacity=capacity,
+		plant_fuel=fuel, plant_location=location, plant_generation=generation,
+		plant_source=u"Test Source", plant_source_url=u"http://example.com")
+
+
+class TestCompactRepresentation(unittest.TestCase):
+
+	def test_no_instance_dict(self):
+		plant = make_test_plant()
+		self.assertFalse(hasattr(plant, '__dict__'))
+		self.assertFalse(hasattr(plant.location, '__dict__'))
+
+	def test_pickle_roundtrip(self):
+		gen = pw.PlantGenerationObject.create(120.0, 2014, source=u"test")
+		plant = make_test_plant(generation=gen)
+		for protocol in (0, 2):
+			loaded = pickle.loads(pickle.dumps({plant.idnr: plant}, protocol))[plant.idnr]
+			self.assertEqual(loaded.__getstate__().keys(), plant.__getstate__().keys())
+			self.assertEqual(loaded.name, plant.name)
+			self.assertEqual(loaded.location.latitude, -33.0)
+			self.assertEqual(loaded.generation[0].gwh, 120.0)
+
+	def test_legacy_state(self):
+		plant = pw.PowerPlant.__new__(pw.PowerPlant)
+		plant.__setstate__(make_test_plant().__getstate__())
+		self.assertEqual(plant.capacity, 100.0)
+
+	def test_compact_database(self):
+		plants = {}
+		for i in range(3):
+			plant = make_test_plant(idnr=pw.make_id(u"TST", i), country=u"".join([u"Chi", u"le"]),
+				latitude=None, longitude=None, generation=pw.PlantGenerationObject())
+			plants[plant.idnr] = plant
+		pw.compact_database(plants)
+		countries = set(id(p.country) for p in plants.values())
+		self.assertEqual(len(countries), 1)
+		for plant in plants.values():
+			self.assertIs(plant.location, pw.EMPTY_LOCATION)
+			self.assertIs(plant.generation[0], pw.EMPTY_GENERATION)
+
+class TestPlantTable(unittest.TestCase):
+
+	def setUp(self):
+		gen = pw.PlantGenerationObject.create(120.0, 2014, source=u"test")
+		self.plants = {}
+		for plant in [make_test_plant(u"TST0000001", generation=gen),
+				make_test_plant(u"TST0000002", country=u"Peru", fuel=u"Hydro", capacity=50),
+				make_test_plant(u"TST0000003", capacity=None, fuel=[u"Gas", u"Oil"], latitude=None)]:
+			self.plants[plant.idnr] = plant
+		self.plants[u"TST0000002"].commissioning_year = '1985'
+		self.table = pw.PlantTable.from_dict(self.plants)
+
+	def test_roundtrip(self):
+		plants = self.table.to_dict()
+		self.assertEqual(sorted(plants.keys()), sorted(self.plants.keys()))
+		for idnr, plant in plants.iteritems():
+			original = self.plants[idnr]
+			for attr in ['name', 'country', 'capacity', 'commissioning_year', 'fuel', 'generation']:
+				self.assertEqual(getattr(plant, attr), getattr(original, attr))
+				self.assertIs(type(getattr(plant, attr)), type(getattr(original, attr)))
+			self.assertEqual(plant.location.latitude, original.location.latitude)
+
+	def test_arrays(self):
+		chile = self.table.country_mask(u"Chile")
+		self.assertEqual(chile.sum(), 2)
+		self.assertEqual(self.table.fuel_mask(u"Oil").sum(), 1)
+		self.assertEqual(np.nansum(self.table.capacity[chile]), 100.0)
+		self.assertEqual(np.nansum(self.table.generation_gwh[:, self.table.years.index(2014)]), 120.0)
+		self.assertEqual(len(self.table.take(chile).to_dict()), 2)
+
+class TestBinaryDatabase(unittest.TestCase):
+
+	def setUp(self):
+		self.tempdir = tempfile.mkdtemp()
+		self.plants = {}
+		for plant in [make_test_plant(u"TST0000001"),
+				make_test_plant(u"TST0000002", country=u"Peru", fuel=u"Hydro"),
+				make_test_plant(u"TST0000003", country=u"Peru", capacity=None)]:
+			self.plants[plant.idnr] = plant
+		del self.plants[u"TST0000003"].owner
+		pw.save_database(self.plants, "TST", self.tempdir)
+		self.filename = os.path.join(self.tempdir, "TST-Database.bin")
+
+	def tearDown(self):
+		shutil.rmtree(self.tempdir)
+
+	def test_roundtrip(self):
+		self.assertTrue(pw.is_binary_database(self.filename))
+		plants = pw.load_database(self.filename)
+		self.assertEqual(sorted(plants.keys()), sorted(self.plants.keys()))
+		for idnr, plant in plants.iteritems():
+			self.assertEqual(plant.__getstate__().keys(), self.plants[idnr].__getstate__().keys())
+			self.assertEqual(plant.fuel, self.plants[idnr].fuel)
+			self.assertEqual(plant.location.latitude, -33.0)
+		self.assertFalse(hasattr(plants[u"TST0000003"], 'owner'))
+
+	def test_selective_load(self):
+		self.assertEqual(pw.database_countries(self.filename), {u"Chile": 1, u"Peru": 2})
+		plants = pw.load_database(self.filename, countries=[u"Peru"], fields=['capacity'], compact=True)
+		self.assertEqual(sorted(plants.keys()), [u"TST0000002", u"TST0000003"])
+		self.assertEqual(plants[u"TST0000002"].capacity, 100.0)
+		self.assertFalse(hasattr(plants[u"TST0000002"], 'name'))
+		self.assertRaises(ValueError, pw.load_database, self.filename, fields=['colour'])
+
+	def test_legacy_pickle(self):
+		pw.save_database(self.plants, "TST", self.tempdir, legacy=True)
+		self.assertFalse(pw.is_binary_database(self.filename))
+		self.assertIsNone(pw.database_countries(self.filename))
+		plants = pw.load_database(self.filename, countries=[u"Chile"])
+		self.assertEqual(plants.keys(), [u"TST0000001"])
+
+class TestWriteCSV(unittest.TestCase):
+
+	def setUp(self):
+		self.tempdir = tempfile.mkdtemp()
+		self.filename = os.path.join(self.tempdir, "plants.csv")
+
+	def tearDown(self):
+		shutil.rmtree(self.tempdir)
+
+	def test_annual_generations(self):
+		gen = [pw.PlantGenerationObject.create(120.0, 2014), pw.PlantGenerationObject.create(80.0, 2013),
+			pw.PlantGenerationObject.create(90.0, 2014)]
+		years = [2012, 2013, 2014]
+		self.assertEqual(pw.annual_generations(gen, years), [pw.annual_generation(gen, y) for y in years])
+		self.assertEqual(pw.annual_generations(None, years), [None, None, None])
+
+	def test_sorted_and_skipped(self):
+		plants = {}
+		for plant in [make_test_plant(u"TST0000001", name=u"B"), make_test_plant(u"TST0000002", name=u"A"),
+				make_test_plant(u"TST0000003", country=u"Argentina"), make_test_plant(u"TST0000004")]:
+			plants[plant.idnr] = plant
+		plants[u"TST0000004"].location = None
+		self.assertEqual(pw.write_csv_file(plants, self.filename), [u"TST0000004"])
+		with open(self.filename, 'rb') as f:
+			f.readline()
+			rows = list(csv.DictReader(f))
+		self.assertEqual([row['pw_idnr'] for row in rows], ["TST0000003", "TST0000002", "TST0000001"])
+		self.assertEqual(rows[0]['fuel1'], "Coal")
+		self.assertEqual(rows[0]['fuel2'], "")
+
+class TestGenerationIndex(unittest.TestCase):
+
+	def setUp(self):
+		self.gen = [pw.PlantGenerationObject.create(10.0, 2014, 3), pw.PlantGenerationObject.create(120.0, 2014),
+			pw.PlantGenerationObject.create(80.0, 2013), pw.PlantGenerationObject.create(90.0, 2014)]
+		self.plant = make_test_plant(generation=self.gen)
+
+	def test_annual(self):
+		for year in range(2012, 2016):
+			self.assertEqual(self.plant.annual(year), pw.annual_generation(self.gen, year))
+		self.assertEqual(self.plant.annual(2014), 120.0)
+		self.assertEqual(self.plant.annual_range(2012, 2014), [None, 80.0, 120.0])
+		self.assertIsNone(make_test_plant().annual(2014))
+
+	def test_reindex(self):
+		self.assertIsNone(self.plant.annual(2015))
+		self.plant.generation.append(pw.PlantGenerationObject.create(70.0, 2015))
+		self.assertEqual(self.plant.annual(2015), 70.0)
+		self.plant.generation = [pw.PlantGenerationObject.create(50.0, 2014)]
+		self.assertEqual(self.plant.annual(2014), 50.0)
+		self.plant.generation[0] = pw.PlantGenerationObject.create(60.0, 2014)
+		self.plant.reindex_generation()
+		self.assertEqual(self.plant.annual(2014), 60.0)
+		self.assertNotIn('_annual_index', self.plant.__getstate__())
+
+	def test_matrix(self):
+		matrix = pw.annual_generation_matrix([self.plant, make_test_plant()], [2013, 2014])
+		self.assertEqual(matrix.shape, (2, 2))
+		self.assertEqual(list(matrix[0]), [80.0, 120.0])
+		self.assertTrue(np.isnan(matrix[1]).all())
+
+class TestEstimateGeneration(unittest.TestCase):
+
+	def test_multiple_years(self):
+		plants = [make_test_plant(u"TST0000001", capacity=100.0),
+			make_test_plant(u"TST0000002", capacity=300.0),
+			make_test_plant(u"TST0000003", capacity=50.0, generation=pw.PlantGenerationObject.create(150.0, 2014)),
+			make_test_plant(u"TST0000004", capacity=None),
+			make_test_plant(u"TST0000005", fuel=u"Hydro")]
+		totals = {2013: {(u"Chile", u"Coal"): 800.0}, 2014: {(u"Chile", u"Coal"): 1000.0}}
+		estimates = pw.estimate_generation_by_year(plants, totals)
+		self.assertEqual(estimates.shape, (5, 2))
+		np.testing.assert_allclose(estimates[:3, 0], [177.7777777, 533.3333333, 88.8888888])
+		np.testing.assert_allclose(estimates[:2, 1], [212.5, 637.5])
+		self.assertTrue(np.isnan(estimates[2:, 1]).all())
+		self.assertTrue(np.isnan(estimates[3:, 0]).all())
+
+class TestSqliteExport(unittest.TestCase):
+
+	def setUp(self):
+		self.tempdir = tempfile.mkdtemp()
+		gen = pw.PlantGenerationObject.create(120.0, 2014)
+		self.plants = {}
+		for plant in [make_test_plant(u"TST0000001", generation=gen),
+				make_test_plant(u"TST0000002", name=u"Planta Ñuble", country=u"Peru", fuel=[u"Gas", u"Oil"]),
+				make_test_plant(u"TST0000003", latitude=None)]:
+			self.plants[plant.idnr] = plant
+
+	def tearDown(self):
+		shutil.rmtree(self.tempdir)
+
+	def check_database(self, conn):
+		self.assertEqual(conn.execute('SELECT COUNT(*) FROM powerplants').fetchone()[0], 3)
+		row = conn.execute('SELECT name, fuel1, fuel3, generation_gwh_2014 FROM powerplants WHERE pw_idnr=?',
+			(u"TST0000001",)).fetchone()
+		self.assertEqual(row, (u"Test Plant", u"Coal", None, 120.0))
+		self.assertEqual(conn.execute('SELECT COUNT(latitude) FROM powerplants').fetchone()[0], 2)
+		self.assertEqual(conn.execute('SELECT name FROM powerplants WHERE country=?', (u"Peru",)).fetchone()[0], u"Planta Ñuble")
+		conn.close()
+
+	def test_from_dict(self):
+		conn = pw.write_sqlite_database(self.plants, os.path.join(self.tempdir, "dict.sqlite"), return_connection=True)
+		self.check_database(conn)
+
+	def test_from_table(self):
+		table = pw.PlantTable.from_dict(self.plants)
+		conn = pw.write_sqlite_database(table, os.path.join(self.tempdir, "table.sqlite"), return_connection=True)
+		self.check_database(conn)
+
+	def test_normalized(self):
+		self.plants[u"TST0000001"].generation.append(pw.PlantGenerationObject.create(130.0, 2009))
+		conn = pw.write_sqlite_database(self.plants, os.path.join(self.tempdir, "normalized.sqlite"),
+			return_connection=True, normalized=True)
+		self.assertEqual(conn.execute('SELECT COUNT(*) FROM plant_fuels WHERE fuel=?', (u"Oil",)).fetchone()[0], 1)
+		self.assertEqual(conn.execute('SELECT gwh FROM plant_generation WHERE year=2009').fetchone()[0], 130.0)
+		plan = conn.execute('EXPLAIN QUERY PLAN SELECT pw_idnr FROM plant_fuels WHERE fuel=?', (u"Oil",)).fetchall()
+		self.assertIn('COVERING INDEX', plan[0][-1])
+		self.check_database(conn)
+
+if __name__ == '__main__':
+	unittest.main()
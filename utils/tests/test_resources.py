@@ -3,6 +3,9 @@
 import sys
 import os
 import unittest
+import shutil
+import tempfile
+import time
 
 sys.path.insert(0, os.path.join(os.pardir, os.pardir))
 import powerwatch as pw
@@ -25,6 +28,73 @@ class TestFuelThesaurus(unittest.TestCase):
 				self.assertNotIn(alt_name, unique_names)
 				unique_names[alt_name] = None
 
+class TestStandardizeFuel(unittest.TestCase):
+
+	def setUp(self):
+		self.fuel_thesaurus = pw.make_fuel_thesaurus()
+
+	def test_aliases(self):
+		self.assertEqual(pw.standardize_fuel(u"Natural Gas/Coal", self.fuel_thesaurus), set([u"Gas", u"Coal"]))
+		self.assertEqual(pw.standardize_fuel("sun", self.fuel_thesaurus), set([u"Solar"]))
+		self.assertEqual(pw.standardize_fuel(u"", self.fuel_thesaurus), set())
+
+	def test_returns_copy(self):
+		fuels = pw.standardize_fuel(u"Wind", self.fuel_thesaurus)
+		fuels.add(u"Hydro")
+		self.assertEqual(pw.standardize_fuel(u"Wind", self.fuel_thesaurus), set([u"Wind"]))
+
+	def test_batch(self):
+		fuels = pw.standardize_fuels([u"Wind", u"uranium", u"no such fuel"], self.fuel_thesaurus)
+		self.assertEqual(fuels, [set([u"Wind"]), set([u"Nuclear"]), set()])
+
+class TestStandardizeCountry(unittest.TestCase):
+
+	def setUp(self):
+		self.country_thesaurus = pw.make_country_names_thesaurus()
+
+	def test_aliases(self):
+		self.assertEqual(pw.standardize_country("United States", self.country_thesaurus), u"United States of America")
+		self.assertEqual(pw.standardize_country(u"Bahamas, The", self.country_thesaurus), u"Bahamas")
+		self.assertEqual(pw.standardize_country(u"cote d'ivoire", self.country_thesaurus), u"Cote DIvoire")
+		self.assertEqual(pw.standardize_country(u"Chile", self.country_thesaurus), u"Chile")
+
+	def test_unknown(self):
+		self.assertEqual(pw.standardize_country(u"", self.country_thesaurus), pw.NO_DATA_UNICODE)
+		self.assertEqual(pw.standardize_country(u"Atlantis", self.country_thesaurus), pw.NO_DATA_UNICODE)
+
+	def test_batch(self):
+		countries = pw.standardize_countries([u"Viet Nam", u"Russia", u"Viet Nam"], self.country_thesaurus)
+		self.assertEqual(countries, [u"Vietnam", u"Russia", u"Vietnam"])
+
+class TestResourceCache(unittest.TestCase):
+
+	def setUp(self):
+		self.tempdir = tempfile.mkdtemp()
+		self.filename = os.path.join(self.tempdir, 'country_information.csv')
+		shutil.copy(pw.COUNTRY_INFORMATION_FILE, self.filename)
+
+	def tearDown(self):
+		shutil.rmtree(self.tempdir)
+
+	def test_shared(self):
+		self.assertIs(pw.make_country_dictionary(self.filename), pw.make_country_dictionary(self.filename))
+
+	def test_read_only(self):
+		country_dictionary = pw.make_country_dictionary(self.filename)
+		with self.assertRaises(TypeError):
+			country_dictionary[u'Atlantis'] = None
+		self.assertIn(u'Chile', dict(country_dictionary))
+
+	def test_reload_on_change(self):
+		first = pw.make_country_names_thesaurus(self.filename)
+		os.utime(self.filename, (time.time() + 10, time.time() + 10))
+		self.assertIs(pw.make_country_names_thesaurus(self.filename), first)	# same content
+		with open(self.filename, 'ab') as f:
+			f.write('\nAtlantis,ATL,AT,0,0,Atlantis,Atlantis,,\n')
+		second = pw.make_country_names_thesaurus(self.filename)
+		self.assertIsNot(second, first)
+		self.assertIn(u'Atlantis', second)
+
 if __name__ == '__main__':
 	unittest.main()
 
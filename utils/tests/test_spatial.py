@@ -0,0 +1,79 @@
+# This Python file uses the following encoding: utf-8
+"""Tests on the PowerWatch spatial index."""
+
+import sys
+import os
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.pardir, os.pardir))
+import powerwatch as pw
+from powerwatch import spatial
+
+
+class TestSpatialIndex(unittest.TestCase):
+
+	def setUp(self):
+		rng = np.random.RandomState(0)
+		n = 2000
+		self.latitudes = np.degrees(np.arcsin(rng.uniform(-1, 1, n)))
+		self.longitudes = rng.uniform(-180, 180, n)
+		# clusters around the antimeridian and a pole
+		self.latitudes[:50] = rng.uniform(-20, -15, 50)
+		self.longitudes[:50] = rng.choice([-1, 1], 50) * rng.uniform(179, 180, 50)
+		self.latitudes[50:100] = rng.uniform(88, 90, 50)
+		self.ids = ["P{0:05d}".format(i) for i in range(n)]
+		self.index = spatial.SpatialIndex(self.ids, self.latitudes, self.longitudes, cell_degrees = 2.0)
+		self.queries = [(-17.0, 179.9), (-17.0, -179.9), (89.5, 10.0), (-89.9, 0.0), (0.0, 0.0), (45.0, -75.0)]
+
+	def brute_force(self, latitude, longitude):
+		distances = spatial.haversine_km(latitude, longitude, self.latitudes, self.longitudes)
+		order = np.argsort(distances, kind='mergesort')
+		return [self.ids[i] for i in order], distances[order]
+
+	def test_haversine(self):
+		self.assertAlmostEqual(spatial.haversine_km(0, 0, 0, 180), np.pi * spatial.EARTH_RADIUS_KM)
+		self.assertAlmostEqual(spatial.haversine_km(0, 179.5, 0, -179.5), spatial.haversine_km(0, 0, 0, 1))
+
+	def test_radius(self):
+		lats, lons = zip(*self.queries)
+		for radius in [10.0, 300.0, 2500.0]:
+			for (ids, distances), (lat, lon) in zip(self.index.query_radius(lats, lons, radius), self.queries):
+				expected_ids, expected_distances = self.brute_force(lat, lon)
+				inside = expected_distances <= radius
+				self.assertEqual(sorted(ids), sorted(np.array(expected_ids)[inside]))
+				np.testing.assert_allclose(distances, expected_distances[inside])
+
+	def test_nearest(self):
+		lats, lons = zip(*self.queries)
+		ids, distances = self.index.query_nearest(lats, lons, k = 7)
+		self.assertEqual(ids.shape, (len(self.queries), 7))
+		for i, (lat, lon) in enumerate(self.queries):
+			_, expected_distances = self.brute_force(lat, lon)
+			np.testing.assert_allclose(distances[i], expected_distances[:7])
+
+	def test_nearest_max_distance(self):
+		ids, distances = self.index.query_nearest([0.0], [0.0], k = 3, max_distance_km = 1.0)
+		self.assertTrue(np.all(np.isinf(distances[ids == None])))
+		ids, distances = self.index.query_nearest([0.0], [0.0], k = 3000)
+		self.assertEqual(sum(1 for i in ids[0] if i is not None), len(self.ids))
+
+	def test_from_plants(self):
+		plants = {
+			"A": pw.PowerPlant("A", u"A", u"Chile", plant_location = pw.LocationObject(u"", -33.0, -70.0)),
+			"B": pw.PowerPlant("B", u"B", u"Chile", plant_location = pw.LocationObject(u"", None, None)),
+			"C": pw.PowerPlant("C", u"C", u"Chile", plant_location = pw.LocationObject(u"", 0.0, 0.0)),
+		}
+		index = spatial.SpatialIndex.from_plants(plants, {"D": pw.PowerPlant("D", u"D", u"Chile",
+			plant_location = pw.LocationObject(u"", -33.1, -70.0))})
+		self.assertEqual(len(index), 2)
+		ids, distances = index.query_nearest(-33.0, -70.0, k = 2)
+		self.assertEqual(list(ids[0]), ["A", "D"])
+
+	def test_invalid(self):
+		self.assertRaises(ValueError, spatial.SpatialIndex, ["A"], [91.0], [0.0])
+		self.assertRaises(ValueError, spatial.SpatialIndex, ["A", "B"], [0.0], [0.0])
+
+if __name__ == '__main__':
+	unittest.main()